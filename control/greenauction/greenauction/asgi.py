@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "greenauction.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from django.urls import reverse  # noqa: E402  (앱 로딩 후)
+from shop import live  # noqa: E402
+
+LIVE_PATH = reverse("live_events")
+
+
+# 실시간 알림(SSE)은 미들웨어를 거치지 않고 바로 처리한다. 나머지는 Django 로
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == LIVE_PATH:
+        return await live.asgi_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -62,9 +63,8 @@ ROOT_URLCONF = "greenauction.urls"
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [BASE_DIR / 'shop' / 'templates' / 'shop', 
-                 BASE_DIR / 'shop' / 'templates' / 'registeration',
-                 BASE_DIR / 'shop' / 'templates'],
+        # 앱 디렉터리보다 먼저 찾는다 (registration/ 템플릿이 admin 의 것보다 우선하도록)
+        "DIRS": [BASE_DIR / 'shop' / 'templates'],
         "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
@@ -141,6 +141,11 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 KAKAO_API_KEY = 'your_kakao_api_key'
+KAKAO_API_URL = 'https://kapi.kakao.com'
+KAKAO_CID = 'TC0ONETIME'
+KAKAO_CONNECT_TIMEOUT = 3.05
+KAKAO_READ_TIMEOUT = 10
+KAKAO_MAX_RETRIES = 2
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [
@@ -151,17 +156,40 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # Email settings for password reset
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# 캐시 설정
+# 기본은 프로세스마다 따로 쓰는 메모리 캐시다. 여러 프로세스로 띄울 때는 CACHE_BACKEND / CACHE_LOCATION 으로
+# 공유 캐시(django.core.cache.backends.redis.RedisCache, memcached 등)를 지정한다
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'greenauction'),
+        'TIMEOUT': 300,
+    }
+}
+
 # 세션 엔진 설정
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db: 캐시에서 읽고 바뀔 때만 DB 에도 쓴다 (캐시가 비어도 세션은 남는다).
+# 여러 프로세스로 띄울 때는 위의 공유 캐시를 함께 지정한다. 서버에 두지 않으려면
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+# 1 이면 요청마다 세션을 다시 저장해 만료 시각을 늘린다 (기본은 바뀔 때만 저장)
+SESSION_SAVE_EVERY_REQUEST = os.environ.get('SESSION_SAVE_EVERY_REQUEST') == '1'
 
 # 인증 백엔드 설정
+# request.user 를 캐시에서 읽는다 (shop/backends.py). 0 이면 요청마다 DB 에서 읽는다
+# ModelBackend 는 바꾸기 전에 로그인한 세션(세션에 백엔드 경로가 저장돼 있다)이 계속 풀리도록 남겨 둔다
 AUTHENTICATION_BACKENDS = [
+    'shop.backends.CachedModelBackend',
     'django.contrib.auth.backends.ModelBackend',
 ]
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 300))
 
 # 로그인 URL 설정 (로그인 후 리디렉션될 URL)
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
 # settings.py
-AUTH_USER_MODEL = 'shop.CustomUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'shop.CustomUser'
+
+# 상품 검색 인덱스 (SQLite FTS5 사이드카 파일)
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index.sqlite3'
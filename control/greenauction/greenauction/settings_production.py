@@ -0,0 +1,90 @@
+"""
+운영 설정. DJANGO_SETTINGS_MODULE=greenauction.settings_production 으로 고른다.
+
+settings.py (개발 설정) 위에 운영에 필요한 것만 덮어쓴다.
+DB 접속 정보와 비밀값은 환경 변수로 받는다.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, INSTALLED_APPS, MIDDLEWARE, TEMPLATES, os
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
+
+# 디버그 툴바는 개발에서만
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith('debug_toolbar.')]
+
+# 정적 파일은 세션/인증을 거치지 않고 SecurityMiddleware 바로 다음에서 내보낸다 (shop/middleware.py)
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'shop.middleware.StaticFilesMiddleware')
+
+# DB 연결을 요청마다 새로 열지 않고 CONN_MAX_AGE 초 동안 다시 쓴다.
+# 다시 쓰기 전에 연결이 살아 있는지 확인한다 (MySQL 의 wait_timeout 으로 끊긴 연결)
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ.get('DB_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get('DB_PORT', DATABASES['default']['PORT']),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# 캐시는 모든 프로세스가 같이 쓰는 것이어야 한다. 결제 잠금, 장바구니, 재고 홀드, 페이지 캐시 버전이 캐시에 있어서
+# 프로세스마다 따로 두면 잠금이 서로 보이지 않는다. 기본은 Redis, memcached 는 CACHE_BACKEND 로 고른다
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache')
+if CACHE_BACKEND in ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'):
+    raise ImproperlyConfigured(f'운영에서는 공유 캐시가 필요합니다 (CACHE_BACKEND={CACHE_BACKEND}).')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/0'),
+        'TIMEOUT': 300,
+    }
+}
+
+# 템플릿을 한 번 읽어 컴파일한 것을 프로세스가 끝날 때까지 쓴다.
+# loaders 를 직접 적으면 APP_DIRS 는 꺼야 한다 (app_directories 로더가 같은 일을 한다)
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if processor != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# collectstatic 이 이름에 해시를 붙이고 .gz/.br 을 미리 만든다 (shop/storage.py).
+# static/ 의 부트스트랩 배포본 중 템플릿이 쓰는 파일만 모은다 (shop/staticfinders.py). 빌드는 manage.py build_static
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'shop.storage.CompressedManifestStaticFilesStorage'},
+}
+STATICFILES_FINDERS = [
+    'shop.staticfinders.ReferencedFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+]
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# HTTPS 뒤에서 띄울 때 (프록시가 X-Forwarded-Proto 를 넘긴다)
+if os.environ.get('HTTPS') == '1':
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
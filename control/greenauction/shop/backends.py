@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# 로그인한 요청마다 request.user 를 DB 에서 읽지 않도록 사용자 행을 캐시에 둔다.
+# 사용자가 저장/삭제되면 signals 가 키를 지운다 (비밀번호를 바꾸면 세션 해시도 새 값으로 비교된다).
+# AUTH_USER_CACHE_TIMEOUT 을 0 으로 두면 ModelBackend 와 같다
+
+
+def user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate(user_id):
+    cache.delete(user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300)
+        if not timeout:
+            return super().get_user(user_id)
+        user = cache.get(user_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(user_key(user_id), user, timeout)
+            return user
+        return user if self.user_can_authenticate(user) else None
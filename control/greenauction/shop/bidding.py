@@ -0,0 +1,210 @@
+import heapq
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import live
+from .models import Auction, Bid, Order
+
+# 경매 입찰
+# 진행 중인 경매마다 프로세스 안에 호가창(OrderBook)을 두고 입찰을 힙에 넣는다 (O(log n)).
+# DB 에는 Auction.version 을 조건으로 한 UPDATE 로만 최고가를 바꾼다. 다른 프로세스가 먼저 바꿨으면
+# 갱신된 행이 0 이 되고, 호가창을 DB 와 맞춘 뒤 다시 판단한다 (낙관적 동시성).
+# 최고가 조회는 호가창에서 바로 답하고, SYNC_INTERVAL 마다 한 번만 DB 의 version 을 확인한다.
+
+SYNC_INTERVAL = 2.0
+CAS_RETRIES = 3
+
+
+class BidRejected(Exception):
+    pass
+
+
+class OrderBook:
+
+    def __init__(self, auction_id):
+        self.auction_id = auction_id
+        self.lock = threading.RLock()
+        self._heap = []  # (-금액, bid id, 입찰자 id): 맨 앞이 최고가
+        self.last_bid_id = 0
+        self.version = None
+        self.synced_at = 0.0
+
+    # DB 와 맞춘다. version 이 같으면 쿼리 한 번, 다르면 새 입찰만 더 읽는다
+    def sync(self, force=False):
+        with self.lock:
+            if not force and time.monotonic() - self.synced_at < SYNC_INTERVAL:
+                return
+            row = Auction.objects.filter(id=self.auction_id).values(
+                'version', 'status', 'ends_at', 'starting_price', 'min_increment', 'product__seller_id').first()
+            if row is None:
+                raise Auction.DoesNotExist(self.auction_id)
+            if row['version'] != self.version:
+                new_bids = Bid.objects.filter(auction_id=self.auction_id, id__gt=self.last_bid_id).values_list(
+                    'amount', 'id', 'bidder_id')
+                for amount, bid_id, bidder_id in new_bids:
+                    self.push(amount, bid_id, bidder_id)
+            self.version = row['version']
+            self.status = row['status']
+            self.ends_at = row['ends_at']
+            self.starting_price = row['starting_price']
+            self.min_increment = row['min_increment']
+            self.seller_id = row['product__seller_id']
+            self.synced_at = time.monotonic()
+
+    def push(self, amount, bid_id, bidder_id):
+        heapq.heappush(self._heap, (-amount, bid_id, bidder_id))
+        self.last_bid_id = max(self.last_bid_id, bid_id)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def best(self):
+        if not self._heap:
+            return None
+        amount, bid_id, bidder_id = self._heap[0]
+        return {'amount': -amount, 'bid_id': bid_id, 'bidder_id': bidder_id}
+
+    def top(self, n=10):
+        return [{'amount': -amount, 'bid_id': bid_id, 'bidder_id': bidder_id}
+                for amount, bid_id, bidder_id in heapq.nsmallest(n, self._heap)]
+
+    def minimum_next(self):
+        best = self.best()
+        return self.starting_price if best is None else best['amount'] + self.min_increment
+
+    def is_open(self, now):
+        return self.status == 'live' and now < self.ends_at
+
+    def snapshot(self):
+        best = self.best()
+        return {
+            'auction_id': self.auction_id,
+            'amount': str(best['amount']) if best else None,
+            'bidder_id': best['bidder_id'] if best else None,
+            'bid_count': len(self),
+            'minimum_next': str(self.minimum_next()),
+            'version': self.version,
+            'ends_at': self.ends_at.isoformat(),
+            'status': self.status,
+        }
+
+
+# 프로세스 안의 호가창 모음. 테스트에서는 따로 만들어 다른 프로세스처럼 쓸 수 있다.
+# 진행 중인 경매만 남겨 둔다: 없는 경매는 등록하지 않고, 닫힌 경매는 이번 조회에만 쓰고 버린다
+# (아무나 임의의 id 나 지난 경매를 조회해 프로세스 메모리를 늘리지 못하게)
+class BookRegistry:
+
+    def __init__(self):
+        self._books = {}
+        self._lock = threading.Lock()
+
+    def get(self, auction_id):
+        book = self._books.get(auction_id)
+        if book is None:
+            book = OrderBook(auction_id)
+            book.sync()
+            if book.status != 'live':
+                return book
+            with self._lock:
+                book = self._books.setdefault(auction_id, book)
+        try:
+            book.sync()
+        except Auction.DoesNotExist:
+            self.discard(auction_id)
+            raise
+        if book.status != 'live':
+            self.discard(auction_id)
+        return book
+
+    def discard(self, auction_id):
+        self._books.pop(auction_id, None)
+
+    def clear(self):
+        self._books.clear()
+
+    def __len__(self):
+        return len(self._books)
+
+
+books = BookRegistry()
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise BidRejected('입찰 금액이 올바르지 않습니다.')
+    if not amount.is_finite() or amount <= 0:
+        raise BidRejected('입찰 금액이 올바르지 않습니다.')
+    return amount
+
+
+def highest(auction_id, registry=books):
+    return registry.get(auction_id).snapshot()
+
+
+# 입찰. 성공하면 Bid, 아니면 BidRejected
+def place_bid(auction_id, bidder_id, amount, now=None, registry=books):
+    amount = parse_amount(amount)
+    book = registry.get(auction_id)
+    for _ in range(CAS_RETRIES):
+        with book.lock:
+            now = now or timezone.now()
+            if not book.is_open(now):
+                raise BidRejected('경매가 종료되었습니다.')
+            if bidder_id == book.seller_id:
+                raise BidRejected('자신의 상품에는 입찰할 수 없습니다.')
+            minimum = book.minimum_next()
+            if amount < minimum:
+                raise BidRejected(f'{minimum}원 이상 입찰해야 합니다.')
+            try:
+                with transaction.atomic():
+                    updated = Auction.objects.filter(
+                        id=auction_id, version=book.version, status='live', ends_at__gt=now,
+                    ).update(
+                        current_price=amount, highest_bidder_id=bidder_id,
+                        bid_count=F('bid_count') + 1, version=F('version') + 1,
+                    )
+                    bid = None
+                    if updated:
+                        bid = Bid.objects.create(auction_id=auction_id, bidder_id=bidder_id, amount=amount)
+            except IntegrityError:
+                bid = None
+            if bid is not None:
+                book.push(bid.amount, bid.id, bidder_id)
+                book.version += 1
+                live.publish(f'auction:{auction_id}', 'bid', book.snapshot())
+                return bid
+            # 다른 프로세스가 먼저 입찰했다: DB 와 맞추고 다시 판단한다
+            book.sync(force=True)
+    raise BidRejected('입찰이 몰리고 있습니다. 다시 시도해 주세요.')
+
+
+# 마감 시간이 지난 경매를 닫고 낙찰자에게 주문(결제 전)을 만든다
+def close_due(now=None, registry=books):
+    now = now or timezone.now()
+    closed = 0
+    for auction_id in Auction.objects.filter(status='live', ends_at__lte=now).values_list('id', flat=True):
+        with transaction.atomic():
+            auction = Auction.objects.select_for_update().get(id=auction_id)
+            if auction.status != 'live':
+                continue
+            if auction.highest_bidder_id is not None:
+                auction.order = Order.objects.create(
+                    product_id=auction.product_id, buyer_id=auction.highest_bidder_id, quantity=1,
+                    total_price=auction.current_price)
+            auction.status = 'closed'
+            auction.version += 1
+            auction.save(update_fields=['status', 'version', 'order'])
+        registry.discard(auction_id)
+        live.publish(f'auction:{auction_id}', 'closed', {
+            'auction_id': auction_id, 'amount': str(auction.current_price),
+            'bidder_id': auction.highest_bidder_id, 'status': auction.status,
+        })
+        closed += 1
+    return closed
@@ -0,0 +1,133 @@
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+from .models import Product
+
+# 장바구니 (서명된 쿠키 + 캐시)
+# 담기/수량 변경은 DB 에 쓰지 않고, 결제할 때 한 번에 Order 로 저장한다.
+# 쿠키 형식: "상품id:수량.상품id:수량" (서명은 Django signing)
+# 같은 형식을 사용자별 캐시 키에도 써 둔다. 브라우저는 요청을 보낼 때 가진 쿠키를 그대로 보내므로 겹친 클릭은
+# 모두 같은 (이전) 장바구니를 들고 온다. 그래서 바꿀 때는 사용자별 잠금(locked)을 잡고 캐시에 있는 최신 장바구니를
+# 고친다. 쿠키는 캐시에서 밀려났을 때 쓰는 사본이다
+
+COOKIE_NAME = 'cart'
+COOKIE_SALT = 'shop.cart'
+COOKIE_MAX_AGE = 60 * 60 * 24 * 14
+MAX_LINES = 50
+MAX_QUANTITY = 99
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 0.01
+
+
+class CartBusy(Exception):
+
+    def __init__(self):
+        super().__init__('장바구니를 바꾸는 요청이 몰리고 있습니다. 잠시 후 다시 시도해 주세요.')
+
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+        self.total_price = product.price * quantity
+
+
+class Cart:
+
+    def __init__(self, lines=None, salt=COOKIE_SALT, key=None):
+        self.lines = dict(lines or {})  # {상품 id: 수량}
+        self.salt = salt
+        self.key = key
+        self.modified = False
+
+    @classmethod
+    def from_request(cls, request):
+        # 사용자마다 salt 를 달리해서 다른 계정으로 로그인하면 이전 장바구니가 보이지 않게 한다
+        salt = f'{COOKIE_SALT}.{request.user.pk}'
+        key = f'cart:{request.user.pk}'
+        value = cache.get(key)
+        if value is None:
+            value = request.get_signed_cookie(COOKIE_NAME, default='', salt=salt)
+        return cls(cls.loads(value), salt, key)
+
+    # 장바구니를 바꾸는 요청은 이 안에서 읽고 고친다. 같은 사용자의 요청은 하나씩 지나간다.
+    # LOCK_TIMEOUT 안에 잠금을 얻지 못하면 잠금 없이 고치지 않고 CartBusy 를 낸다
+    @classmethod
+    @contextmanager
+    def locked(cls, request):
+        lock = f'cart-lock:{request.user.pk}'
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not cache.add(lock, 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise CartBusy()
+            time.sleep(LOCK_WAIT)
+        try:
+            cart = cls.from_request(request)
+            yield cart
+            cart.store()
+        finally:
+            cache.delete(lock)
+
+    @staticmethod
+    def loads(value):
+        lines = {}
+        for item in value.split('.') if value else []:
+            try:
+                product_id, quantity = (int(part) for part in item.split(':'))
+            except ValueError:
+                continue
+            if product_id > 0 and 0 < quantity <= MAX_QUANTITY:
+                lines[product_id] = quantity
+        return dict(list(lines.items())[:MAX_LINES])
+
+    def dumps(self):
+        return '.'.join(f'{product_id}:{quantity}' for product_id, quantity in self.lines.items())
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __contains__(self, product_id):
+        return product_id in self.lines
+
+    def add(self, product_id, quantity=1):
+        if product_id not in self.lines and len(self.lines) >= MAX_LINES:
+            return
+        self.set(product_id, self.lines.get(product_id, 0) + quantity)
+
+    def set(self, product_id, quantity):
+        if quantity <= 0:
+            self.remove(product_id)
+            return
+        self.lines[product_id] = min(quantity, MAX_QUANTITY)
+        self.modified = True
+
+    def remove(self, product_id):
+        if self.lines.pop(product_id, None) is not None:
+            self.modified = True
+
+    def clear(self):
+        if self.lines:
+            self.lines = {}
+            self.modified = True
+
+    # 현재 가격으로 계산한 장바구니 줄 목록 (상품은 한 번에 조회)
+    def get_lines(self, queryset=None):
+        queryset = Product.objects.only('id', 'name', 'price') if queryset is None else queryset
+        products = queryset.in_bulk(list(self.lines))
+        return [CartLine(products[pk], quantity) for pk, quantity in self.lines.items() if pk in products]
+
+    def store(self):
+        if self.modified and self.key:
+            cache.set(self.key, self.dumps(), COOKIE_MAX_AGE)
+
+    def save(self, response):
+        if not self.modified:
+            return
+        self.store()
+        if self.lines:
+            response.set_signed_cookie(
+                COOKIE_NAME, self.dumps(), salt=self.salt, max_age=COOKIE_MAX_AGE, httponly=True, samesite='Lax')
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite='Lax')
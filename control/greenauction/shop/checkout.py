@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from . import inventory, live
+from .models import Order, Product
+
+# 주문 확정 (장바구니 결제 / 바로 구매)
+# 한 트랜잭션 안에서 구매자가 장바구니에 잡아 둔 재고(StockHold)를 가져오고, 모자란 만큼은 재고 조각에서
+# 더 가져온다 (inventory.take). 한 줄이라도 모자라면 전부 되돌린다. 주문 금액은 지금 가격으로 다시 계산한다.
+# 주문이 가져간 재고는 결제가 끝날 때까지 Order.stock_held 로 남고, 결제 없이 오래되면 inventory.sweep 이 돌려놓는다.
+
+CART_LOCK_TIMEOUT = 30
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+
+    def __init__(self, products):
+        self.products = products  # 재고가 모자란 상품 id 목록
+        super().__init__('재고가 부족한 상품이 있습니다.')
+
+
+class PriceChanged(CheckoutError):
+
+    def __init__(self, total):
+        self.total = total  # 지금 가격으로 다시 계산한 합계
+        super().__init__(f'가격이 바뀌었습니다. 합계 {total}원을 확인해 주세요.')
+
+
+# {상품 id: 수량} 을 주문으로 만든다. expected_total 을 주면 다시 계산한 합계와 다를 때 거절한다
+def place_order(buyer, lines, expected_total=None):
+    lines = {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+    if not lines:
+        raise CheckoutError('장바구니가 비어 있습니다.')
+    # 같은 구매자의 결제가 겹치면 (두 번 누르기 등) 하나만 진행한다
+    lock = f'checkout:{buyer.pk}'
+    if not cache.add(lock, 1, CART_LOCK_TIMEOUT):
+        raise CheckoutError('이미 결제를 진행하고 있습니다.')
+    try:
+        with transaction.atomic():
+            products = {row['id']: row for row in Product.objects.filter(id__in=lines).values('id', 'price', 'stock')}
+            # 장바구니 쿠키에 남은 삭제된 상품은 건너뛴다 (장바구니 화면에도 보이지 않는다)
+            lines = {product_id: quantity for product_id, quantity in lines.items() if product_id in products}
+            if not lines:
+                raise CheckoutError('장바구니가 비어 있습니다.')
+            held = inventory.claim(buyer, lines)
+            short = []
+            surplus = {}
+            for product_id, quantity in sorted(lines.items()):
+                if products[product_id]['stock'] is None:
+                    continue
+                elif held.get(product_id, 0) >= quantity:
+                    surplus[product_id] = held[product_id] - quantity
+                elif not inventory.take(product_id, quantity - held.get(product_id, 0)):
+                    short.append(product_id)
+            if short:
+                raise OutOfStock(short)
+            inventory.release(surplus)
+            total = sum(products[product_id]['price'] * quantity for product_id, quantity in lines.items())
+            if expected_total is not None and total != expected_total:
+                raise PriceChanged(total)
+            orders = [
+                Order(product_id=product_id, buyer=buyer, quantity=quantity,
+                      total_price=products[product_id]['price'] * quantity,
+                      stock_held=0 if products[product_id]['stock'] is None else quantity)
+                for product_id, quantity in lines.items()
+            ]
+            # 주문마다 저장한다: 결제와 실시간 알림에 주문 id 가 필요한데 MySQL 의 bulk_create 는 id 를 채우지 않는다.
+            # 장바구니는 cart.MAX_LINES 줄까지라 INSERT 수는 작다. 집계/캐시/실시간 알림은 Order 시그널이 처리한다
+            for order in orders:
+                order.save()
+            # 알림이 실패해도 (주문은 이미 커밋됐다) 결제 실패로 보이면 안 된다: robust 는 예외를 로그로만 남긴다
+            transaction.on_commit(lambda: publish_stock(
+                [product_id for product_id, row in products.items() if row['stock'] is not None]), robust=True)
+    finally:
+        cache.delete(lock)
+    return orders
+
+
+def publish_stock(product_ids):
+    for product_id, stock in inventory.available(product_ids).items():
+        live.publish(f'product:{product_id}', 'stock', {'product_id': product_id, 'stock': stock})
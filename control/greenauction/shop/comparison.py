@@ -0,0 +1,90 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Max, Min, Q, Value, Window
+from django.db.models.functions import Ceil, Floor, RowNumber
+
+from .models import Product
+
+# 카테고리별 가격 비교
+# 개수/판매자 수/최저/최고/평균은 카테고리로 묶은 집계 한 번으로 구한다.
+# 분위수는 카테고리 안에서 가격 순번(ROW_NUMBER)을 매겨 분위수 양옆에 있는 행만 읽는다 (카테고리마다 많아야
+# PERCENTILES 의 두 배). 상품 행을 파이썬으로 모두 가져오지 않는다.
+# 결과는 통째로 캐시하고 상품이 저장/삭제되면 signals 에서 지운다.
+
+CACHE_KEY = 'category_price_stats'
+CACHE_TIMEOUT = 60 * 60
+PERCENTILES = (25, 50, 75, 90)
+
+
+# 분위수 p 의 (0 부터 센) 순번. 정수가 아니면 양옆 두 값을 선형 보간한다 (numpy.percentile 기본값과 같다)
+def percentile_rank(size, p):
+    return (size - 1) * p / 100
+
+
+# 분위수 계산에 필요한 행만: {카테고리 id: {순번: 가격}}
+def percentile_rows():
+    positioned = Product.objects.filter(category__isnull=False).annotate(
+        position=Window(RowNumber(), partition_by=F('category_id'), order_by=[F('price').asc(), F('id').asc()]),
+        size=Window(Count('id'), partition_by=F('category_id')),
+    )
+    wanted = Q()
+    for p in PERCENTILES:
+        rank = (F('size') - 1) * Value(p / 100)
+        wanted |= Q(position=Floor(rank) + 1) | Q(position=Ceil(rank) + 1)
+    rows = {}
+    for category_id, position, price in positioned.filter(wanted).values_list('category_id', 'position', 'price'):
+        rows.setdefault(category_id, {})[position - 1] = float(price)
+    return rows
+
+
+def interpolate(values, size, p):
+    rank = percentile_rank(size, p)
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def compute_category_stats():
+    groups = list(
+        Product.objects.filter(category__isnull=False)
+        .values('category_id', 'category__name')
+        .annotate(products=Count('id'), sellers=Count('seller', distinct=True),
+                  low=Min('price'), high=Max('price'), average=Avg('price'))
+        .order_by()
+    )
+    if not groups:
+        return {}
+    positions = percentile_rows()
+
+    results = {}
+    for group in groups:
+        category_id = group['category_id']
+        values = positions[category_id]
+        p25, median, p75, p90 = (interpolate(values, group['products'], p) for p in PERCENTILES)
+        results[category_id] = {
+            'category_id': category_id,
+            'name': group['category__name'],
+            'products': group['products'],
+            'sellers': group['sellers'],
+            'min': round(float(group['low']), 2),
+            'p25': round(p25, 2),
+            'median': round(median, 2),
+            'p75': round(p75, 2),
+            'p90': round(p90, 2),
+            'max': round(float(group['high']), 2),
+            'avg': round(float(group['average']), 2),
+        }
+    return results
+
+
+# {카테고리 id: 통계} (캐시 우선)
+def get_category_stats():
+    results = cache.get(CACHE_KEY)
+    if results is None:
+        results = compute_category_stats()
+        cache.set(CACHE_KEY, results, CACHE_TIMEOUT)
+    return results
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,81 @@
+import csv
+import json
+
+from .models import Order
+
+# 주문 내보내기 (CSV / NDJSON 스트리밍)
+# id 순 keyset 으로 BATCH_SIZE 행씩 끊어 읽는다. MySQL 드라이버는 결과 전체를 메모리에 올리므로
+# iterator() 하나로 전부 읽지 않고, 배치마다 짧은 쿼리를 다시 보낸다.
+
+BATCH_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# (열 이름, Order 기준 필드)
+BUYER_COLUMNS = [
+    ('order_id', 'id'),
+    ('date_ordered', 'date_ordered'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('quantity', 'quantity'),
+    ('total_price', 'total_price'),
+    ('kakao_tid', 'kakao_tid'),
+]
+SELLER_COLUMNS = [
+    ('order_id', 'id'),
+    ('date_ordered', 'date_ordered'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('buyer', 'buyer__username'),
+    ('quantity', 'quantity'),
+    ('total_price', 'total_price'),
+]
+
+
+def buyer_orders(user):
+    return Order.objects.filter(buyer=user), BUYER_COLUMNS
+
+
+def seller_orders(seller):
+    return Order.objects.filter(product__seller=seller), SELLER_COLUMNS
+
+
+def iter_rows(queryset, columns, batch_size=BATCH_SIZE):
+    fields = [field for _, field in columns]
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list(*fields)[:batch_size]
+            .iterator(chunk_size=batch_size)
+        )
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+# csv.writer 가 쓴 한 줄을 그대로 돌려받기 위한 버퍼
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def to_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # 엑셀에서 한글이 깨지지 않도록 BOM
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def to_ndjson(rows, columns):
+    names = [name for name, _ in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=str, ensure_ascii=False) + '\n'
+
+
+def stream(queryset, columns, fmt, batch_size=BATCH_SIZE):
+    rows = iter_rows(queryset, columns, batch_size)
+    return to_csv(rows, columns) if fmt == 'csv' else to_ndjson(rows, columns)
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# 로컬 가짜 카카오페이 서버 (테스트 / 벤치마크용)
+# ready / approve / order(상태 조회) 를 흉내 내고, 응답 지연과 일시적인 5xx 를 주입할 수 있다.
+
+
+class FakeKakaoServer:
+
+    def __init__(self, latency=0.0, fail_first=0, fail_status=503):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = []  # (경로, 폼 데이터)
+        self.connections = set()  # 클라이언트 (host, port). 연결 재사용 확인용
+        self.tids = {}  # tid -> ready 요청 데이터
+        self.approved = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                data = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                status, payload = fake.handle(self.path, data, self.client_address)
+                body = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 클라이언트가 타임아웃으로 먼저 끊은 경우
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, path):
+        return sum(1 for request_path, _ in self.requests if request_path == path)
+
+    def handle(self, path, data, client):
+        with self._lock:
+            self.requests.append((path, data))
+            self.connections.add(client)
+            failing = self.fail_first > 0
+            if failing:
+                self.fail_first -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            return self.fail_status, {'code': -1, 'msg': 'temporarily unavailable'}
+
+        if path == '/v1/payment/ready':
+            tid = f'T{uuid.uuid4().hex[:18]}'
+            with self._lock:
+                self.tids[tid] = data
+            return 200, {
+                'tid': tid,
+                'next_redirect_pc_url': f'{self.url}/pay/{tid}',
+                'next_redirect_mobile_url': f'{self.url}/m/pay/{tid}',
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+        if path == '/v1/payment/approve':
+            tid = data.get('tid')
+            with self._lock:
+                ready = self.tids.get(tid)
+                if ready is None or ready.get('partner_order_id') != data.get('partner_order_id'):
+                    return 400, {'code': -702, 'msg': 'invalid tid'}
+                if tid in self.approved:
+                    return 400, {'code': -780, 'msg': 'already approved'}
+                self.approved.add(tid)
+            return 200, {
+                'tid': tid,
+                'partner_order_id': ready['partner_order_id'],
+                'partner_user_id': ready['partner_user_id'],
+                'item_name': ready.get('item_name'),
+                'quantity': int(ready.get('quantity', 1)),
+                'amount': {'total': int(ready.get('total_amount', 0))},
+                'approved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+        if path == '/v1/payment/order':
+            tid = data.get('tid')
+            with self._lock:
+                if tid not in self.tids:
+                    return 400, {'code': -702, 'msg': 'invalid tid'}
+                status = 'SUCCESS_PAYMENT' if tid in self.approved else 'READY'
+            return 200, {'tid': tid, 'status': status, 'partner_order_id': self.tids[tid]['partner_order_id']}
+        return 404, {'code': -1, 'msg': 'not found'}
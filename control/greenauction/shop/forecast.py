@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import PriceHistory
+
+# 가격 추세 / 예측
+# PriceHistory 를 values_list 로 바로 NumPy 배열로 읽어서 모델별로 벡터 연산한다.
+# 결과는 상품별로 캐시하고, PriceHistory 가 바뀌면 signals 에서 지운다.
+
+ROLLING_WINDOW = 12
+SMOOTHING_ALPHA = 0.3
+HORIZON = 7  # 마지막 날짜 이후 예측 일수
+CACHE_TIMEOUT = 60 * 60 * 6
+
+
+def rolling_mean(prices, window=ROLLING_WINDOW):
+    # 앞부분은 있는 만큼만 평균 (pandas rolling(min_periods=1) 과 같다)
+    csum = np.concatenate(([0.0], np.cumsum(prices)))
+    end = np.arange(1, len(prices) + 1)
+    start = np.maximum(end - window, 0)
+    return (csum[end] - csum[start]) / (end - start)
+
+
+def exponential_smoothing(prices, alpha=SMOOTHING_ALPHA):
+    # s_t = alpha * x_t + (1 - alpha) * s_(t-1) 을 닫힌 식으로 계산한다.
+    # decay ** -k 가 넘치지 않도록 블록 단위로 나눠서 이어 붙인다.
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return prices.astype(float)
+    block = max(1, int(150 / -np.log10(decay))) if decay < 1 else len(prices)
+    smoothed = np.empty(len(prices))
+    level = prices[0] if len(prices) else 0.0
+    for offset in range(0, len(prices), block):
+        chunk = prices[offset:offset + block]
+        k = np.arange(1, len(chunk) + 1)
+        smoothed[offset:offset + len(chunk)] = decay ** k * (level + np.cumsum(alpha * chunk * decay ** -k))
+        level = smoothed[offset + len(chunk) - 1]
+    return smoothed
+
+
+def linear_trend(days, prices):
+    if len(prices) < 2:
+        return lambda x: np.full(len(x), prices[0] if len(prices) else 0.0)
+    slope, intercept = np.polyfit(days, prices, 1)
+    return lambda x: slope * x + intercept
+
+
+MODELS = ('rolling', 'smoothing', 'linear')
+
+
+# 한 상품의 날짜/가격 배열로 모든 모델의 적합값과 HORIZON 일 예측을 만든다
+def build_forecasts(dates, prices, horizon=HORIZON):
+    days = (dates - dates[0]).astype(int) if len(dates) else np.array([], dtype=int)
+    future_days = days[-1] + np.arange(1, horizon + 1) if len(days) else np.array([], dtype=int)
+
+    rolling = rolling_mean(prices)
+    smoothing = exponential_smoothing(prices)
+    trend = linear_trend(days, prices)
+    fitted = {
+        'rolling': (rolling, np.full(len(future_days), rolling[-1] if len(rolling) else 0.0)),
+        'smoothing': (smoothing, np.full(len(future_days), smoothing[-1] if len(smoothing) else 0.0)),
+        'linear': (trend(days), trend(future_days)),
+    }
+
+    all_dates = [d.item() for d in dates] + [dates[0].item() + timedelta(days=int(d)) for d in future_days]
+    history = [round(float(p), 2) for p in prices] + [None] * len(future_days)
+    forecasts = {}
+    for model, (past, future) in fitted.items():
+        predicted = np.round(np.concatenate((past, future)), 2).tolist()
+        forecasts[model] = [
+            {'date': date, 'average_price': price, 'predicted_price': value}
+            for date, price, value in zip(all_dates, history, predicted)
+        ]
+    return forecasts
+
+
+def cache_key(product_id):
+    return f'price_forecast:{product_id}'
+
+
+def _arrays(rows):
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    prices = np.array([row[1] for row in rows], dtype=float)
+    return dates, prices
+
+
+# 상품 하나의 예측 (캐시 우선)
+def get_forecast(product_id, model='rolling'):
+    model = model if model in MODELS else 'rolling'
+    forecasts = cache.get(cache_key(product_id))
+    if forecasts is None:
+        rows = PriceHistory.objects.filter(product_id=product_id).order_by('date').values_list('date', 'average_price')
+        forecasts = build_forecasts(*_arrays(list(rows)))
+        cache.set(cache_key(product_id), forecasts, CACHE_TIMEOUT)
+    return forecasts[model]
+
+
+def invalidate(product_id):
+    cache.delete(cache_key(product_id))
+
+
+def invalidate_many(product_ids):
+    cache.delete_many([cache_key(product_id) for product_id in product_ids])
+
+
+# 전체 상품 예측을 한 번의 조회로 계산해서 캐시에 채운다
+def forecast_all(product_ids=None, chunk_size=5000):
+    history = PriceHistory.objects.order_by('product_id', 'date')
+    if product_ids is not None:
+        history = history.filter(product_id__in=product_ids)
+    rows = list(history.values_list('product_id', 'date', 'average_price').iterator(chunk_size=chunk_size))
+    if not rows:
+        return 0
+    product_col = np.array([row[0] for row in rows])
+    dates, prices = _arrays([row[1:] for row in rows])
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(product_col)) + 1, [len(rows)]))
+
+    results = {}
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        results[cache_key(int(product_col[start]))] = build_forecasts(dates[start:end], prices[start:end])
+        if len(results) >= 500:
+            cache.set_many(results, CACHE_TIMEOUT)
+            results = {}
+    cache.set_many(results, CACHE_TIMEOUT)
+    return len(bounds) - 1
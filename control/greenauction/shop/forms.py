@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser, Product, Order, Review
+from django.utils import timezone
+from .models import Auction, CustomUser, Product, Order, Review
 
 class UserRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -16,7 +17,7 @@ class LoginForm(forms.Form):
 class ProductForm(forms.ModelForm):
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price']
+        fields = ['name', 'description', 'price', 'stock', 'category']
 
 class OrderForm(forms.ModelForm):
     class Meta:
@@ -45,3 +46,17 @@ class BusinessLicenseForm(forms.ModelForm):
         widgets = {
             'business_license': forms.ClearableFileInput(attrs={'class': 'form-control'}),
         }
+
+class AuctionForm(forms.ModelForm):
+    class Meta:
+        model = Auction
+        fields = ['starting_price', 'min_increment', 'ends_at']
+        widgets = {
+            'ends_at': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+        }
+
+    def clean_ends_at(self):
+        ends_at = self.cleaned_data.get('ends_at')
+        if ends_at and ends_at <= timezone.now():
+            raise forms.ValidationError('마감 시간은 현재 이후여야 합니다.')
+        return ends_at
@@ -0,0 +1,256 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from .models import Order, Product, StockHold, StockShard
+from .settlement import STALE_READY
+
+# 재고 예약 (반짝 판매)
+# 상품 재고를 SHARDS 개의 StockShard 행에 나눠 둔다. 담기/주문은 조각 하나를 무작위로 골라
+# "UPDATE ... SET available = available - n WHERE available >= n" 으로 가져가므로 인기 상품도 한 행의 잠금에
+# 몰리지 않는다. 한 조각으로 모자라면 여러 조각에서 나눠 가져온다.
+# 장바구니에 담으면 StockHold 로 CART_HOLD 동안, 주문하면 결제가 끝날 때까지 Order.stock_held 로 재고를 잡는다.
+# 기한이 지난 홀드와 결제되지 않은 주문의 재고는 sweep 이 상품마다 UPDATE 한 번으로 돌려놓는다.
+# Product.stock 은 판매자가 정하는 전체 재고다 (조각 + 장바구니 홀드 + 결제 대기 주문이 잡은 수량).
+# restock 은 이 값에서 잡힌 수량을 빼고 조각에 나누고, checkpoint 는 같은 합계를 다시 적는다
+# (조각이 없으면 처음 가져갈 때 이 값으로 만든다).
+
+SHARDS = 8
+CART_HOLD = timedelta(minutes=10)
+PAYMENT_HOLD = STALE_READY  # 카카오 tid 가 만료된 뒤에 돌려놓는다
+UNPAID_STATUSES = ['pending', 'ready', 'failed', 'expired']
+BATCH_SIZE = 1000
+
+
+# 재고를 조각 수만큼 고르게 나눈다 (10, 4 -> [3, 3, 2, 2])
+def split(stock, shards=SHARDS):
+    return [stock // shards + (1 if i < stock % shards else 0) for i in range(shards)]
+
+
+# 재고를 새로 정한다 (판매자가 상품을 수정할 때). None 이면 재고를 세지 않는다.
+# stock 은 장바구니 홀드와 결제 대기 주문이 잡고 있는 수량까지 포함한 수량이다. 조각에는 잡힌 수량을 뺀 나머지만
+# 나눠 둔다 (잡힌 수량이 풀리면 release 가 조각에 더하므로 합계가 stock 을 넘지 않는다)
+def restock(product_id, stock, shards=SHARDS):
+    with transaction.atomic():
+        StockShard.objects.filter(product_id=product_id).delete()
+        if stock is not None:
+            StockShard.objects.bulk_create([
+                StockShard(product_id=product_id, shard=shard, available=available)
+                for shard, available in enumerate(split(stock - _outstanding(product_id, stock), shards))
+            ])
+        Product.objects.filter(id=product_id).update(stock=stock)
+
+
+# 홀드와 미결제 주문이 잡고 있는 수량. 새 재고보다 많으면 장바구니 홀드부터 놓고, 그래도 많으면 최근 주문부터
+# stock_held 를 0 으로 돌린다 (그 주문은 결제를 시작할 때 hold_for_payment 가 재고를 다시 가져온다)
+def _outstanding(product_id, stock):
+    holds = list(StockHold.objects.select_for_update().filter(product_id=product_id).values_list('id', 'quantity'))
+    orders = list(
+        Order.objects.select_for_update()
+        .filter(product_id=product_id, stock_held__gt=0, payment_status__in=UNPAID_STATUSES)
+        .order_by('id').values_list('id', 'stock_held')
+    )
+    ordered = sum(quantity for _, quantity in orders)
+    held = ordered + sum(quantity for _, quantity in holds)
+    if held <= stock:
+        return held
+    StockHold.objects.filter(id__in=[hold_id for hold_id, _ in holds]).delete()
+    dropped = []
+    while ordered > stock:
+        order_id, quantity = orders.pop()
+        dropped.append(order_id)
+        ordered -= quantity
+    Order.objects.filter(id__in=dropped).update(stock_held=0)
+    return ordered
+
+
+# {조각: 남은 수량}. 조각이 아직 없으면 Product.stock 으로 만든다. 재고를 세지 않는 상품이면 None
+def _shards(product_id):
+    shards = dict(StockShard.objects.filter(product_id=product_id).values_list('shard', 'available'))
+    if shards:
+        return shards
+    stock = Product.objects.filter(id=product_id).values_list('stock', flat=True).first()
+    if stock is None:
+        return None
+    StockShard.objects.bulk_create([
+        StockShard(product_id=product_id, shard=shard, available=available)
+        for shard, available in enumerate(split(stock))
+    ], ignore_conflicts=True)
+    return dict(StockShard.objects.filter(product_id=product_id).values_list('shard', 'available'))
+
+
+def _decrement(product_id, shard, quantity):
+    return StockShard.objects.filter(product_id=product_id, shard=shard, available__gte=quantity).update(
+        available=F('available') - quantity)
+
+
+# 재고를 가져간다. 모자라면 아무것도 가져가지 않고 False
+def take(product_id, quantity):
+    shards = _shards(product_id)
+    if shards is None:
+        return True
+    # 한 조각에서 다 가져올 수 있으면 그중 하나를 무작위로 (동시 요청이 서로 다른 행을 잡도록)
+    candidates = [shard for shard, available in shards.items() if available >= quantity]
+    random.shuffle(candidates)
+    for shard in candidates:
+        if _decrement(product_id, shard, quantity):
+            return True
+    # 조각마다 조금씩 남았다: 조각 순서대로 나눠 가져오고, 그래도 모자라면 가져온 만큼 돌려놓는다
+    taken = []
+    remaining = quantity
+    for shard, available in StockShard.objects.filter(product_id=product_id, available__gt=0).order_by(
+            'shard').values_list('shard', 'available'):
+        count = min(available, remaining)
+        if _decrement(product_id, shard, count):
+            taken.append((shard, count))
+            remaining -= count
+            if not remaining:
+                return True
+    for shard, count in taken:
+        StockShard.objects.filter(product_id=product_id, shard=shard).update(available=F('available') + count)
+    return False
+
+
+# 재고를 돌려놓는다 ({상품 id: 수량}). 상품마다 조각 하나에 UPDATE 한 번. 조각이 없으면 (재고를 새로 정했거나
+# 세지 않게 바꿨으면) 버린다
+def release(quantities):
+    for product_id, quantity in quantities.items():
+        if not quantity:
+            continue
+        shards = StockShard.objects.filter(product_id=product_id)
+        if not shards.filter(shard=random.randrange(SHARDS)).update(available=F('available') + quantity):
+            # 조각 수를 줄여 나눈 상품
+            shards.filter(shard=0).update(available=F('available') + quantity)
+
+
+# 지금 남은 재고 {상품 id: 수량} (재고를 세지 않는 상품은 None)
+def available(product_ids):
+    totals = dict(
+        StockShard.objects.filter(product__in=product_ids).values('product')
+        .annotate(total=Sum('available')).order_by().values_list('product', 'total')
+    )
+    missing = [product_id for product_id in product_ids if product_id not in totals]
+    if missing:
+        totals.update(Product.objects.filter(id__in=missing).values_list('id', 'stock'))
+    return totals
+
+
+# 장바구니에 담을 때 재고를 잡는다. 같은 상품을 또 담으면 수량을 더하고 기한을 늘린다
+def reserve(buyer, product_id, quantity=1, now=None):
+    expires_at = (now or timezone.now()) + CART_HOLD
+    with transaction.atomic():
+        if not take(product_id, quantity):
+            return False
+        holds = StockHold.objects.filter(buyer=buyer, product_id=product_id)
+        if not holds.update(quantity=F('quantity') + quantity, expires_at=expires_at):
+            try:
+                with transaction.atomic():
+                    StockHold.objects.create(buyer=buyer, product_id=product_id, quantity=quantity,
+                                             expires_at=expires_at)
+            except IntegrityError:
+                # 같은 구매자가 동시에 담았다
+                holds.update(quantity=F('quantity') + quantity, expires_at=expires_at)
+    return True
+
+
+# 장바구니에서 빼면 잡아 둔 재고를 돌려놓는다 (quantity 가 None 이면 전부)
+def unreserve(buyer, product_id, quantity=None):
+    with transaction.atomic():
+        hold = StockHold.objects.select_for_update().filter(buyer=buyer, product_id=product_id).first()
+        if hold is None:
+            return 0
+        count = hold.quantity if quantity is None else min(quantity, hold.quantity)
+        if count == hold.quantity:
+            hold.delete()
+        else:
+            StockHold.objects.filter(id=hold.id).update(quantity=F('quantity') - count)
+        release({product_id: count})
+    return count
+
+
+# 주문할 때 구매자의 홀드를 가져온다 {상품 id: 수량}. 홀드는 지우고 수량은 주문이 이어받는다
+# (기한이 지났어도 sweep 이 아직 돌려놓지 않았으면 그 재고는 여전히 빠져 있으므로 그대로 쓴다)
+def claim(buyer, product_ids):
+    holds = list(StockHold.objects.select_for_update().filter(buyer=buyer, product__in=product_ids))
+    StockHold.objects.filter(id__in=[hold.id for hold in holds]).delete()
+    return {hold.product_id: hold.quantity for hold in holds}
+
+
+# 결제를 시작할 때 주문이 재고를 잡고 있는지 확인한다. 기한이 지나 돌려놓았으면 다시 가져온다
+def hold_for_payment(order):
+    if order.stock_held or order.product.stock is None:
+        return True
+    with transaction.atomic():
+        if not take(order.product_id, order.quantity):
+            return False
+        Order.objects.filter(id=order.id).update(stock_held=order.quantity)
+    order.stock_held = order.quantity
+    return True
+
+
+# 기한이 지난 홀드와 결제되지 않은 주문의 재고를 한꺼번에 돌려놓는다
+def sweep(now=None, batch_size=BATCH_SIZE):
+    now = now or timezone.now()
+    released = {'holds': 0, 'orders': 0, 'units': 0}
+
+    def drain(queryset, finish, kind):
+        while True:
+            with transaction.atomic():
+                # 다른 워커나 결제가 잡고 있는 행은 건너뛴다
+                batch = list(queryset.select_for_update(skip_locked=True)[:batch_size])
+                if not batch:
+                    return
+                finish([row_id for row_id, _, _ in batch])
+                quantities = defaultdict(int)
+                for _, product_id, quantity in batch:
+                    quantities[product_id] += quantity
+                release(quantities)
+            released[kind] += len(batch)
+            released['units'] += sum(quantities.values())
+            if len(batch) < batch_size:
+                return
+
+    drain(
+        StockHold.objects.filter(expires_at__lt=now).order_by('expires_at', 'id')
+        .values_list('id', 'product_id', 'quantity'),
+        lambda ids: StockHold.objects.filter(id__in=ids).delete(),
+        'holds',
+    )
+    cutoff = now - PAYMENT_HOLD
+    drain(
+        Order.objects.filter(stock_held__gt=0, payment_status__in=UNPAID_STATUSES, date_ordered__lt=cutoff)
+        .filter(Q(kakao_ready_at__isnull=True) | Q(kakao_ready_at__lt=cutoff)).order_by('id')
+        .values_list('id', 'product_id', 'stock_held'),
+        lambda ids: Order.objects.filter(id__in=ids).update(stock_held=0, payment_status='expired', kakao_tid=None),
+        'orders',
+    )
+    return released
+
+
+# Product.stock 을 조각 합계 + 잡힌 수량으로 맞춘다 (restock 이 받는 값과 같은 뜻). 바뀐 상품만 UPDATE
+def checkpoint(batch_size=BATCH_SIZE):
+    totals = dict(
+        StockShard.objects.values('product').annotate(total=Sum('available')).order_by()
+        .values_list('product', 'total')
+    )
+    held = [
+        StockHold.objects.filter(product__in=totals).values('product')
+        .annotate(total=Sum('quantity')).order_by().values_list('product', 'total'),
+        Order.objects.filter(product__in=totals, stock_held__gt=0, payment_status__in=UNPAID_STATUSES)
+        .values('product').annotate(total=Sum('stock_held')).order_by().values_list('product', 'total'),
+    ]
+    for rows in held:
+        for product_id, total in rows:
+            totals[product_id] += total
+    changed = [
+        Product(id=product_id, stock=totals[product_id])
+        for product_id, stock in Product.objects.filter(id__in=totals).values_list('id', 'stock').iterator(
+            chunk_size=batch_size)
+        if stock != totals[product_id]
+    ]
+    Product.objects.bulk_update(changed, ['stock'], batch_size=batch_size)
+    return len(changed)
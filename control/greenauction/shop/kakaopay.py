@@ -0,0 +1,180 @@
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# 카카오페이 결제 게이트웨이
+# 스레드마다 연결 풀을 가진 requests.Session 하나를 재사용하고, 모든 호출에 connect/read 타임아웃을 건다.
+# 같은 partner_order_id 로 들어온 중복 요청은 캐시에 남긴 첫 응답을 돌려준다 (멱등성).
+
+API_URL = 'https://kapi.kakao.com'
+CID = 'TC0ONETIME'
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.2  # 초, 재시도마다 두 배
+POOL_SIZE = 20
+RETRY_STATUSES = (502, 503, 504)
+
+READY_TTL = 60 * 15  # ready 로 받은 tid 의 유효 시간
+APPROVE_TTL = 60 * 60 * 24
+LOCK_TIMEOUT = 30
+
+
+def _not_sent(exc):
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class KakaoPayError(Exception):
+    def __init__(self, message, status=None, payload=None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload or {}
+
+
+class KakaoPayClient:
+
+    def __init__(self, api_url=API_URL, api_key='', cid=CID, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF, pool_size=POOL_SIZE):
+        self.api_url = api_url.rstrip('/')
+        self.api_key = api_key
+        self.cid = cid
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'Authorization': f'KakaoAK {self.api_key}',
+                'Content-Type': 'application/x-www-form-urlencoded;charset=utf-8',
+            })
+        return session
+
+    def close(self):
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+            self._local.session = None
+
+    # 연결을 못 맺은 경우는 요청이 전달되지 않았으므로 항상 재시도한다.
+    # 그 밖의 끊김/읽기 타임아웃/5xx 는 업스트림이 이미 처리했을 수 있어서 retry_unsafe 일 때만 재시도한다.
+    def post(self, path, data, retry_unsafe=False):
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = self.session.post(f'{self.api_url}{path}', data=data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if last or not (retry_unsafe or _not_sent(exc)):
+                    raise KakaoPayError(f'KakaoPay {path} failed: {exc}') from exc
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and retry_unsafe and not last:
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            if response.status_code != 200:
+                raise KakaoPayError(f'KakaoPay {path} failed ({response.status_code})',
+                                    status=response.status_code, payload=payload)
+            return payload
+
+    # 멱등 호출: 같은 키의 성공 응답은 캐시에서, 동시에 들어온 같은 요청은 락으로 한 번만 보낸다
+    def idempotent(self, key, ttl, call):
+        result = cache.get(key)
+        if result is not None:
+            return result
+        lock = f'{key}:lock'
+        deadline = time.monotonic() + sum(self.timeout) * (self.max_retries + 1)
+        while not cache.add(lock, 1, LOCK_TIMEOUT):
+            if time.monotonic() > deadline:
+                raise KakaoPayError(f'KakaoPay request {key} is already in progress')
+            time.sleep(0.05)
+            result = cache.get(key)
+            if result is not None:
+                return result
+        try:
+            result = cache.get(key)
+            if result is None:
+                result = call()
+                cache.set(key, result, ttl)
+            return result
+        finally:
+            cache.delete(lock)
+
+    # 결제 준비. ready 는 새 tid 를 만들 뿐이라 재시도해도 안전하다
+    def ready(self, partner_order_id, partner_user_id, item_name, quantity, total_amount,
+              approval_url, fail_url, cancel_url, vat_amount=None, tax_free_amount=0):
+        data = {
+            'cid': self.cid,
+            'partner_order_id': partner_order_id,
+            'partner_user_id': partner_user_id,
+            'item_name': item_name,
+            'quantity': quantity,
+            'total_amount': total_amount,
+            'tax_free_amount': tax_free_amount,
+            'approval_url': approval_url,
+            'fail_url': fail_url,
+            'cancel_url': cancel_url,
+        }
+        if vat_amount is not None:
+            data['vat_amount'] = vat_amount
+        key = f'kakaopay:ready:{self.cid}:{partner_order_id}:{total_amount}'
+        return self.idempotent(key, READY_TTL, lambda: self.post('/v1/payment/ready', data, retry_unsafe=True))
+
+    # 결제 승인. 두 번 승인되면 안 되므로 연결 실패만 재시도한다
+    def approve(self, tid, partner_order_id, partner_user_id, pg_token):
+        data = {
+            'cid': self.cid,
+            'tid': tid,
+            'partner_order_id': partner_order_id,
+            'partner_user_id': partner_user_id,
+            'pg_token': pg_token,
+        }
+        key = f'kakaopay:approve:{self.cid}:{partner_order_id}:{tid}'
+        return self.idempotent(key, APPROVE_TTL, lambda: self.post('/v1/payment/approve', data))
+
+    # 결제 상태 조회 (읽기 전용이라 재시도해도 안전하다)
+    def order_status(self, tid):
+        return self.post('/v1/payment/order', {'cid': self.cid, 'tid': tid}, retry_unsafe=True)
+
+
+# 설정으로 만든 공유 클라이언트 (설정이 바뀌면 새로 만든다)
+def get_client():
+    config = (
+        getattr(settings, 'KAKAO_API_URL', API_URL),
+        settings.KAKAO_API_KEY,
+        getattr(settings, 'KAKAO_CID', CID),
+        (getattr(settings, 'KAKAO_CONNECT_TIMEOUT', CONNECT_TIMEOUT),
+         getattr(settings, 'KAKAO_READ_TIMEOUT', READ_TIMEOUT)),
+        getattr(settings, 'KAKAO_MAX_RETRIES', MAX_RETRIES),
+    )
+    client = _clients.get(config)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(config)
+            if client is None:
+                api_url, api_key, cid, timeout, max_retries = config
+                client = _clients[config] = KakaoPayClient(
+                    api_url, api_key, cid, timeout=timeout, max_retries=max_retries)
+    return client
@@ -0,0 +1,135 @@
+import bisect
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from . import pagecache
+from .models import CustomUser, Product, Review, SellerStats
+
+# 판매자 랭킹 (SellerStats 에 판매자별 누적 판매량을 유지한다)
+# 순위는 프로세스마다 들고 있는 판매량 정렬 목록에서 이진 탐색으로 구한다 (O(log n)).
+# 판매량이 바뀌면 RANK_SCOPE 버전을 올리고, 목록은 버전이 바뀌었을 때 RANK_REFRESH 초에 한 번까지만 다시 읽는다.
+# 그래서 순위는 최대 RANK_REFRESH 초 늦을 수 있다. 버전이 그대로여도 RANK_MAX_AGE 가 지나면 다시 읽는다 (판매자 탈퇴 등)
+
+RANK_SCOPE = 'leaderboard'
+RANK_REFRESH = 5
+RANK_MAX_AGE = 60 * 5
+
+_totals = (None, 0.0, [])  # (버전, 읽은 시각, 오름차순 판매량 목록)
+
+
+def ensure_seller(seller):
+    SellerStats.objects.get_or_create(seller=seller)
+
+
+# 상품의 판매자 누적 판매량에 delta 를 더한다
+def apply_sales_delta(product_id, units):
+    if not units:
+        return
+    pagecache.bump_on_commit(RANK_SCOPE)
+    rows = SellerStats.objects.filter(seller__products=product_id)
+    if rows.update(total_sales=F('total_sales') + units) or units < 0:
+        return
+    seller_id = Product.objects.filter(id=product_id).values_list('seller_id', flat=True).first()
+    if seller_id is None:
+        return
+    try:
+        with transaction.atomic():
+            SellerStats.objects.create(seller_id=seller_id, total_sales=units)
+    except IntegrityError:
+        SellerStats.objects.filter(seller_id=seller_id).update(total_sales=F('total_sales') + units)
+
+
+# 상품의 판매자 별점 집계에 리뷰 수/별점 합의 차이를 더한다
+def apply_rating_delta(product_id, count, total):
+    rows = SellerStats.objects.filter(seller__products=product_id)
+    if rows.update(rating_count=F('rating_count') + count, rating_sum=F('rating_sum') + total) or count < 0:
+        return
+    seller_id = Product.objects.filter(id=product_id).values_list('seller_id', flat=True).first()
+    if seller_id is None:
+        return
+    try:
+        with transaction.atomic():
+            SellerStats.objects.create(seller_id=seller_id, rating_count=count, rating_sum=total)
+    except IntegrityError:
+        SellerStats.objects.filter(seller_id=seller_id).update(
+            rating_count=F('rating_count') + count, rating_sum=F('rating_sum') + total)
+
+
+# 전체 판매자의 판매량 (오름차순)
+def sales_totals():
+    global _totals
+    version = pagecache.versions([RANK_SCOPE])[0]
+    built_version, built_at, totals = _totals
+    age = time.monotonic() - built_at
+    if (built_version != version and age >= RANK_REFRESH) or age >= RANK_MAX_AGE:
+        # (-total_sales, seller) 인덱스만 읽는다
+        totals = list(SellerStats.objects.order_by('total_sales').values_list('total_sales', flat=True))
+        _totals = (version, time.monotonic(), totals)
+    return totals
+
+
+# 판매자 순위 (동점이면 같은 순위). 자기 판매량은 바로 읽고, 더 많이 판 판매자 수는 정렬 목록에서 센다
+def rank_of(seller):
+    total = SellerStats.objects.filter(seller=seller).values_list('total_sales', flat=True).first()
+    if total is None:
+        return None
+    totals = sales_totals()
+    return len(totals) - bisect.bisect_right(totals, total) + 1
+
+
+# 상위 n 명 (평균 별점은 SellerStats 에 쌓아 둔 합/개수로 계산한다)
+def top(n=100):
+    return list(SellerStats.objects.select_related('seller').order_by('-total_sales', 'seller')[:n])
+
+
+# 주문 원본에서 전체 재계산 (판매량은 결제된 주문만 센다. stats.apply_order_delta 와 같은 기준)
+def rebuild():
+    # is_seller=True 는 "WHERE is_seller" 로 번역되어 인덱스를 못 타므로 IN 비교로 쓴다
+    totals = dict(
+        CustomUser.objects.filter(is_seller__in=[True])
+        .annotate(total=Sum('products__orders__quantity', filter=Q(products__orders__payment_status='paid')))
+        .values_list('id', 'total')
+    )
+    # 판매량과 같은 쿼리에서 리뷰까지 합치면 주문 x 리뷰 행으로 불어나므로 따로 센다
+    ratings = seller_rating_totals()
+    with transaction.atomic():
+        SellerStats.objects.all().delete()
+        SellerStats.objects.bulk_create(
+            [
+                SellerStats(seller_id=seller_id, total_sales=total or 0,
+                            rating_count=ratings.get(seller_id, (0, 0))[0],
+                            rating_sum=ratings.get(seller_id, (0, 0))[1])
+                for seller_id, total in totals.items()
+            ],
+            batch_size=1000,
+        )
+        pagecache.bump_on_commit(RANK_SCOPE)
+    return len(totals)
+
+
+# {판매자 id: (리뷰 수, 별점 합)}
+def seller_rating_totals(seller_ids=None):
+    reviews = Review.objects.all()
+    if seller_ids is not None:
+        reviews = reviews.filter(product__seller__in=seller_ids)
+    return {
+        seller_id: (count, total)
+        for seller_id, count, total in reviews.values('product__seller')
+        .annotate(count=Count('id'), total=Sum('rating')).order_by()
+        .values_list('product__seller', 'count', 'total')
+    }
+
+
+# 리뷰 원본에서 판매자 별점 집계만 다시 계산한다
+def rebuild_ratings(seller_ids=None, batch_size=1000):
+    totals = seller_rating_totals(seller_ids)
+    rows = SellerStats.objects.all()
+    if seller_ids is not None:
+        rows = rows.filter(seller__in=seller_ids)
+    rows = list(rows.only('seller', 'rating_count', 'rating_sum'))
+    for row in rows:
+        row.rating_count, row.rating_sum = totals.get(row.seller_id, (0, 0))
+    SellerStats.objects.bulk_update(rows, ['rating_count', 'rating_sum'], batch_size=batch_size)
+    return len(rows)
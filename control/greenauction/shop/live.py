@@ -0,0 +1,180 @@
+import asyncio
+import itertools
+import json
+import threading
+from contextlib import suppress
+from urllib.parse import parse_qs
+
+# 실시간 알림 (프로세스 안 pub/sub)
+# 상품 가격, 새 주문, 경매 입찰을 'product:<id>' / 'auction:<id>' 토픽으로 발행하고 SSE 연결로 내보낸다.
+# 연결마다 (토픽, 종류) 별로 마지막 이벤트 하나만 쌓아 둔다. 느린 클라이언트는 중간 값을 건너뛰고
+# 최신 값만 받으므로 연결당 메모리는 구독한 토픽 수로 묶인다 (backpressure).
+# Django 의 ASGI 핸들러는 요청마다 동기 미들웨어용 스레드를 잡고 응답이 끝날 때까지 놓지 않는다.
+# 그래서 asgi.py 가 이 경로만 asgi_app 으로 바로 보낸다 (연결당 코루틴 두 개, 스레드 없음).
+
+MAX_TOPICS = 20
+HEARTBEAT = 15.0  # 초, 프록시가 유휴 연결을 끊지 않도록 주석 한 줄을 보낸다
+RETRY_MS = 3000
+
+_event_ids = itertools.count(1)
+
+
+class Subscription:
+    __slots__ = ('topics', 'loop', 'pending', 'ready', 'dropped')
+
+    def __init__(self, topics, loop):
+        self.topics = topics
+        self.loop = loop
+        self.pending = {}  # (토픽, 종류) -> 이벤트
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    # 이벤트 루프 스레드에서만 호출된다
+    def offer(self, key, event):
+        if key in self.pending:
+            self.dropped += 1
+        self.pending[key] = event
+        self.ready.set()
+
+    # 새 이벤트를 기다려서 한 번에 가져간다. 시간이 지나면 빈 목록
+    async def get(self, timeout=HEARTBEAT):
+        if not self.pending:
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        events = list(self.pending.values())
+        self.pending.clear()
+        self.ready.clear()
+        return events
+
+
+def _offer_all(subscriptions, key, event):
+    for subscription in subscriptions:
+        subscription.offer(key, event)
+
+
+class Broker:
+
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, loop=None):
+        subscription = Subscription(tuple(topics), loop or asyncio.get_running_loop())
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._topics.get(topic, ()))
+            return len({s for subscribers in self._topics.values() for s in subscribers})
+
+    # 어느 스레드에서든 호출할 수 있다. 구독자가 없으면 아무 일도 하지 않는다
+    def publish(self, topic, kind, data):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        if not subscribers:
+            return 0
+        event = (next(_event_ids), kind, topic, data)
+        key = (topic, kind)
+        # call_soon_threadsafe 는 호출마다 루프를 깨우므로 루프마다 한 번만 부른다
+        by_loop = {}
+        for subscription in subscribers:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, batch in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_offer_all, batch, key, event)
+            except RuntimeError:
+                # 루프가 이미 닫혔다 (연결 정리 중)
+                for subscription in batch:
+                    self.unsubscribe(subscription)
+        return len(subscribers)
+
+
+broker = Broker()
+
+
+def publish(topic, kind, data):
+    return broker.publish(topic, kind, data)
+
+
+# {'product': ['1'], 'auction': ['3']} -> ['product:1', 'auction:3']
+def parse_topics(query):
+    topics = []
+    for kind in ('product', 'auction'):
+        for value in query.get(kind, ()):
+            if not value.isdigit():
+                raise ValueError(f'잘못된 {kind} 번호입니다.')
+            topics.append(f'{kind}:{int(value)}')
+    topics = list(dict.fromkeys(topics))
+    if not topics or len(topics) > MAX_TOPICS:
+        raise ValueError(f'구독할 토픽을 1~{MAX_TOPICS}개 지정하세요.')
+    return topics
+
+
+def format_event(event):
+    event_id, kind, topic, data = event
+    payload = json.dumps(dict(data, topic=topic), ensure_ascii=False, default=str)
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+# SSE 응답 본문. 연결이 끊기면 Django 가 이 제너레이터를 취소하고 finally 에서 구독을 푼다
+async def stream(topics, heartbeat=HEARTBEAT):
+    subscription = broker.subscribe(topics)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            events = await subscription.get(heartbeat)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            yield ''.join(format_event(event) for event in events)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),  # nginx 가 버퍼링하지 않도록
+]
+
+
+# 미들웨어를 거치지 않는 SSE 엔드포인트 (공개 데이터라 세션/인증이 필요 없다)
+async def asgi_app(scope, receive, send):
+    try:
+        topics = parse_topics(parse_qs(scope['query_string'].decode('latin-1')))
+    except ValueError as exc:
+        body = json.dumps({'error': str(exc)}, ensure_ascii=False).encode()
+        await send({'type': 'http.response.start', 'status': 400,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+        return
+    await send({'type': 'http.response.start', 'status': 200, 'headers': HEADERS})
+
+    async def pump():
+        async for chunk in stream(topics):
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    task = asyncio.ensure_future(pump())
+    try:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    finally:
+        # 취소가 stream 의 finally 까지 전달되어 구독이 풀린다
+        task.cancel()
+        with suppress(asyncio.CancelledError, OSError):
+            await task
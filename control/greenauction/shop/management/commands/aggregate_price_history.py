@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from shop import stats
+
+class Command(BaseCommand):
+    help = 'Upsert per-product daily average prices into PriceHistory from orders since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and reprocess every order')
+
+    def handle(self, *args, **options):
+        count = stats.aggregate_price_history(chunk_size=options['chunk_size'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Upserted {count} price history rows'))
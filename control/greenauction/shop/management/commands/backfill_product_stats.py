@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from shop import stats
+from shop.models import Product
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-product daily sales rollup from Order rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, nargs='*', help='Only rebuild these product ids')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(id__in=options['product']) if options['product'] else None
+        count = stats.backfill(products, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} daily stats rows'))
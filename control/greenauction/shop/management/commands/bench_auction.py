@@ -0,0 +1,168 @@
+import asyncio
+import json
+import random
+import secrets
+import statistics
+import time
+from datetime import timedelta
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+from greenauction.asgi import application
+from shop.models import Auction, Bid, CustomUser, Product
+
+
+# ASGI 애플리케이션을 직접 호출한다 (서버 없이 asgi.py 의 application 하나를 그대로 사용)
+async def call(method, path, headers=(), body=b''):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + list(headers),
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+    sent = False
+    response = {'status': None, 'body': b''}
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['body'] += message.get('body', b'')
+
+    await application(scope, receive, send)
+    return response['status'], response['body']
+
+
+class Command(BaseCommand):
+    help = 'Drive concurrent bidders against the ASGI application and check the auction invariants afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bidders', type=int, default=2000)
+        parser.add_argument('--bids', type=int, default=3, help='Bids per bidder')
+        parser.add_argument('--concurrency', type=int, default=500, help='Requests in flight at once')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated auction, users and sessions')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        run_id = secrets.token_hex(4)
+        seller = CustomUser.objects.create(username=f'bench_seller_{run_id}', is_seller=True, is_approved=True)
+        product = Product.objects.create(name=f'bench auction {run_id}', description='', price=10000, seller=seller)
+        auction = Auction.objects.create(product=product, starting_price=10000, min_increment=100,
+                                         ends_at=timezone.now() + timedelta(hours=1))
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_bidder_{run_id}_{i}', password='!') for i in range(options['bidders'])
+        ])
+        bidders = list(CustomUser.objects.filter(username__startswith=f'bench_bidder_{run_id}_'))
+        cookies = self.login(bidders)
+        self.stdout.write(f'auction {auction.id}: {len(bidders)} bidders x {options["bids"]} bids')
+
+        try:
+            timings = asyncio.run(self.run(auction, cookies, options['bids'], options['concurrency'], rng))
+            self.report(auction, timings)
+        finally:
+            if not options['keep']:
+                session_store = import_module(settings.SESSION_ENGINE).SessionStore
+                for cookie in cookies:
+                    session_store(session_key=cookie[0]).delete()
+                product.delete()
+                CustomUser.objects.filter(username__startswith=f'bench_bidder_{run_id}_').delete()
+                seller.delete()
+
+    # 입찰자마다 로그인된 세션과 CSRF 토큰을 만든다
+    def login(self, bidders):
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        cookies = []
+        for user in bidders:
+            session = session_store()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = backend
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            cookies.append((session.session_key, get_random_string(32)))
+        return cookies
+
+    async def run(self, auction, cookies, bids, concurrency, rng):
+        semaphore = asyncio.Semaphore(concurrency)
+        timings = {'highest': [], 'bid': []}
+        outcomes = {'highest': {}, 'bid': {}}
+        highest_path = reverse('auction_highest', args=[auction.id])
+        bid_path = reverse('auction_bid', args=[auction.id])
+
+        async def timed(kind, *args, **kwargs):
+            async with semaphore:
+                start = time.perf_counter()
+                status, body = await call(*args, **kwargs)
+                timings[kind].append(time.perf_counter() - start)
+                outcomes[kind][status] = outcomes[kind].get(status, 0) + 1
+                return status, body
+
+        async def bidder(session_key, csrf):
+            headers = [
+                (b'cookie', f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf}'.encode()),
+                (b'x-csrftoken', csrf.encode()),
+                (b'content-type', b'application/x-www-form-urlencoded'),
+            ]
+            for _ in range(bids):
+                _, body = await timed('highest', 'GET', highest_path)
+                minimum = float(json.loads(body)['minimum_next'])
+                amount = minimum + 100 * rng.randint(0, 20)
+                await timed('bid', 'POST', bid_path, headers, urlencode({'amount': amount}).encode())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bidder(*cookie) for cookie in cookies))
+        timings['elapsed'] = time.perf_counter() - start
+        timings['outcomes'] = outcomes
+        return timings
+
+    def report(self, auction, timings):
+        elapsed = timings['elapsed']
+        total = len(timings['highest']) + len(timings['bid'])
+        self.stdout.write(f'{total} requests in {elapsed:.1f}s: {total / elapsed:.0f} req/s')
+        for kind in ('highest', 'bid'):
+            values = sorted(timings[kind])
+            if values:
+                p50 = statistics.median(values) * 1000
+                p99 = values[max(int(len(values) * 0.99) - 1, 0)] * 1000
+                statuses = dict(sorted(timings['outcomes'][kind].items()))
+                self.stdout.write(f'{kind:>8}: p50 {p50:.1f} ms  p99 {p99:.1f} ms  status {statuses}')
+
+        # 불변식: 낙찰 후보는 하나, 최고가 = 입찰 최댓값, 입찰 수 = Bid 행 수
+        auction.refresh_from_db()
+        bids = Bid.objects.filter(auction=auction)
+        best = bids.order_by('-amount').first()
+        checks = {
+            'current_price == max(bid)': auction.current_price == bids.aggregate(top=Max('amount'))['top'],
+            'highest_bidder == max bidder': best is None or auction.highest_bidder_id == best.bidder_id,
+            'bid_count == bids': auction.bid_count == bids.count(),
+            'accepted == bids': timings['outcomes']['bid'].get(200, 0) == bids.count(),
+        }
+        for name, ok in checks.items():
+            self.stdout.write(f'  {name}: {"ok" if ok else "FAILED"}')
+        if all(checks.values()):
+            self.stdout.write(self.style.SUCCESS('Auction invariants hold'))
+        else:
+            self.stdout.write(self.style.ERROR('Auction invariants violated'))
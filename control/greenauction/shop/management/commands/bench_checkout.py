@@ -0,0 +1,98 @@
+import random
+import secrets
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from shop import checkout, inventory
+from shop.models import CustomUser, Order, Product
+
+
+class Command(BaseCommand):
+    help = 'Run many buyers checking out the same scarce products in parallel and check that stock never oversells'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=500)
+        parser.add_argument('--products', type=int, default=5)
+        parser.add_argument('--stock', type=int, default=200, help='Initial stock of every product')
+        parser.add_argument('--lines', type=int, default=3, help='Most products in one cart')
+        parser.add_argument('--workers', type=int, default=32, help='Checkouts in flight at once')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated products, users and orders')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        run_id = secrets.token_hex(4)
+        seller = CustomUser.objects.create(username=f'bench_seller_{run_id}', is_seller=True, is_approved=True)
+        products = Product.objects.bulk_create([
+            Product(name=f'bench stock {run_id} {i}', description='', price=1000 + i, stock=options['stock'],
+                    seller=seller)
+            for i in range(options['products'])
+        ])
+        product_ids = list(Product.objects.filter(seller=seller).values_list('id', flat=True))
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_buyer_{run_id}_{i}', password='!') for i in range(options['buyers'])
+        ])
+        buyers = list(CustomUser.objects.filter(username__startswith=f'bench_buyer_{run_id}_'))
+        carts = [
+            {product_id: rng.randint(1, 3)
+             for product_id in rng.sample(product_ids, rng.randint(1, min(options['lines'], len(product_ids))))}
+            for _ in buyers
+        ]
+        self.stdout.write(f'{len(buyers)} buyers, {len(products)} products x {options["stock"]} in stock')
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options['workers']) as pool:
+                results = list(pool.map(self.buy, buyers, carts))
+            elapsed = time.perf_counter() - start
+            self.report(results, elapsed, product_ids, options['stock'])
+        finally:
+            if not options['keep']:
+                Order.objects.filter(product__seller=seller).delete()
+                Product.objects.filter(seller=seller).delete()
+                CustomUser.objects.filter(username__startswith=f'bench_buyer_{run_id}_').delete()
+                seller.delete()
+
+    # 스레드마다 자기 DB 연결을 쓴다
+    def buy(self, buyer, cart):
+        start = time.perf_counter()
+        try:
+            orders = checkout.place_order(buyer, cart)
+            outcome = 'ok', sum(order.quantity for order in orders)
+        except checkout.OutOfStock:
+            outcome = 'out_of_stock', 0
+        except checkout.CheckoutError:
+            outcome = 'refused', 0
+        finally:
+            connection.close()
+        return outcome[0], outcome[1], time.perf_counter() - start
+
+    def report(self, results, elapsed, product_ids, initial):
+        outcomes = {}
+        for outcome, _, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        timings = sorted(duration for _, _, duration in results)
+        p50 = statistics.median(timings) * 1000
+        p99 = timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000
+        self.stdout.write(f'{len(results)} checkouts in {elapsed:.1f}s: {len(results) / elapsed:.0f}/s  '
+                          f'p50 {p50:.1f} ms  p99 {p99:.1f} ms  {dict(sorted(outcomes.items()))}')
+
+        # 불변식: 재고는 음수가 되지 않고, 처음 재고 - 남은 재고 = 주문된 수량
+        stock = inventory.available(product_ids)
+        sold = dict(Order.objects.filter(product__in=product_ids).values('product')
+                    .annotate(units=Sum('quantity')).order_by().values_list('product', 'units'))
+        checks = {
+            'stock >= 0': all(value >= 0 for value in stock.values()),
+            'initial - stock == ordered': all(initial - stock[pid] == sold.get(pid, 0) for pid in product_ids),
+            'accepted units == ordered': sum(units for _, units, _ in results) == sum(sold.values()),
+        }
+        for name, ok in checks.items():
+            self.stdout.write(f'  {name}: {"ok" if ok else "FAILED"}')
+        if all(checks.values()):
+            self.stdout.write(self.style.SUCCESS('No oversell: stock invariants hold'))
+        else:
+            self.stdout.write(self.style.ERROR('Stock invariants violated'))
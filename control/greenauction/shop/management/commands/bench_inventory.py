@@ -0,0 +1,68 @@
+import secrets
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from shop import inventory
+from shop.models import CustomUser, Product, StockHold
+
+
+class Command(BaseCommand):
+    help = 'Reserve and release stock of one hot product from many threads and report operations per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=5000, help='Reserve + release pairs')
+        parser.add_argument('--buyers', type=int, default=200)
+        parser.add_argument('--stock', type=int, default=100000)
+        parser.add_argument('--shards', type=int, default=inventory.SHARDS, help='1 = a single hot row')
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated product and users')
+
+    def handle(self, *args, **options):
+        run_id = secrets.token_hex(4)
+        seller = CustomUser.objects.create(username=f'bench_seller_{run_id}', is_seller=True, is_approved=True)
+        product = Product.objects.create(name=f'bench hot {run_id}', description='', price=1000, seller=seller)
+        inventory.restock(product.id, options['stock'], shards=options['shards'])
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_buyer_{run_id}_{i}', password='!') for i in range(options['buyers'])
+        ])
+        buyers = list(CustomUser.objects.filter(username__startswith=f'bench_buyer_{run_id}_'))
+        self.stdout.write(f'{options["operations"]} reserve/release pairs on one product, '
+                          f'{options["shards"]} shards, {options["workers"]} workers')
+
+        def work(i):
+            buyer = buyers[i % len(buyers)]
+            start = time.perf_counter()
+            try:
+                reserved = inventory.reserve(buyer, product.id)
+                if reserved:
+                    inventory.unreserve(buyer, product.id, 1)
+                return reserved, time.perf_counter() - start
+            finally:
+                connection.close()
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(options['workers']) as pool:
+                results = list(pool.map(work, range(options['operations'])))
+            elapsed = time.perf_counter() - start
+            timings = sorted(duration for _, duration in results)
+            p50 = statistics.median(timings) * 1000
+            p99 = timings[max(int(len(timings) * 0.99) - 1, 0)] * 1000
+            operations = 2 * sum(reserved for reserved, _ in results)
+            self.stdout.write(f'{operations} operations in {elapsed:.1f}s: {operations / elapsed:.0f} ops/s  '
+                              f'pair p50 {p50:.1f} ms  p99 {p99:.1f} ms')
+
+            held = sum(StockHold.objects.filter(product=product).values_list('quantity', flat=True))
+            total = inventory.available([product.id])[product.id] + held
+            if total == options['stock']:
+                self.stdout.write(self.style.SUCCESS('Stock conserved: available + held == initial stock'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Stock drifted: {total} != {options["stock"]}'))
+        finally:
+            if not options['keep']:
+                product.delete()
+                CustomUser.objects.filter(username__startswith=f'bench_buyer_{run_id}_').delete()
+                seller.delete()
@@ -0,0 +1,59 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+from shop.fake_kakao import FakeKakaoServer
+from shop.kakaopay import KakaoPayClient
+
+_order_ids = itertools.count(1)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark KakaoPay ready throughput against a local fake server with injected latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every upstream response')
+
+    def handle(self, *args, **options):
+        total, concurrency = options['requests'], options['concurrency']
+        with FakeKakaoServer(latency=options['latency']) as server:
+            client = KakaoPayClient(server.url, 'bench', pool_size=concurrency)
+
+            def unpooled(_):
+                # 예전 방식: 요청마다 새 연결, 타임아웃 없음
+                requests.post(f'{server.url}/v1/payment/ready', data=self.ready_data(next(_order_ids))).json()
+
+            def pooled(_):
+                client.ready(**self.ready_data(next(_order_ids)))
+
+            for name, run in [
+                ('unpooled requests.post', lambda: self.threaded(unpooled, total, concurrency)),
+                ('pooled client, threads', lambda: self.threaded(pooled, total, concurrency)),
+            ]:
+                connections = len(server.connections)
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'{name:>24}  {total / elapsed:8.1f} req/s  '
+                    f'{len(server.connections) - connections:5d} new connections')
+
+    def threaded(self, func, total, concurrency):
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(func, range(total)))
+
+    def ready_data(self, order_id):
+        return {
+            'partner_order_id': order_id,
+            'partner_user_id': 1,
+            'item_name': 'bench',
+            'quantity': 1,
+            'total_amount': 1000,
+            'approval_url': 'http://localhost/success/',
+            'fail_url': 'http://localhost/fail/',
+            'cancel_url': 'http://localhost/cancel/',
+        }
@@ -0,0 +1,120 @@
+import asyncio
+import gc
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from greenauction.asgi import application
+from shop import live
+
+
+# 유휴 SSE 연결 하나. 서버 없이 asgi.py 의 application 을 직접 호출하고, closed 가 set 되면 연결을 끊는다
+class Connection:
+    __slots__ = ('status', 'received', 'closed', 'task')
+
+    def __init__(self):
+        self.status = None
+        self.received = None  # 이벤트를 받은 시각
+        self.closed = asyncio.Event()
+        self.task = None
+
+    def open(self, path, query):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 80),
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await self.closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                self.status = message['status']
+            elif message['type'] == 'http.response.body' and b'event: ' in message.get('body', b''):
+                self.received = time.perf_counter()
+
+        self.task = asyncio.ensure_future(application(scope, receive, send))
+
+
+class Command(BaseCommand):
+    help = 'Open many idle server-sent event connections and measure memory per connection and fan-out latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000)
+        parser.add_argument('--topics', type=int, default=100, help='Products the connections are spread over')
+        parser.add_argument('--events', type=int, default=5, help='Price updates published to every topic')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['connections'], options['topics'], options['events']))
+
+    async def wait_for(self, condition, timeout=120):
+        deadline = time.perf_counter() + timeout
+        while not condition():
+            if time.perf_counter() > deadline:
+                raise TimeoutError
+            await asyncio.sleep(0.05)
+
+    async def run(self, count, topics, events):
+        path = reverse('live_events')
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        connections = []
+        for i in range(count):
+            connection = Connection()
+            connection.open(path, f'product={i % topics + 1}')
+            connections.append(connection)
+            if i % 500 == 0:
+                await asyncio.sleep(0)
+        await self.wait_for(lambda: live.broker.subscriber_count() == count)
+        opened = time.perf_counter() - start
+        gc.collect()
+        per_connection = (tracemalloc.get_traced_memory()[0] - before) / count
+        tracemalloc.stop()
+        statuses = {connection.status for connection in connections}
+        self.stdout.write(f'{count} connections open in {opened:.1f}s (status {statuses}), '
+                          f'{per_connection / 1024:.1f} KiB per connection')
+
+        # 모든 토픽에 가격을 연달아 발행한다. 느린 연결은 마지막 값만 받는다
+        latencies = []
+        for _ in range(events):
+            for connection in connections:
+                connection.received = None
+            sent = time.perf_counter()
+            for topic in range(1, topics + 1):
+                for price in range(10):
+                    live.publish(f'product:{topic}', 'price', {'product_id': topic, 'price': str(price)})
+            await self.wait_for(lambda: all(connection.received for connection in connections))
+            latencies.extend(connection.received - sent for connection in connections)
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+        self.stdout.write(f'fan-out to {count} connections: p50 {p50:.1f} ms  p99 {p99:.1f} ms')
+
+        for connection in connections:
+            connection.closed.set()
+        await asyncio.gather(*(connection.task for connection in connections))
+        if live.broker.subscriber_count() == 0:
+            self.stdout.write(self.style.SUCCESS('All subscriptions released after disconnect'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{live.broker.subscriber_count()} subscriptions leaked'))
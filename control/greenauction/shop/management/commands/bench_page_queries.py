@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from shop.models import CustomUser, Product
+
+# 비교할 세션/인증 설정. before 는 이전 기본값 (DB 세션, 요청마다 사용자 조회)
+MODES = {
+    'before': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    },
+    'after': {},
+}
+TABLES = ('django_session', 'shop_customuser')
+
+
+class Command(BaseCommand):
+    help = 'Report DB queries per authenticated page with the old database sessions and the current settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Existing user to browse as (default: first buyer)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per page after a warm-up request')
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_seller=False)
+        user = users.filter(username=options['username']).first() if options['username'] else users.first()
+        product = Product.objects.only('id').first()
+        if user is None or product is None:
+            raise CommandError('Needs at least one buyer and one product (run create_dummy_data first)')
+        pages = {
+            'profile': reverse('profile'),
+            'purchase_history': reverse('purchase_history'),
+            'cart': reverse('cart'),
+            'product_list': reverse('product_list'),
+            'product_detail': reverse('product_detail', args=[product.id]),
+        }
+        self.stdout.write(f'browsing as {user.username}, {options["requests"]} requests per page '
+                          f'(SESSION_ENGINE={settings.SESSION_ENGINE})')
+        self.stdout.write(f'{"page":<18}{"before":>10}{"after":>10}   session+user queries before/after')
+
+        results = {name: {} for name in pages}
+        for mode, overrides in MODES.items():
+            with override_settings(**overrides):
+                cache.clear()
+                client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost')
+                client.force_login(user, backend=settings.AUTHENTICATION_BACKENDS[0])
+                for name, url in pages.items():
+                    client.get(url)
+                    total = auth = 0
+                    for _ in range(options['requests']):
+                        with CaptureQueriesContext(connection) as queries:
+                            client.get(url)
+                        total += len(queries)
+                        auth += sum(any(f'"{table}"' in query['sql'] or f'`{table}`' in query['sql']
+                                        for table in TABLES) for query in queries)
+                    results[name][mode] = (total / options['requests'], auth / options['requests'])
+                client.logout()
+
+        for name, modes in results.items():
+            before, after = modes['before'], modes['after']
+            self.stdout.write(f'{name:<18}{before[0]:>10.1f}{after[0]:>10.1f}   {before[1]:.1f} / {after[1]:.1f}')
+        saved = sum(modes['before'][0] - modes['after'][0] for modes in results.values()) / len(results)
+        self.stdout.write(self.style.SUCCESS(f'{saved:.1f} fewer queries per authenticated page on average'))
@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+from shop.models import Product
+
+
+# 서버 없이 WSGI 핸들러를 직접 호출한다. 테스트 Client 와 달리 요청이 끝날 때 DB 연결 정리(CONN_MAX_AGE)까지 그대로 거친다
+def call(application, path, host):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    response = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return int(status[0].split()[0])
+
+
+class Command(BaseCommand):
+    help = 'Measure requests per second on the main pages, optionally against another settings module'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per page')
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--against', help='Settings module to run the same benchmark with for comparison '
+                                              '(e.g. greenauction.settings)')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON only')
+
+    def handle(self, *args, **options):
+        results = self.run(options['requests'], options['threads'])
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        columns = {settings.SETTINGS_MODULE: results}
+        if options['against']:
+            columns = {options['against']: self.run_with(options['against'], options), **columns}
+        names = list(columns)
+        self.stdout.write(f'{options["requests"]} requests per page, {options["threads"]} threads')
+        self.stdout.write(f'{"page":<18}' + ''.join(f'{name[-28:]:>30}' for name in names))
+        for page in results:
+            self.stdout.write(f'{page:<18}' + ''.join(f'{columns[name][page]:>26.0f} rps' for name in names))
+        if len(names) == 2:
+            before, after = (sum(columns[name].values()) for name in names)
+            self.stdout.write(self.style.SUCCESS(f'{after / before:.2f}x requests per second overall'))
+
+    # 다른 설정 모듈은 설치된 앱/미들웨어가 달라 같은 프로세스에서 바꿀 수 없으므로 따로 띄운다
+    def run_with(self, module, options):
+        command = [sys.executable, sys.argv[0], 'bench_rps', '--json', f'--settings={module}',
+                   f'--requests={options["requests"]}', f'--threads={options["threads"]}']
+        result = subprocess.run(command, capture_output=True, text=True, env=os.environ)
+        if result.returncode:
+            raise CommandError(f'{module} failed:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def run(self, count, threads):
+        product = Product.objects.only('id').order_by('id').first()
+        if product is None:
+            raise CommandError('Needs products (run create_dummy_data first)')
+        pages = {
+            'home': reverse('home'),
+            'product_list': reverse('product_list'),
+            'product_detail': reverse('product_detail', args=[product.id]),
+            'category': reverse('category'),
+            'compare_prices': reverse('compare_prices'),
+            'seller_ranking': reverse('seller_ranking'),
+        }
+        connections.close_all()
+
+        application = get_wsgi_application()
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        results = {}
+        for name, path in pages.items():
+            status = call(application, path, host)  # 캐시/템플릿 준비
+            if status != 200:
+                raise CommandError(f'{path} returned {status}')
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                statuses = list(pool.map(lambda _: call(application, path, host), range(count)))
+            elapsed = time.perf_counter() - start
+            if set(statuses) != {200}:
+                raise CommandError(f'{path} returned {sorted(set(statuses))}')
+            results[name] = count / elapsed
+        return results
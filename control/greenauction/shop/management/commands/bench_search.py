@@ -0,0 +1,68 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from shop import search
+from shop.models import Product, CustomUser
+
+WORDS = ['딸기', '설향', '샤인머스캣', '포도', '사과', '유기농', '국산', '제철', '특품', '선물용',
+         'strawberry', 'shine', 'muscat', 'organic', 'fresh', 'premium', 'box', 'farm']
+QUERIES = ['딸기', '샤인머스캣', '유기농 사과', 'straw', 'premium box']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare search index latency against the name__icontains scan (data is rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self.run(size, options['repeat'], random.Random(options['seed']))
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, size, repeat, rng):
+        # 실제 카탈로그처럼 드문 단어가 많은 어휘를 만든다
+        syllables = [chr(code) for code in range(0xAC00, 0xD7A4, 97)]
+        vocab = WORDS + [''.join(rng.choices(syllables, k=rng.randint(2, 4))) for _ in range(5000)]
+        seller = CustomUser.objects.create(username=f'bench_seller_{size}', is_seller=True)
+        batch = []
+        for i in range(size):
+            name = ' '.join(rng.sample(vocab, 3)) + f' {i}'
+            description = ' '.join(rng.choices(vocab, k=12))
+            batch.append(Product(name=name, description=description, price=rng.randint(1, 100) * 1000, seller=seller))
+            if len(batch) >= 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench_index.sqlite3')
+            search.rebuild(Product.objects.filter(seller=seller), path=path)
+            for query in QUERIES:
+                scan = self.measure(repeat, lambda: list(
+                    Product.objects.filter(name__icontains=query).values_list('id', flat=True)))
+                indexed = self.measure(repeat, lambda: search.search(query, path=path))
+                self.stdout.write(f'{size:>9} {query!r:>16}  icontains {scan:8.2f} ms  index {indexed:8.2f} ms')
+            search.close_connections()
+
+    def measure(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from shop.storage import brotli
+
+
+def size(paths):
+    return sum(path.stat().st_size for path in paths)
+
+
+class Command(BaseCommand):
+    help = 'Collect the referenced static files with hashed names and precompressed copies, then report sizes'
+
+    def handle(self, *args, **options):
+        if not settings.STATIC_ROOT:
+            raise CommandError('Set STATIC_ROOT (use --settings=greenauction.settings_production)')
+        call_command('collectstatic', interactive=False, clear=True, verbosity=0)
+
+        root = Path(settings.STATIC_ROOT)
+        manifest = json.loads((root / 'staticfiles.json').read_text())['paths']
+        # 앱(admin) 파일은 빼고 STATICFILES_DIRS 에서 온 것만 비교한다
+        sources = {}
+        for directory in settings.STATICFILES_DIRS:
+            prefix, base = directory if isinstance(directory, tuple) else ('', directory)
+            for path in Path(base).rglob('*'):
+                if path.is_file():
+                    name = path.relative_to(base).as_posix()
+                    sources[f'{prefix}/{name}' if prefix else name] = path
+        collected = sorted(name for name in manifest if name in sources)
+        self.stdout.write(f'static/: {len(sources)} files, {size(sources.values()) / 1024:.0f} KB -> '
+                          f'{len(collected)} referenced files, {size(root / name for name in collected) / 1024:.0f} KB')
+        if brotli is None:
+            self.stdout.write('brotli is not installed: only .gz copies were written')
+
+        self.stdout.write(f'{"file":<48}{"raw":>10}{"gzip":>10}{"br":>10}')
+        for name in collected:
+            path = root / manifest[name]
+            sizes = [path.stat().st_size] + [
+                variant.stat().st_size if (variant := path.with_name(path.name + suffix)).is_file() else None
+                for suffix in ('.gz', '.br')
+            ]
+            self.stdout.write(f'{manifest[name][-47:]:<48}' + ''.join(
+                f'{value / 1024:>7.1f} KB' if value is not None else f'{"-":>10}' for value in sizes))
+        self.stdout.write(self.style.SUCCESS(f'{len(manifest)} files in {root}'))
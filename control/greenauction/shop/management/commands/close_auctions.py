@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from shop import bidding
+
+class Command(BaseCommand):
+    help = 'Close auctions past their end time and create an unpaid order for each winner'
+
+    def handle(self, *args, **options):
+        closed = bidding.close_due()
+        self.stdout.write(self.style.SUCCESS(f'Closed {closed} auctions'))
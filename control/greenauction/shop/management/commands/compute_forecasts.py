@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from shop import forecast
+
+class Command(BaseCommand):
+    help = 'Compute price forecasts for all products in one pass and warm the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, nargs='*', help='Only these product ids')
+
+    def handle(self, *args, **options):
+        count = forecast.forecast_all(options['product'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Cached forecasts for {count} products'))
@@ -1,50 +1,216 @@
-import random
+import time
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
-from shop.models import Product, CustomUser, Order
-from datetime import datetime, timedelta
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from shop import leaderboard, ratings, search, stats
+from shop.models import Category, Product, CustomUser, Order, PriceHistory, Review
+
+# 카테고리: (slug, 이름, 영문 이름, 기준 가격, 제철 월)
+CATEGORIES = [
+    ('strawberry', '딸기', 'Strawberry', 15000, 3),
+    ('shine-muscat', '샤인머스캣', 'Shine Muscat', 25000, 9),
+    ('apple', '사과', 'Apple', 20000, 10),
+    ('peach', '복숭아', 'Peach', 22000, 7),
+    ('tangerine', '귤', 'Tangerine', 12000, 12),
+    ('melon', '참외', 'Melon', 18000, 6),
+]
+ADJECTIVES = ['유기농', '산지직송', '특품', '가정용', '선물용', '못난이', '프리미엄', '제철']
+REVIEW_TEXTS = ['신선해요', '달아요', '배송이 빨라요', '재구매 의사 있어요', '포장이 꼼꼼해요', '보통이에요', '조금 물러요']
+RATING_WEIGHTS = [0.04, 0.06, 0.15, 0.35, 0.40]
+
+
+def zipf_weights(n, exponent, rng):
+    # 순위 r 의 인기도 ~ 1 / r^exponent, 순위는 무작위로 섞는다
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def seasonal_factor(day_of_year, peak_month, amplitude=0.2):
+    # 제철에 가장 싸고 반대편 계절에 가장 비싸다
+    peak = (peak_month - 0.5) * 30.4
+    return 1 + amplitude * -np.cos(2 * np.pi * (day_of_year - peak) / 365.25)
+
 
 class Command(BaseCommand):
-    help = 'Create dummy data for testing'
-
-    def handle(self, *args, **kwargs):
-        # Create sellers
-        sellers = []
-        for i in range(1, 4):
-            seller = CustomUser.objects.create_user(
-                username=f'seller{i}', 
-                email=f'seller{i}@example.com', 
-                password='password123', 
-                is_seller=True
-            )
-            sellers.append(seller)
-        
-        # Create products
-        products = [
-            {'name': 'Shine Muscat 1', 'price': 20, 'seller': sellers[0]},
-            {'name': 'Shine Muscat 2', 'price': 25, 'seller': sellers[1]},
-            {'name': 'Shine Muscat 3', 'price': 22, 'seller': sellers[2]},
-            {'name': 'Strawberry 1', 'price': 10, 'seller': sellers[0]},
-            {'name': 'Strawberry 2', 'price': 12, 'seller': sellers[1]},
-            {'name': 'Strawberry 3', 'price': 15, 'seller': sellers[2]},
-        ]
-        
-        for product in products:
-            p = Product.objects.create(
-                name=product['name'], 
-                price=product['price'], 
-                seller=product['seller']
+    help = 'Create dummy data for testing (bulk, deterministic, sized by flags)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sellers', type=int, default=3)
+        parser.add_argument('--buyers', type=int, default=10)
+        parser.add_argument('--products', type=int, default=6)
+        parser.add_argument('--orders', type=int, default=42)
+        parser.add_argument('--reviews', type=int, default=10)
+        parser.add_argument('--price-days', type=int, default=30, help='Days of PriceHistory per product')
+        parser.add_argument('--order-days', type=int, default=7, help='Spread orders over this many past days')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--password', default='password123')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Do not rebuild the sales rollups, leaderboard and search index afterwards')
+
+    def handle(self, *args, **options):
+        self.rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        password = make_password(options['password'])  # 해시는 한 번만 계산한다
+        seller_ids = self.create_users('seller', options['sellers'], password, is_seller=True)
+        buyer_ids = self.create_users('buyer', options['buyers'], password)
+        categories = self.create_categories()
+        products = self.create_products(options['products'], seller_ids, categories)
+        self.create_price_history(products, options['price_days'])
+        if len(products['ids']):
+            self.create_orders(options['orders'], products, buyer_ids or seller_ids, options['order_days'])
+            self.create_reviews(options['reviews'], products, buyer_ids or seller_ids)
+
+        if not options['skip_derived']:
+            self.log('rebuilding rollups')
+            stats.backfill(batch_size=self.batch_size)
+            leaderboard.rebuild()
+            ratings.rebuild(batch_size=self.batch_size)
+            search.rebuild(Product.objects.all(), batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dummy data created successfully in {time.perf_counter() - started:.1f}s!'))
+
+    def log(self, message):
+        self.stdout.write(f'  {message}')
+
+    def bulk(self, model, objects, **kwargs):
+        model.objects.bulk_create(objects, batch_size=self.batch_size, **kwargs)
+
+    def create_users(self, role, count, password, is_seller=False):
+        ids = []
+        for start in range(1, count + 1, self.batch_size):
+            usernames = [f'{role}{i}' for i in range(start, min(start + self.batch_size, count + 1))]
+            self.bulk(CustomUser, [
+                CustomUser(username=name, email=f'{name}@example.com', password=password,
+                           is_seller=is_seller, is_approved=is_seller)
+                for name in usernames
+            ], ignore_conflicts=True)
+            ids.extend(CustomUser.objects.filter(username__in=usernames).order_by('id').values_list('id', flat=True))
+        self.log(f'{len(ids)} {role}s')
+        return ids
+
+    def create_categories(self):
+        categories = []
+        for slug, name, english, base_price, peak_month in CATEGORIES:
+            category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': name})
+            categories.append((category.id, name, english, base_price, peak_month))
+        return categories
+
+    def create_products(self, count, seller_ids, categories):
+        last_id = Product.objects.aggregate(last=Max('id'))['last'] or 0
+        category_index = self.rng.integers(len(categories), size=count)
+        seller_index = self.rng.choice(len(seller_ids), size=count, p=zipf_weights(len(seller_ids), 0.8, self.rng))
+        # 가격은 카테고리 기준가 주변의 로그정규 분포, 100원 단위
+        multipliers = self.rng.lognormal(0, 0.25, size=count)
+        adjectives = self.rng.integers(len(ADJECTIVES), size=count)
+
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                category_id, name, english, base_price, _ = categories[category_index[i]]
+                price = max(100, int(base_price * multipliers[i] / 100) * 100)
+                batch.append(Product(
+                    name=f'{english} {i + 1}',
+                    description=f'{ADJECTIVES[adjectives[i]]} {name} {i + 1}',
+                    price=price,
+                    seller_id=seller_ids[seller_index[i]],
+                    category_id=category_id,
+                ))
+            self.bulk(Product, batch)
+
+        rows = list(Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'price', 'category_id'))
+        peaks = {category_id: peak_month for category_id, _, _, _, peak_month in categories}
+        self.log(f'{len(rows)} products')
+        return {
+            'ids': np.array([row[0] for row in rows]),
+            'prices': np.array([float(row[1]) for row in rows]),
+            'peaks': np.array([peaks[row[2]] for row in rows]),
+        }
+
+    def create_price_history(self, products, days):
+        today = timezone.localdate(self.now)
+        dates = [today - timedelta(days=offset) for offset in range(days, 0, -1)]
+        day_of_year = np.array([d.timetuple().tm_yday for d in dates])
+        total = 0
+        batch = []
+        for product_id, price, peak in zip(products['ids'], products['prices'], products['peaks']):
+            noise = self.rng.normal(1, 0.03, size=days)
+            series = np.round(price * seasonal_factor(day_of_year, peak) * noise, 2)
+            batch.extend(
+                PriceHistory(product_id=int(product_id), date=d, average_price=Decimal(f'{value:.2f}'))
+                for d, value in zip(dates, series)
             )
-            # Create order history for the past week
-            for days_ago in range(7):
-                order_date = datetime.now() - timedelta(days=days_ago)
-                quantity = random.randint(1, 10)
-                Order.objects.create(
-                    product=p, 
-                    buyer=sellers[0],  # Using the first seller as the buyer for simplicity
-                    quantity=quantity,
-                    total_price=product['price'] * quantity,
-                    date_ordered=order_date
-                )
-        
-        self.stdout.write(self.style.SUCCESS('Dummy data created successfully!'))
+            if len(batch) >= self.batch_size:
+                self.bulk(PriceHistory, batch, ignore_conflicts=True)
+                total += len(batch)
+                batch = []
+        self.bulk(PriceHistory, batch, ignore_conflicts=True)
+        self.log(f'{total + len(batch)} price history rows')
+
+    def create_orders(self, count, products, buyer_ids, days):
+        # 주문은 양이 가장 많으므로 모델 인스턴스를 만들지 않고 executemany 로 바로 넣는다
+        product_weights = zipf_weights(len(products['ids']), 1.1, self.rng)
+        buyer_weights = zipf_weights(len(buyer_ids), 0.7, self.rng)
+        buyer_ids = np.array(buyer_ids)
+        span = max(days, 1) * 86400
+        now = np.datetime64(self.now.astimezone(dt_timezone.utc).replace(tzinfo=None), 'us')
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(Order._meta.get_field(name).column)
+                            for name in ['product', 'buyer', 'quantity', 'total_price', 'date_ordered',
+                                         'payment_status', 'paid_at', 'stock_held'])
+        sql = f'INSERT INTO {quote(Order._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)'
+
+        with connection.cursor() as cursor:
+            for start in range(0, count, self.batch_size):
+                size = min(self.batch_size, count - start)
+                product_index = self.rng.choice(len(products['ids']), size=size, p=product_weights)
+                buyers = buyer_ids[self.rng.choice(len(buyer_ids), size=size, p=buyer_weights)]
+                quantities = np.minimum(self.rng.geometric(0.55, size=size), 10)
+                when = now - self.rng.integers(0, span * 10**6, size=size).astype('timedelta64[us]')
+                day_of_year = (when.astype('datetime64[D]') - when.astype('datetime64[Y]')).astype(int) + 1
+                unit_prices = np.round(
+                    products['prices'][product_index] * seasonal_factor(day_of_year, products['peaks'][product_index]), -1)
+                timestamps = np.char.replace(np.datetime_as_string(when, unit='us'), 'T', ' ').tolist()
+                with transaction.atomic():
+                    # 과거 주문은 모두 결제가 끝난 것으로 만든다
+                    cursor.executemany(sql, zip(
+                        products['ids'][product_index].tolist(),
+                        buyers.tolist(),
+                        quantities.tolist(),
+                        (quantities * unit_prices).astype(np.int64).tolist(),
+                        timestamps,
+                        ['paid'] * size,
+                        timestamps,
+                        [0] * size,
+                    ))
+                if (start // self.batch_size) % 50 == 49:
+                    self.log(f'{start + size}/{count} orders')
+        self.log(f'{count} orders')
+
+    def create_reviews(self, count, products, buyer_ids):
+        if not count:
+            return
+        product_index = self.rng.choice(len(products['ids']), size=count,
+                                        p=zipf_weights(len(products['ids']), 1.1, self.rng))
+        buyers = self.rng.choice(buyer_ids, size=count)
+        ratings = self.rng.choice(5, size=count, p=RATING_WEIGHTS) + 1
+        texts = self.rng.integers(len(REVIEW_TEXTS), size=count)
+        for start in range(0, count, self.batch_size):
+            end = min(start + self.batch_size, count)
+            self.bulk(Review, [
+                Review(product_id=int(products['ids'][product_index[i]]), user_id=int(buyers[i]),
+                       content=REVIEW_TEXTS[texts[i]], rating=int(ratings[i]))
+                for i in range(start, end)
+            ])
+        self.log(f'{count} reviews')
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from shop import leaderboard
+
+class Command(BaseCommand):
+    help = 'Recompute per-seller sales totals used by the seller ranking'
+
+    def handle(self, *args, **options):
+        count = leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Ranked {count} sellers'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from shop import ratings
+
+class Command(BaseCommand):
+    help = 'Recompute product and seller review rating totals from Review rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, nargs='*', help='Only rebuild these product ids')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = ratings.rebuild(options['product'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired ratings on {count} products'))
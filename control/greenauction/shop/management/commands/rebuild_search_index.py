@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from shop import search
+from shop.models import Product
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = search.rebuild(Product.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products into {search.get_index_path()}'))
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from shop import settlement
+
+class Command(BaseCommand):
+    help = 'Check stale KakaoPay tids with Kakao and mark their orders paid or expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=int(settlement.STALE_READY.total_seconds() // 60),
+                            help='Only orders whose payment was requested at least this long ago')
+        parser.add_argument('--batch-size', type=int, default=settlement.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        counts = settlement.reconcile(older_than=timedelta(minutes=options['minutes']),
+                                      batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled payments: {counts['paid']} paid, {counts['expired']} expired, {counts['skipped']} skipped"))
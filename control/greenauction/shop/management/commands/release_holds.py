@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from shop import inventory
+
+class Command(BaseCommand):
+    help = 'Return stock held by expired carts and unpaid orders, then write shard totals back to products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=inventory.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = inventory.sweep(batch_size=options['batch_size'])
+        changed = inventory.checkpoint(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Released {released['units']} units from {released['holds']} cart holds and {released['orders']} "
+            f"unpaid orders; {changed} product stock totals updated"))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from shop import settlement
+
+class Command(BaseCommand):
+    help = 'Approve queued KakaoPay success callbacks in batches and mark their orders paid'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settlement.BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=settlement.APPROVE_WORKERS)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of draining it once')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        totals = {'paid': 0, 'failed': 0, 'retry': 0}
+        while True:
+            counts = settlement.settle_pending(batch_size=options['batch_size'], workers=options['workers'])
+            for key, value in counts.items():
+                totals[key] += value
+            if not any(counts.values()) or counts['retry'] == sum(counts.values()):
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Settled payments: {totals['paid']} paid, {totals['failed']} failed, {totals['retry']} to retry"))
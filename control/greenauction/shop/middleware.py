@@ -0,0 +1,124 @@
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_etags
+
+# 운영에서 앱 프로세스가 정적 파일을 직접 내보낸다 (WhiteNoise 방식)
+# 시작할 때 STATIC_ROOT 를 한 번 훑어 파일 정보와 미리 압축한 .br/.gz 를 기억해 두고, 요청마다 디스크를 뒤지지 않는다.
+# 이름에 해시가 붙은 파일(staticfiles.json)은 내용이 바뀌면 이름도 바뀌므로 1년 동안 캐시해도 된다.
+# collectstatic 을 다시 하면 프로세스를 다시 띄워야 새 파일이 보인다.
+# 원본/.gz/.br 은 바이트가 다르므로 ETag 도 따로 둔다 (뒤에 -gz, -br 을 붙인다)
+
+CACHE_FOREVER = 'public, max-age=31536000, immutable'
+CACHE_SHORT = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # 먼저 적은 것을 고른다 (q 값으로 순서를 바꾸지 않는다)
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class StaticFile:
+    __slots__ = ('variants', 'content_type', 'cache_control', 'last_modified')
+
+    def __init__(self, path, hashed):
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith(TEXT_TYPES):
+            content_type += '; charset=utf-8'
+        stat = path.stat()
+        etag = f'{stat.st_size:x}-{int(stat.st_mtime):x}'
+        # (인코딩, 경로, 크기, ETag). 원본은 마지막
+        self.variants = [
+            (encoding, compressed, compressed.stat().st_size, f'"{etag}-{suffix[1:]}"')
+            for encoding, suffix in ENCODINGS
+            if (compressed := path.with_name(path.name + suffix)).is_file()
+        ] + [(None, path, stat.st_size, f'"{etag}"')]
+        self.content_type = content_type
+        self.cache_control = CACHE_FOREVER if hashed else CACHE_SHORT
+        self.last_modified = http_date(stat.st_mtime)
+
+    def pick(self, accept_encoding):
+        weights = accepted_encodings(accept_encoding)
+        return next(variant for variant in self.variants
+                    if variant[0] is None or weights.get(variant[0], weights.get('*', 0)) > 0)
+
+
+# Accept-Encoding 을 {인코딩: q} 로 읽는다. q=0 은 받지 않는다는 뜻이다
+def accepted_encodings(header):
+    weights = {}
+    for token in header.split(','):
+        name, *params = [part.strip() for part in token.split(';')]
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.lower()] = weight
+    return weights
+
+
+# If-None-Match 가 이 ETag 를 가리키는지 (목록, W/ 약한 비교, * 를 받는다)
+def etag_matches(header, etag):
+    etags = parse_etags(header)
+    return etags == ['*'] or etag in {candidate.removeprefix('W/') for candidate in etags}
+
+
+def scan(root):
+    root = Path(root)
+    manifest = root / 'staticfiles.json'
+    hashed = set(json.loads(manifest.read_text())['paths'].values()) if manifest.is_file() else set()
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = Path(directory) / name
+            if path.suffix in ('.br', '.gz') and path.with_suffix('').is_file():
+                continue
+            if path == manifest:
+                continue
+            relative = path.relative_to(root).as_posix()
+            files[relative] = StaticFile(path, relative in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+
+    def __init__(self, get_response):
+        # 개발 서버는 django.contrib.staticfiles 가 STATICFILES_DIRS 에서 바로 내보낸다
+        if settings.DEBUG or not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.files = scan(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            static = self.files.get(request.path_info[len(self.prefix):])
+            if static is not None:
+                return self.serve(request, static)
+        return self.get_response(request)
+
+    def serve(self, request, static):
+        encoding, path, size, etag = static.pick(request.headers.get('Accept-Encoding', ''))
+        if etag_matches(request.headers.get('If-None-Match', ''), etag):
+            response = HttpResponseNotModified()
+        else:
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static.content_type)
+            else:
+                response = FileResponse(path.open('rb'), content_type=static.content_type)
+                del response['Content-Disposition']
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = static.last_modified
+        response['ETag'] = etag
+        response['Cache-Control'] = static.cache_control
+        if len(static.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:14
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # 0009 가 Order.in_cart 를 더하고 0010 이 바로 지웠다 (장바구니를 쿠키로 옮김). 합치면 스키마는 그대로다
+    replaces = [
+        ("shop", "0009_order_in_cart"),
+        ("shop", "0010_remove_order_in_cart"),
+    ]
+
+    dependencies = [
+        ("shop", "0008_sellerstats"),
+    ]
+
+    operations = []
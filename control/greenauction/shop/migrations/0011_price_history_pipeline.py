@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:13
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicate_days(apps, schema_editor):
+    # (product, date) 당 한 행만 남긴다 (가장 최근에 들어온 행)
+    PriceHistory = apps.get_model("shop", "PriceHistory")
+    duplicates = (
+        PriceHistory.objects.values("product", "date")
+        .annotate(rows=Count("id"), keep=Max("id"))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        PriceHistory.objects.filter(product=row["product"], date=row["date"]).exclude(
+            id=row["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0009_squashed_0010_remove_order_in_cart"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AggregationWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("position", models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(drop_duplicate_days, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="pricehistory",
+            constraint=models.UniqueConstraint(
+                fields=("product", "date"), name="unique_price_history_day"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Q
+
+
+# 처음 상품 이름 선택지였던 딸기 / 샤인머스캣을 카테고리로 만들고 기존 상품을 연결한다
+INITIAL_CATEGORIES = [
+    ("딸기", "strawberry", ["strawberr", "딸기"]),
+    ("샤인머스캣", "shine-muscat", ["shine", "muscat", "샤인"]),
+]
+
+
+def create_initial_categories(apps, schema_editor):
+    Category = apps.get_model("shop", "Category")
+    Product = apps.get_model("shop", "Product")
+    for name, slug, keywords in INITIAL_CATEGORIES:
+        category, _ = Category.objects.get_or_create(slug=slug, defaults={"name": name})
+        matches = Q()
+        for keyword in keywords:
+            matches |= Q(name__icontains=keyword)
+        Product.objects.filter(matches, category__isnull=True).update(category=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0011_price_history_pipeline"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Category",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("slug", models.SlugField(unique=True)),
+            ],
+            options={
+                "verbose_name_plural": "categories",
+            },
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="products",
+                to="shop.category",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "price", "id"], name="product_category_price_idx"
+            ),
+        ),
+        migrations.RunPython(create_initial_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("shop", "0012_category"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(fields=["is_seller"], name="user_is_seller_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["product", "date_ordered"], name="order_product_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "product"], name="order_buyer_product_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "-date_ordered"], name="order_buyer_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["date_ordered"], name="order_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pricehistory",
+            index=models.Index(
+                fields=["product", "date", "average_price"],
+                name="pricehistory_covering_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name"], name="product_name_idx"),
+        ),
+    ]
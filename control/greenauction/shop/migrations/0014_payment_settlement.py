@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def mark_requested_payments_ready(apps, schema_editor):
+    # tid 를 이미 받은 주문은 결제 준비 상태로 두어 reconcile_payments 가 정리하게 한다
+    Order = apps.get_model("shop", "Order")
+    Order.objects.filter(kakao_tid__isnull=False).exclude(kakao_tid="").update(
+        payment_status="ready"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0013_access_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentCallback",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tid", models.CharField(max_length=100)),
+                ("pg_token", models.CharField(max_length=100)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                ("error", models.CharField(blank=True, max_length=200)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="kakao_ready_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="payment_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "결제 전"),
+                    ("ready", "결제 준비"),
+                    ("approving", "승인 중"),
+                    ("paid", "결제 완료"),
+                    ("failed", "결제 실패"),
+                    ("expired", "결제 만료"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["payment_status", "kakao_ready_at"],
+                name="order_payment_sweep_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="paymentcallback",
+            name="order",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payment_callbacks",
+                to="shop.order",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="paymentcallback",
+            index=models.Index(
+                fields=["processed_at", "id"], name="paymentcallback_queue_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="paymentcallback",
+            constraint=models.UniqueConstraint(
+                fields=("order", "pg_token"), name="unique_payment_callback"
+            ),
+        ),
+        migrations.RunPython(mark_requested_payments_ready, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_totals(apps, schema_editor):
+    # 이미 있는 리뷰를 상품/판매자 집계에 채운다 (이후에는 signals 가 차이만 더한다)
+    Product = apps.get_model("shop", "Product")
+    Review = apps.get_model("shop", "Review")
+    SellerStats = apps.get_model("shop", "SellerStats")
+    products = (
+        Review.objects.values("product")
+        .annotate(count=Count("id"), total=Sum("rating"))
+        .order_by()
+    )
+    for row in products.iterator():
+        Product.objects.filter(id=row["product"]).update(
+            rating_count=row["count"],
+            rating_sum=row["total"],
+            rating_avg=round(row["total"] / row["count"], 2),
+        )
+    sellers = (
+        Review.objects.values("product__seller")
+        .annotate(count=Count("id"), total=Sum("rating"))
+        .order_by()
+    )
+    for row in sellers.iterator():
+        SellerStats.objects.filter(seller_id=row["product__seller"]).update(
+            rating_count=row["count"], rating_sum=row["total"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0015_auction"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_avg",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="sellerstats",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="sellerstats",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["rating_avg", "id"], name="product_rating_id_idx"
+            ),
+        ),
+        migrations.RunPython(fill_rating_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0019_stock_shards_and_holds"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="order",
+            name="order_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["paid_at"], name="order_paid_idx"),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     is_seller = models.BooleanField(default=False)
@@ -22,39 +23,259 @@ class CustomUser(AbstractUser):
         related_query_name='customuser',
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['is_seller'], name='user_is_seller_idx'),
+        ]
+
+class Category(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
+
+    class Meta:
+        verbose_name_plural = 'categories'
+
+    def __str__(self):
+        return self.name
+
 class Product(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     seller = models.ForeignKey(CustomUser, related_name='products', on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, related_name='products', on_delete=models.SET_NULL, null=True, blank=True)
+    # 재고 (장바구니/결제 대기로 잡힌 수량 포함). 비워 두면 재고를 세지 않는다.
+    # 바로 팔 수 있는 수량은 StockShard 에 나눠 두고, 여기는 inventory.checkpoint 가 주기적으로 합계를 적는다
+    stock = models.PositiveIntegerField(null=True, blank=True)
+    # 리뷰 별점 집계 (리뷰가 바뀔 때 ratings.apply_delta 가 같이 갱신한다)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # 가격순 keyset 페이지네이션
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            # 별점순 keyset 페이지네이션 / 최소 별점 필터
+            models.Index(fields=['rating_avg', 'id'], name='product_rating_id_idx'),
+            # 카테고리별 가격 비교 / 카테고리 목록
+            models.Index(fields=['category', 'price', 'id'], name='product_category_price_idx'),
+            # 이름 일치/접두어 조회
+            models.Index(fields=['name'], name='product_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 class Order(models.Model):
+    PAYMENT_STATUSES = [
+        ('pending', '결제 전'),
+        ('ready', '결제 준비'),
+        ('approving', '승인 중'),
+        ('paid', '결제 완료'),
+        ('failed', '결제 실패'),
+        ('expired', '결제 만료'),
+    ]
+
     product = models.ForeignKey(Product, related_name='orders', on_delete=models.CASCADE)
     buyer = models.ForeignKey(CustomUser, related_name='orders', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     date_ordered = models.DateTimeField(auto_now_add=True)
     kakao_tid = models.CharField(max_length=100, blank=True, null=True)
+    kakao_ready_at = models.DateTimeField(blank=True, null=True)
+    payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUSES, default='pending')
+    paid_at = models.DateTimeField(blank=True, null=True)
+    # 결제 전까지 이 주문이 잡고 있는 재고. 결제 없이 오래되면 inventory.sweep 이 돌려놓고 0 으로 만든다
+    stock_held = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # 상품별 기간 집계 (일간 집계 재계산, 최근 주문)
+            models.Index(fields=['product', 'date_ordered'], name='order_product_date_idx'),
+            # 구매 여부 확인 (리뷰 작성 권한)
+            models.Index(fields=['buyer', 'product'], name='order_buyer_product_idx'),
+            # 구매 기록 (최신순)
+            models.Index(fields=['buyer', '-date_ordered'], name='order_buyer_date_idx'),
+            # 가격 이력 파이프라인의 워터마크 이후 결제 범위 읽기
+            models.Index(fields=['paid_at'], name='order_paid_idx'),
+            # 오래된 결제 준비(tid) 정리
+            models.Index(fields=['payment_status', 'kakao_ready_at'], name='order_payment_sweep_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.buyer.username}"
 
+# 결제 승인 콜백 대기열 (settlement 가 모아서 승인한다)
+class PaymentCallback(models.Model):
+    order = models.ForeignKey(Order, related_name='payment_callbacks', on_delete=models.CASCADE)
+    tid = models.CharField(max_length=100)
+    pg_token = models.CharField(max_length=100)
+    received_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'pg_token'], name='unique_payment_callback'),
+        ]
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='paymentcallback_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Callback {self.tid} for order {self.order_id}"
+
 class PriceHistory(models.Model):
     product = models.ForeignKey(Product, related_name='price_history', on_delete=models.CASCADE)
     date = models.DateField()
     average_price = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_price_history_day'),
+        ]
+        indexes = [
+            # 가격 추세: 상품별 날짜순으로 가격까지 인덱스만 읽고 끝낸다 (covering)
+            models.Index(fields=['product', 'date', 'average_price'], name='pricehistory_covering_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.date}"
 
+class ProductDailyStats(models.Model):
+    product = models.ForeignKey(Product, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_product_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.date}"
+
+class SellerStats(models.Model):
+    seller = models.OneToOneField(CustomUser, related_name='seller_stats', on_delete=models.CASCADE, primary_key=True)
+    total_sales = models.BigIntegerField(default=0)
+    # 판매자 상품 전체의 리뷰 별점 집계
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # 순위 조회: total_sales 가 더 큰 판매자 수를 인덱스 범위로 센다
+            models.Index(fields=['-total_sales', 'seller'], name='seller_total_sales_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} - {self.total_sales}"
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+class AggregationWatermark(models.Model):
+    # 배치 집계가 어디까지 처리했는지 (이 시각 이후 주문만 다시 읽는다)
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} - {self.position}"
+
 class Review(models.Model):
     product = models.ForeignKey(Product, related_name='reviews', on_delete=models.CASCADE)
     user = models.ForeignKey(CustomUser, related_name='reviews', on_delete=models.CASCADE)
     content = models.TextField(max_length=30)
     rating = models.PositiveIntegerField(choices=[(i, i) for i in range(1, 6)])
 
+    class Meta:
+        indexes = [
+            # 상품별 리뷰 keyset 페이지네이션 (최신순은 product_id 인덱스 + id 로 충분하다)
+            models.Index(fields=['product', 'rating', 'id'], name='review_product_rating_idx'),
+        ]
+
     def __str__(self):
         return f"Review {self.id} by {self.user.username}"
+
+class Auction(models.Model):
+    STATUSES = [
+        ('live', '진행 중'),
+        ('closed', '종료'),
+    ]
+
+    product = models.ForeignKey(Product, related_name='auctions', on_delete=models.CASCADE)
+    starting_price = models.DecimalField(max_digits=10, decimal_places=2)
+    min_increment = models.DecimalField(max_digits=10, decimal_places=2, default=100)
+    starts_at = models.DateTimeField(default=timezone.now)
+    ends_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='live')
+    # 최고 입찰 (입찰마다 version 을 조건으로 갱신한다: 낙관적 동시성)
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    highest_bidder = models.ForeignKey(CustomUser, related_name='leading_auctions', on_delete=models.SET_NULL,
+                                       blank=True, null=True)
+    bid_count = models.PositiveIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    order = models.OneToOneField(Order, related_name='auction', on_delete=models.SET_NULL, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # 마감 처리 대상 찾기
+            models.Index(fields=['status', 'ends_at'], name='auction_status_end_idx'),
+        ]
+
+    def __str__(self):
+        return f"Auction {self.id} for {self.product_id}"
+
+class Bid(models.Model):
+    auction = models.ForeignKey(Auction, related_name='bids', on_delete=models.CASCADE)
+    bidder = models.ForeignKey(CustomUser, related_name='bids', on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # 같은 금액은 한 번만 (동시에 같은 금액이 들어와도 낙찰자는 하나)
+            models.UniqueConstraint(fields=['auction', 'amount'], name='unique_bid_amount'),
+        ]
+
+    def __str__(self):
+        return f"{self.bidder_id} bid {self.amount} on {self.auction_id}"
+
+# 상품 재고 조각. 재고를 여러 행에 나눠 두고 담기/주문마다 한 행만 조건부 UPDATE 해서
+# 인기 상품도 한 행의 잠금에 몰리지 않게 한다 (inventory)
+class StockShard(models.Model):
+    product = models.ForeignKey(Product, related_name='stock_shards', on_delete=models.CASCADE)
+    shard = models.PositiveSmallIntegerField()
+    available = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'shard'], name='unique_stock_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}#{self.shard}: {self.available}"
+
+# 장바구니에 담은 동안 잡아 둔 재고 (구매자, 상품마다 한 행). 기한이 지나면 inventory.sweep 이 한꺼번에 돌려놓는다
+class StockHold(models.Model):
+    product = models.ForeignKey(Product, related_name='stock_holds', on_delete=models.CASCADE)
+    buyer = models.ForeignKey(CustomUser, related_name='stock_holds', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['buyer', 'product'], name='unique_stock_hold'),
+        ]
+        indexes = [
+            # 만료된 홀드 정리
+            models.Index(fields=['expires_at', 'id'], name='stockhold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.buyer_id} holds {self.quantity} of {self.product_id}"
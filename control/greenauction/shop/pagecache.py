@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+# 페이지 / 템플릿 조각 캐시
+# 캐시 키에 범위(scope)별 버전을 넣는다. 'products', 'product:<id>', 'seller:<id>' 같은 범위의 버전을
+# 올리면 그 범위에 기대는 키는 모두 새 키가 되어 다시 만들어진다 (지우지 않고 버린다).
+# 값은 (만료 시각, 값) 으로 STALE_GRACE 만큼 더 보관한다. 만료된 값은 락을 잡은 요청 하나만 다시 만들고
+# 나머지는 이전 값을 그대로 받는다. 값이 아예 없으면 락을 못 잡은 요청은 잠깐 기다린다 (stampede 방지).
+
+PAGE_TIMEOUT = 60 * 5
+STALE_GRACE = 60
+LOCK_TIMEOUT = 30
+WAIT = 2.0
+WAIT_STEP = 0.05
+
+
+def product_scope(product_id):
+    return f'product:{product_id}'
+
+
+def seller_scope(seller_id):
+    return f'seller:{seller_id}'
+
+
+def review_scope(product_id):
+    return f'reviews:{product_id}'
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+# 범위별 현재 버전. 캐시에 없으면 (처음이거나 밀려났으면) 시각으로 새로 정해 옛 키와 겹치지 않게 한다
+def versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), time.time_ns(), None)
+
+
+# 커밋 이후에 버전을 올린다 (롤백되면 그대로)
+def bump_on_commit(*scopes):
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def make_key(name, scopes=(), vary=()):
+    raw = '|'.join([name, *(str(value) for value in vary), *(str(value) for value in versions(scopes))])
+    return f'page:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def get_or_set(key, compute, timeout=PAGE_TIMEOUT):
+    entry = cache.get(key)
+    if entry is not None:
+        expires_at, value = entry
+        if expires_at > time.time() or not cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+            return value
+        return _recompute(key, compute, timeout)
+
+    lock = f'{key}:lock'
+    deadline = time.monotonic() + WAIT
+    while not cache.add(lock, 1, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            # 락을 잡은 쪽이 너무 오래 걸린다: 직접 만든다 (저장은 하지 않는다)
+            return compute()
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    return _recompute(key, compute, timeout)
+
+
+def _recompute(key, compute, timeout):
+    try:
+        value = compute()
+        cache.set(key, (time.time() + timeout, value), timeout + STALE_GRACE)
+        return value
+    finally:
+        cache.delete(f'{key}:lock')
+
+
+# 비로그인 GET 요청의 응답 전체를 캐시한다. 로그인 사용자는 화면에 본인 정보와 CSRF 토큰이 들어가므로
+# 뷰를 그대로 실행하고, 무거운 부분은 템플릿 조각 캐시({% cachefragment %})가 맡는다
+def cache_page(scopes=(), timeout=PAGE_TIMEOUT):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            vary = [request.path, *sorted(request.GET.lists())]
+            key = make_key(view.__name__, scopes, vary)
+            uncacheable = []
+
+            def render():
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.cookies or request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+                    uncacheable.append(response)
+                    return None
+                return response
+
+            response = get_or_set(key, render, timeout)
+            if uncacheable:
+                return uncacheable[0]
+            if response is None:
+                # 캐시된 None: 저장할 수 없는 응답이다
+                return view(request, *args, **kwargs)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+# 커서(keyset) 기반 페이지네이션
+# OFFSET 없이 "마지막으로 본 행 다음"부터 읽기 때문에 몇 페이지를 넘기든 비용이 같다.
+
+PAGE_SIZE = 24
+REVIEW_PAGE_SIZE = 10
+
+# 정렬 이름 -> (정렬 필드, 내림차순 여부). 동점은 항상 id 로 끊는다.
+PRODUCT_SORTS = {
+    'id': (None, False),
+    'price': ('price', False),
+    '-price': ('price', True),
+    '-rating': ('rating_avg', True),
+}
+
+REVIEW_SORTS = {
+    'newest': (None, True),
+    'rating': ('rating', True),
+}
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _after(field, descending, values):
+    lookup = 'lt' if descending else 'gt'
+    if field is None:
+        return Q(**{f'id__{lookup}': int(values[0])})
+    value = Decimal(values[0])
+    return Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'id__{lookup}': int(values[1])})
+
+
+# queryset 에서 커서 다음 한 페이지를 읽는다. (rows, next_cursor) 반환
+def keyset_page(queryset, sort='id', cursor=None, page_size=PAGE_SIZE, sorts=PRODUCT_SORTS):
+    field, descending = sorts.get(sort) or next(iter(sorts.values()))
+    prefix = '-' if descending else ''
+    ordering = [f'{prefix}{field}', f'{prefix}id'] if field else [f'{prefix}id']
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(cursor)
+    if values:
+        try:
+            queryset = queryset.filter(_after(field, descending, values))
+        except (IndexError, ValueError, TypeError, InvalidOperation):
+            pass
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if field:
+            next_cursor = encode_cursor([str(last[field]), last['id']])
+        else:
+            next_cursor = encode_cursor([last['id']])
+    return rows, next_cursor
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, FloatField, Sum, Value, When
+
+from . import leaderboard, pagecache
+from .models import Product, Review
+
+# 리뷰 별점 집계
+# 상품과 판매자(SellerStats)에 리뷰 수/별점 합을 들고 있고, 리뷰가 바뀔 때마다 차이만 UPDATE 로 더한다.
+# 평균(rating_avg)은 정렬/필터에 인덱스를 쓰도록 상품에 저장한다.
+
+# 합/개수 -> 평균. 정수 나눗셈이 되지 않도록 소수로 바꿔서 나눈다
+AVERAGE = Case(
+    When(rating_count=0, then=Value(0)),
+    default=ExpressionWrapper(F('rating_sum') * Value(1.0) / F('rating_count'), output_field=FloatField()),
+    output_field=DecimalField(max_digits=3, decimal_places=2),
+)
+
+
+def apply_delta(product_id, count, total):
+    if not count and not total:
+        return
+    with transaction.atomic():
+        # MySQL 은 SET 절을 왼쪽부터 바뀐 값으로 계산하므로 평균은 따로 갱신한다
+        Product.objects.filter(id=product_id).update(
+            rating_count=F('rating_count') + count, rating_sum=F('rating_sum') + total)
+        Product.objects.filter(id=product_id).update(rating_avg=AVERAGE)
+        leaderboard.apply_rating_delta(product_id, count, total)
+
+
+# 리뷰 원본에서 다시 계산한다 (상품을 주면 그 상품과 판매자만)
+def rebuild(products=None, batch_size=1000):
+    reviews = Review.objects.all()
+    targets = Product.objects.all()
+    if products is not None:
+        reviews = reviews.filter(product__in=products)
+        targets = targets.filter(id__in=products)
+    totals = {
+        product_id: (count, total)
+        for product_id, count, total in reviews.values('product_id')
+        .annotate(count=Count('id'), total=Sum('rating')).order_by()
+        .values_list('product_id', 'count', 'total')
+    }
+    sellers = set()
+    changed = []
+    for product in targets.only('id', 'seller_id', 'rating_count', 'rating_sum', 'rating_avg').iterator(
+            chunk_size=batch_size):
+        sellers.add(product.seller_id)
+        count, total = totals.get(product.id, (0, 0))
+        if (product.rating_count, product.rating_sum) != (count, total):
+            product.rating_count, product.rating_sum = count, total
+            changed.append(product)
+    with transaction.atomic():
+        Product.objects.bulk_update(changed, ['rating_count', 'rating_sum'], batch_size=batch_size)
+        if changed:
+            Product.objects.filter(id__in=[product.id for product in changed]).update(rating_avg=AVERAGE)
+        leaderboard.rebuild_ratings(sellers if products is not None else None, batch_size)
+    pagecache.bump_on_commit('products', 'reviews')
+    return len(changed)
+
@@ -0,0 +1,112 @@
+import re
+import sqlite3
+import threading
+
+from django.conf import settings
+
+# 상품 검색 인덱스 (SQLite FTS5 사이드카)
+# 한글은 음절 bigram, 그 외 문자는 단어 단위로 토큰화해서 저장한다.
+
+HANGUL_RE = re.compile(r'[가-힣]+')
+WORD_RE = re.compile(r'[가-힣]+|[^\W_]+')
+
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_local = threading.local()
+
+
+def tokenize(text):
+    tokens = []
+    for word in WORD_RE.findall((text or '').lower()):
+        if HANGUL_RE.fullmatch(word) and len(word) > 1:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def build_match_query(query):
+    # 모든 토큰을 접두어 검색으로 AND 결합 (icontains 와 비슷한 체감)
+    tokens = tokenize(query)
+    return ' AND '.join('"%s"*' % token for token in tokens)
+
+
+def get_index_path():
+    return str(getattr(settings, 'SEARCH_INDEX_PATH', settings.BASE_DIR / 'search_index.sqlite3'))
+
+
+def get_connection(path=None):
+    path = path or get_index_path()
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        if path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts "
+            "USING fts5(name, description, tokenize='unicode61')"
+        )
+        connections[path] = conn
+    return conn
+
+
+def close_connections():
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+def _row(product):
+    return (product.id, ' '.join(tokenize(product.name)), ' '.join(tokenize(product.description)))
+
+
+# 상품 한 건 색인 (기존 문서는 교체)
+def index_product(product, path=None):
+    conn = get_connection(path)
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM product_fts WHERE rowid = ?', (product.id,))
+    conn.execute('INSERT INTO product_fts(rowid, name, description) VALUES (?, ?, ?)', _row(product))
+    conn.execute('COMMIT')
+
+
+def remove_product(product_id, path=None):
+    get_connection(path).execute('DELETE FROM product_fts WHERE rowid = ?', (product_id,))
+
+
+# 인덱스 전체 재구축
+def rebuild(products, path=None, batch_size=2000):
+    conn = get_connection(path)
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM product_fts')
+    count = 0
+    batch = []
+    for product in products.only('id', 'name', 'description').iterator(chunk_size=batch_size):
+        batch.append(_row(product))
+        if len(batch) >= batch_size:
+            conn.executemany('INSERT INTO product_fts(rowid, name, description) VALUES (?, ?, ?)', batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO product_fts(rowid, name, description) VALUES (?, ?, ?)', batch)
+        count += len(batch)
+    conn.execute("INSERT INTO product_fts(product_fts) VALUES ('optimize')")
+    conn.execute('COMMIT')
+    return count
+
+
+# 검색: 관련도 순으로 정렬된 상품 id 목록 (offset 번째부터 limit 개)
+def search(query, limit=200, offset=0, path=None):
+    match = build_match_query(query)
+    if not match:
+        return []
+    rows = get_connection(path).execute(
+        'SELECT rowid FROM product_fts WHERE product_fts MATCH ? '
+        'ORDER BY bm25(product_fts, ?, ?), rowid LIMIT ? OFFSET ?',
+        (match, NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset),
+    ).fetchall()
+    return [row[0] for row in rows]
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import kakaopay, stats
+from .models import Order, PaymentCallback
+
+# 결제 승인 정산
+# 결제 성공 콜백은 대기열(PaymentCallback)에 넣기만 하고 바로 응답한다.
+# settle_pending 이 대기열을 배치로 가져가 승인 API 를 동시에 호출하고, 결과는 UPDATE 몇 번으로 반영한다.
+
+BATCH_SIZE = 100
+APPROVE_WORKERS = 8
+CLAIM_LEASE = timedelta(minutes=5)  # 가져간 워커가 죽으면 이 시간 뒤에 다시 가져간다
+STALE_READY = timedelta(minutes=20)  # 카카오 tid 는 15분 뒤 만료된다
+PAID_STATUS = 'SUCCESS_PAYMENT'
+
+
+# 결제 성공 콜백을 대기열에 넣는다 (같은 pg_token 은 한 번만)
+def enqueue(order, pg_token):
+    try:
+        with transaction.atomic():
+            callback = PaymentCallback.objects.create(order=order, tid=order.kakao_tid, pg_token=pg_token)
+    except IntegrityError:
+        return PaymentCallback.objects.get(order=order, pg_token=pg_token)
+    Order.objects.filter(id=order.id, payment_status='ready').update(payment_status='approving')
+    return callback
+
+
+def _claimable(now):
+    return Q(processed_at__isnull=True) & (Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_LEASE))
+
+
+# 처리할 콜백을 한 배치 가져간다. 조건부 UPDATE 로 다른 워커와 겹치지 않게 한다
+def claim(batch_size=BATCH_SIZE, now=None):
+    now = now or timezone.now()
+    ids = list(
+        PaymentCallback.objects.filter(_claimable(now)).order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    PaymentCallback.objects.filter(_claimable(now), id__in=ids).update(claimed_at=now)
+    return list(PaymentCallback.objects.filter(id__in=ids, claimed_at=now).select_related('order'))
+
+
+def _status(client, tid):
+    try:
+        return client.order_status(tid).get('status')
+    except kakaopay.KakaoPayError:
+        return None
+
+
+def _call_all(func, items, workers):
+    if not items:
+        return []
+    with ThreadPoolExecutor(min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+# 대기열 한 배치를 승인한다. {'paid', 'failed', 'retry'} 건수 반환
+def settle_pending(client=None, batch_size=BATCH_SIZE, workers=APPROVE_WORKERS, now=None):
+    client = client or kakaopay.get_client()
+    now = now or timezone.now()
+    callbacks = claim(batch_size, now)
+
+    def approve(callback):
+        try:
+            client.approve(callback.tid, callback.order_id, callback.order.buyer_id, callback.pg_token)
+        except kakaopay.KakaoPayError as exc:
+            # 이전 시도가 응답 없이 승인까지 끝냈을 수 있으니 거절되면 상태를 확인한다
+            if exc.status is not None and _status(client, callback.tid) == PAID_STATUS:
+                return callback, None
+            return callback, exc
+        return callback, None
+
+    paid, failed, retry = [], [], []
+    for callback, error in _call_all(approve, callbacks, workers):
+        if error is None:
+            paid.append(callback)
+        elif error.status is None:
+            # 응답을 못 받았다: 승인됐는지 모르므로 다음 배치에서 다시 시도한다 (승인 중복은 카카오가 거절)
+            retry.append(callback)
+        else:
+            callback.error = str(error)[:200]
+            failed.append(callback)
+
+    with transaction.atomic():
+        # 판매 집계는 결제가 끝난 주문만 센다 (stats.mark_paid 가 새로 결제된 주문을 더한다)
+        stats.mark_paid(Order.objects.filter(id__in=[c.order_id for c in paid]), now)
+        Order.objects.filter(id__in=[c.order_id for c in failed]).exclude(payment_status='paid').update(
+            payment_status='failed')
+        PaymentCallback.objects.filter(id__in=[c.id for c in paid]).update(processed_at=now)
+        for callback in failed:
+            callback.processed_at = now
+        PaymentCallback.objects.bulk_update(failed, ['processed_at', 'error'])
+        PaymentCallback.objects.filter(id__in=[c.id for c in retry]).update(claimed_at=None)
+    return {'paid': len(paid), 'failed': len(failed), 'retry': len(retry)}
+
+
+# 오래된 결제 준비(tid)를 정리한다. 처리 중인 콜백이 없는 주문만 카카오에 상태를 물어서
+# 결제가 끝나 있으면 paid, 아니면 expired 로 바꾸고 tid 를 비운다
+def reconcile(client=None, older_than=STALE_READY, batch_size=BATCH_SIZE, workers=APPROVE_WORKERS, now=None):
+    client = client or kakaopay.get_client()
+    now = now or timezone.now()
+    pending_callbacks = PaymentCallback.objects.filter(order=OuterRef('pk'), processed_at__isnull=True)
+    stale = (
+        Order.objects.filter(payment_status__in=['ready', 'approving'], kakao_tid__isnull=False)
+        .filter(Q(kakao_ready_at__lt=now - older_than) | Q(kakao_ready_at__isnull=True))
+        .exclude(Exists(pending_callbacks))
+        .order_by('id')
+    )
+
+    def check(order):
+        try:
+            return order, client.order_status(order.kakao_tid).get('status')
+        except kakaopay.KakaoPayError as exc:
+            # 카카오가 모르는 tid(4xx)는 만료로, 응답이 없으면 다음에 다시 본다
+            return order, None if exc.status is None else 'INVALID'
+
+    counts = {'paid': 0, 'expired': 0, 'skipped': 0}
+    last_id = 0
+    while True:
+        orders = list(stale.filter(id__gt=last_id).only('id', 'kakao_tid')[:batch_size])
+        if not orders:
+            return counts
+        last_id = orders[-1].id
+        results = _call_all(check, orders, workers)
+        paid = [order.id for order, status in results if status == PAID_STATUS]
+        expired = [order.id for order, status in results if status not in (PAID_STATUS, None)]
+        with transaction.atomic():
+            stats.mark_paid(Order.objects.filter(id__in=paid), now)
+            Order.objects.filter(id__in=expired).update(payment_status='expired', kakao_tid=None)
+        counts['paid'] += len(paid)
+        counts['expired'] += len(expired)
+        counts['skipped'] += len(results) - len(paid) - len(expired)
@@ -0,0 +1,232 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import backends, comparison, forecast, leaderboard, live, pagecache, ratings, search, stats
+from .models import Category, CustomUser, Product, Order, PriceHistory, Review
+
+
+# 상품 저장/삭제 시 검색 인덱스 갱신 (커밋 이후에 반영)
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_product(instance))
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_on_delete(sender, instance, **kwargs):
+    product_id = instance.id
+    transaction.on_commit(lambda: search.remove_product(product_id))
+
+
+# 상품 가격/카테고리가 바뀌면 카테고리 가격 비교 캐시를 버린다
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_category_stats(sender, instance, **kwargs):
+    transaction.on_commit(comparison.invalidate)
+
+
+# 가격 변경과 새 주문을 실시간 구독자에게 알린다 (커밋 이후).
+# 가격은 읽어 왔을 때와 달라졌을 때만 보낸다 (이름/재고만 고친 저장은 보내지 않는다)
+@receiver(post_init, sender=Product)
+def remember_product_price(sender, instance, **kwargs):
+    instance._published_price = DEFERRED if 'price' in instance.get_deferred_fields() else instance.price
+
+
+# 가격을 빼고 읽은 상품에 가격을 넣었으면 저장 직전에 이전 가격을 읽는다
+@receiver(pre_save, sender=Product)
+def load_deferred_product_price(sender, instance, **kwargs):
+    if (getattr(instance, '_published_price', DEFERRED) is DEFERRED and instance.pk is not None
+            and 'price' not in instance.get_deferred_fields()):
+        instance._published_price = Product.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def publish_product_price(sender, instance, created, **kwargs):
+    if 'price' in instance.get_deferred_fields():
+        return  # 가격은 저장하지 않았다
+    old, instance._published_price = getattr(instance, '_published_price', None), instance.price
+    if created or old == instance.price:
+        return
+    topic = f'product:{instance.id}'
+    data = {'product_id': instance.id, 'price': str(instance.price)}
+    transaction.on_commit(lambda: live.publish(topic, 'price', data))
+
+
+@receiver(post_save, sender=Order)
+def publish_new_order(sender, instance, created, **kwargs):
+    if not created:
+        return
+    topic = f'product:{instance.product_id}'
+    data = {'product_id': instance.product_id, 'order_id': instance.id, 'quantity': instance.quantity}
+    transaction.on_commit(lambda: live.publish(topic, 'order', data))
+
+
+# 주문 변경분을 일간 판매 집계에 반영 (결제된 주문만 판매로 센다: paid 로 바뀌면 더하고, paid 에서 바뀌면 뺀다)
+STATS_FIELDS = {'product_id', 'date_ordered', 'quantity', 'total_price', 'payment_status'}
+DEFERRED = object()
+
+
+def _order_snapshot(order):
+    if order.pk is None or order.date_ordered is None:
+        return None
+    return (order.product_id, stats.order_day(order), order.quantity, order.total_price,
+            order.payment_status == stats.PAID)
+
+
+# 스냅샷 중 판매로 세는 부분 (결제 전이면 None)
+def _sale(snapshot):
+    return snapshot[:4] if snapshot and snapshot[4] else None
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    # only()/defer() 로 읽은 주문은 여기서 필드를 건드리면 행마다 쿼리가 나가므로 저장 직전에 읽는다
+    if STATS_FIELDS & instance.get_deferred_fields():
+        instance._stats_snapshot = DEFERRED
+    else:
+        instance._stats_snapshot = _order_snapshot(instance)
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_delete, sender=Order)
+def load_deferred_order_state(sender, instance, **kwargs):
+    if instance._stats_snapshot is DEFERRED:
+        instance._stats_snapshot = _order_snapshot(Order.objects.get(pk=instance.pk))
+
+
+@receiver(post_save, sender=Order)
+def update_stats_on_order_save(sender, instance, created, **kwargs):
+    snapshot = _order_snapshot(instance)
+    old = None if created else _sale(instance._stats_snapshot)
+    new = _sale(snapshot)
+    if old and new and old[:2] == new[:2]:
+        # 같은 날 같은 상품 행이면 수량/금액 차이만 반영
+        stats.apply_order_delta(new[0], new[1], new[2] - old[2], new[3] - old[3])
+    elif old != new:
+        if old:
+            product_id, day, quantity, total_price = old
+            stats.apply_order_delta(product_id, day, -quantity, -total_price, -1)
+        if new:
+            product_id, day, quantity, total_price = new
+            stats.apply_order_delta(product_id, day, quantity, total_price, 1)
+    instance._stats_snapshot = snapshot
+
+
+@receiver(post_delete, sender=Order)
+def update_stats_on_order_delete(sender, instance, **kwargs):
+    old = _sale(instance._stats_snapshot)
+    if old:
+        product_id, day, quantity, total_price = old
+        stats.apply_order_delta(product_id, day, -quantity, -total_price, -1)
+
+
+# 리뷰 변경분을 상품/판매자 별점 집계에 반영
+# 리뷰 수정은 드물어서 저장 직전에 DB 의 이전 값을 읽는다 (refresh_from_db 등으로 인스턴스가 바뀌어도 맞다).
+# 삭제는 상품을 지울 때 리뷰가 한꺼번에 지워지므로 방금 읽은 인스턴스 값을 쓴다
+def _review_snapshot(review):
+    if review.pk is None:
+        return None
+    return (review.product_id, review.rating)
+
+
+@receiver(pre_save, sender=Review)
+def load_review_state(sender, instance, **kwargs):
+    instance._rating_snapshot = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._rating_snapshot = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+
+
+@receiver(pre_delete, sender=Review)
+def remember_deleted_review(sender, instance, **kwargs):
+    instance._rating_snapshot = _review_snapshot(instance)
+
+
+@receiver(post_save, sender=Review)
+def update_ratings_on_review_save(sender, instance, created, **kwargs):
+    old = instance._rating_snapshot
+    new = _review_snapshot(instance)
+    if old and new and old[0] == new[0]:
+        ratings.apply_delta(new[0], 0, new[1] - old[1])
+    elif old != new:
+        if old:
+            ratings.apply_delta(old[0], -1, -old[1])
+        if new:
+            ratings.apply_delta(new[0], 1, new[1])
+    instance._rating_snapshot = new
+
+
+@receiver(post_delete, sender=Review)
+def update_ratings_on_review_delete(sender, instance, **kwargs):
+    old = instance._rating_snapshot
+    if old:
+        ratings.apply_delta(old[0], -1, -old[1])
+
+
+# 판매자는 가입 시점부터 랭킹에 0 으로 올린다. 로그인(last_login)처럼 is_seller 가 그대로인 저장은 건너뛴다
+@receiver(post_init, sender=CustomUser)
+def remember_seller_state(sender, instance, **kwargs):
+    instance._was_seller = DEFERRED if 'is_seller' in instance.get_deferred_fields() else instance.is_seller
+
+
+@receiver(post_save, sender=CustomUser)
+def create_seller_stats(sender, instance, created, **kwargs):
+    # 캐시에서 꺼낸 사용자(pickle)에는 post_init 이 돌지 않는다
+    if instance.is_seller and (created or getattr(instance, '_was_seller', DEFERRED) is not True):
+        leaderboard.ensure_seller(instance)
+    instance._was_seller = instance.is_seller
+
+
+# 가격 이력이 바뀌면 그 상품의 예측 캐시를 버린다
+@receiver(post_save, sender=PriceHistory)
+@receiver(post_delete, sender=PriceHistory)
+def invalidate_forecast(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: forecast.invalidate(product_id))
+
+
+# 페이지 / 조각 캐시의 범위 버전을 올린다 (pagecache)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_pages(sender, instance, **kwargs):
+    pagecache.bump_on_commit('products', pagecache.product_scope(instance.id),
+                             pagecache.seller_scope(instance.seller_id))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_pages(sender, instance, **kwargs):
+    pagecache.bump_on_commit('products')
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def bump_order_pages(sender, instance, **kwargs):
+    # only() 로 읽어 지운 주문은 product_id 가 스냅샷에만 있다
+    snapshot = instance._stats_snapshot
+    product_id = snapshot[0] if snapshot else instance.product_id
+    pagecache.bump_on_commit('orders', pagecache.product_scope(product_id))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_review_pages(sender, instance, **kwargs):
+    # 상품 목록도 별점으로 정렬/필터하므로 같이 버린다
+    product_id = instance._rating_snapshot[0] if instance._rating_snapshot else instance.product_id
+    pagecache.bump_on_commit('reviews', 'products', pagecache.product_scope(product_id),
+                             pagecache.review_scope(product_id))
+
+
+# 캐시해 둔 request.user 를 버린다 (권한/승인/비밀번호 변경이 다음 요청에 바로 보이도록).
+# 커밋 전에 다른 요청이 옛 값을 다시 넣을 수 있으므로 커밋 뒤에 한 번 더 지운다
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    backends.invalidate(user_id)
+    transaction.on_commit(lambda: backends.invalidate(user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_seller_pages(sender, instance, **kwargs):
+    if instance.is_seller:
+        pagecache.bump_on_commit('sellers', pagecache.seller_scope(instance.id))
@@ -0,0 +1,65 @@
+import os
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import FileSystemFinder
+from django.template.utils import get_app_template_dirs
+
+# 운영 collectstatic 용 파인더
+# STATICFILES_DIRS 에는 부트스트랩 배포본이 통째로 들어 있다 (rtl, esm, 소스맵 등). 템플릿의 {% static '...' %} 가
+# 가리키는 파일과, 그 CSS 가 url() / @import 로 가리키는 파일만 모은다. 앱(admin 등)의 정적 파일은 파이썬 코드에서도
+# 참조하므로 AppDirectoriesFinder 가 그대로 모은다.
+# 템플릿에 이름이 드러나지 않는 파일({% static 변수 %})은 STATIC_EXTRA_ASSETS 에 적는다
+
+STATIC_TAG = re.compile(r"""{%\s*static\s+(['"])(?P<path>[^'"]+)\1""")
+CSS_REFERENCE = re.compile(r"""url\(\s*(['"]?)(?P<url>[^'")]+)\1\s*\)|@import\s+(['"])(?P<import>[^'"]+)\3""")
+
+
+def template_references():
+    dirs = [Path(path) for backend in settings.TEMPLATES for path in backend.get('DIRS', [])]
+    dirs += [Path(path) for path in get_app_template_dirs('templates')]
+    found = set()
+    for directory in dirs:
+        for template in directory.rglob('*.html'):
+            found.update(match['path'] for match in STATIC_TAG.finditer(template.read_text(errors='ignore')))
+    return found
+
+
+# CSS 안의 상대 경로를 정적 파일 경로로 바꾼다. 외부 주소/data: 는 None
+def resolve(css_path, url):
+    url = url.strip().split('#')[0].split('?')[0]
+    if not url or url.startswith(('data:', 'http:', 'https:', '//')):
+        return None
+    if url.startswith('/'):
+        static_url = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        return url[len(static_url):] if url.startswith(static_url) else None
+    path = posixpath.normpath(posixpath.join(posixpath.dirname(css_path), url))
+    return None if path.startswith('..') else path
+
+
+class ReferencedFinder(FileSystemFinder):
+
+    def list(self, ignore_patterns):
+        files = {}
+        for path, storage in super().list(ignore_patterns):
+            path = path.replace(os.sep, '/')
+            files[posixpath.join(storage.prefix, path) if storage.prefix else path] = (path, storage)
+
+        pending = template_references() | set(getattr(settings, 'STATIC_EXTRA_ASSETS', ()))
+        seen = set()
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in files:
+                continue
+            seen.add(name)
+            path, storage = files[name]
+            if name.endswith('.css'):
+                with storage.open(path) as source:
+                    css = source.read().decode('utf-8', errors='ignore')
+                for match in CSS_REFERENCE.finditer(css):
+                    reference = resolve(name, match['url'] or match['import'])
+                    if reference:
+                        pending.add(reference)
+            yield files[name]
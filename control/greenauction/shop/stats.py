@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import forecast, leaderboard, pagecache
+from .models import AggregationWatermark, Order, PriceHistory, ProductDailyStats
+
+# 상품별 일간 판매 집계 (ProductDailyStats)
+# 주문이 생기거나 바뀔 때마다 차이(delta)만 더해서 상세 페이지가 원본 주문을 다시 집계하지 않게 한다.
+# 판매는 결제가 끝난 주문(payment_status='paid')만 센다. 결제 전/실패/만료 주문은 판매량, 판매자 순위, 평균 단가에
+# 들어가지 않고, paid 로 바뀔 때 더하고 paid 에서 바뀌면 뺀다. 재계산(backfill, rebuild, PriceHistory)도 같은 조건이다.
+
+PAID = 'paid'
+
+
+def order_day(order):
+    return timezone.localdate(order.date_ordered)
+
+
+# (product, date) 행에 delta 를 더한다. 행이 없으면 만든다.
+def apply_delta(product_id, day, units=0, revenue=0, order_count=0):
+    if not (units or revenue or order_count):
+        return
+    changes = {
+        'units': F('units') + units,
+        'revenue': F('revenue') + revenue,
+        'order_count': F('order_count') + order_count,
+    }
+    rows = ProductDailyStats.objects.filter(product_id=product_id, date=day)
+    if rows.update(**changes) or order_count < 0:
+        # 없는 행에서 빼는 경우(상품 삭제 중 연쇄 삭제 등)는 새로 만들지 않는다
+        return
+    try:
+        with transaction.atomic():
+            ProductDailyStats.objects.create(
+                product_id=product_id, date=day, units=units, revenue=revenue, order_count=order_count)
+    except IntegrityError:
+        # 다른 요청이 먼저 행을 만들었다
+        rows.update(**changes)
+
+
+# 주문 변경분 반영: 일간 집계 + 판매자 누적 판매량
+def apply_order_delta(product_id, day, units=0, revenue=0, order_count=0):
+    apply_delta(product_id, day, units, revenue, order_count)
+    leaderboard.apply_sales_delta(product_id, units)
+
+
+# 주문들을 결제 완료로 바꾼다. QuerySet.update 는 시그널을 보내지 않으므로 새로 결제된 주문만 골라 직접 반영한다
+def mark_paid(orders, now):
+    with transaction.atomic():
+        newly_paid = list(orders.exclude(payment_status=PAID).select_for_update().only(
+            'id', 'product_id', 'date_ordered', 'quantity', 'total_price', 'payment_status'))
+        Order.objects.filter(id__in=[order.id for order in newly_paid]).update(payment_status=PAID, paid_at=now)
+        record_orders(newly_paid)
+        pagecache.bump_on_commit('orders', *{pagecache.product_scope(order.product_id) for order in newly_paid})
+    return len(newly_paid)
+
+
+# bulk_create/update 처럼 시그널 없이 결제 완료가 된 주문을 (상품, 날짜) 단위로 묶어서 반영
+def record_orders(orders):
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for order in orders:
+        delta = deltas[order.product_id, order_day(order)]
+        delta[0] += order.quantity
+        delta[1] += order.total_price
+        delta[2] += 1
+    for (product_id, day), (units, revenue, order_count) in deltas.items():
+        apply_order_delta(product_id, day, units, revenue, order_count)
+
+
+# 최근 days 일간 판매량 / 매출 / 주문 수
+def recent_stats(product, days=7):
+    since = timezone.localdate() - timedelta(days=days)
+    return ProductDailyStats.objects.filter(product=product, date__gte=since).aggregate(
+        units=Sum('units'), revenue=Sum('revenue'), order_count=Sum('order_count'))
+
+
+# 주문 원본에서 집계를 다시 만든다 (결제된 주문만)
+def backfill(products=None, batch_size=1000):
+    orders = Order.objects.filter(payment_status=PAID)
+    stats = ProductDailyStats.objects.all()
+    if products is not None:
+        orders = orders.filter(product__in=products)
+        stats = stats.filter(product__in=products)
+    rows = (
+        orders.annotate(day=TruncDate('date_ordered'))
+        .values('product_id', 'day')
+        .annotate(units=Sum('quantity'), revenue=Sum('total_price'), order_count=Count('id'))
+        .order_by()
+    )
+    count = 0
+    with transaction.atomic():
+        stats.delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(ProductDailyStats(
+                product_id=row['product_id'], date=row['day'], units=row['units'],
+                revenue=row['revenue'], order_count=row['order_count']))
+            if len(batch) >= batch_size:
+                ProductDailyStats.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        ProductDailyStats.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+# PriceHistory 집계: 결제된 주문을 청크 단위로 흘려 읽어서 상품별 일간 평균 단가를 만든다.
+# 날짜는 결제한 날(paid_at)이다. 주문은 며칠 뒤에 결제될 수도 있어서 주문일로 묶으면 이미 지나간 날이 바뀐다.
+# 워터마크(마지막으로 다시 읽기 시작할 날의 0시) 이후 결제만 읽으므로 자주 돌려도 싸다.
+PRICE_HISTORY_WATERMARK = 'price_history'
+
+
+def aggregate_price_history(chunk_size=5000, full=False, now=None):
+    now = now or timezone.now()
+    watermark = AggregationWatermark.objects.filter(name=PRICE_HISTORY_WATERMARK).first()
+    orders = Order.objects.filter(payment_status=PAID).order_by()
+    if watermark and not full:
+        orders = orders.filter(paid_at__gte=watermark.position)
+    orders = orders.filter(paid_at__lt=now)
+
+    totals = defaultdict(lambda: [Decimal(0), 0])
+    for product_id, paid_at, quantity, total_price in orders.values_list(
+            'product_id', 'paid_at', 'quantity', 'total_price').iterator(chunk_size=chunk_size):
+        total = totals[product_id, timezone.localdate(paid_at)]
+        total[0] += total_price
+        total[1] += quantity
+
+    rows = [
+        PriceHistory(product_id=product_id, date=day, average_price=(revenue / units).quantize(Decimal('0.01')))
+        for (product_id, day), (revenue, units) in totals.items() if units
+    ]
+    with transaction.atomic():
+        # MySQL 의 ON DUPLICATE KEY UPDATE 는 충돌 대상을 적지 않는다 (유니크 제약이 그대로 쓰인다)
+        target = ({'unique_fields': ['product', 'date']}
+                  if connection.features.supports_update_conflicts_with_target else {})
+        PriceHistory.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, update_fields=['average_price'], **target)
+        # 오늘은 아직 결제가 더 들어오므로 다음 실행에서 오늘 0시부터 다시 읽는다
+        today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        AggregationWatermark.objects.update_or_create(name=PRICE_HISTORY_WATERMARK, defaults={'position': today})
+    # bulk_create 는 시그널을 보내지 않으므로 예측 캐시를 직접 비운다
+    product_ids = {product_id for product_id, _ in totals}
+    transaction.on_commit(lambda: forecast.invalidate_many(product_ids))
+    return len(rows)
@@ -0,0 +1,61 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # brotli 가 없으면 .gz 만 만든다
+    brotli = None
+
+# 정적 파일 저장소 (운영, collectstatic)
+# 이름에 내용 해시를 붙이고 (ManifestStaticFilesStorage), 압축이 잘 되는 파일은 옆에 .gz (와 .br) 을 미리 만들어 둔다.
+# 요청마다 압축하지 않고 shop/middleware.py (또는 nginx 의 gzip_static 등)가 만들어 둔 파일을 그대로 보낸다
+
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot')
+MIN_SIZE = 256  # 이보다 작으면 헤더 때문에 오히려 손해다
+MIN_SAVING = 0.05
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    keep_intermediate_files = False  # CSS 안의 참조를 바꾸는 중간 단계 해시 파일은 남기지 않는다
+
+    # 내려받은 라이브러리 CSS/JS 가 함께 오지 않은 소스맵을 참조한다. 없는 파일은 이름을 그대로 둔다
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(hashed):
+                self.compress(name)
+
+    # 만든 압축 파일 이름 목록을 돌려준다
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return []
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_SIZE:
+            return []
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data, quality=11)
+        saved = []
+        for suffix, compressed in variants.items():
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                continue
+            target = f'{name}{suffix}'
+            if self.exists(target):
+                self.delete(target)
+            saved.append(self._save(target, ContentFile(compressed)))
+        return saved
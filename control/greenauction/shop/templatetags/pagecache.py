@@ -0,0 +1,44 @@
+from django import template
+from django.template.base import token_kwargs
+
+from .. import pagecache
+
+register = template.Library()
+
+# 템플릿 조각 캐시
+# {% cachefragment 300 "seller_ranking" scopes="orders,reviews" vary=user.id %} ... {% endcachefragment %}
+# scopes 는 문자열(쉼표 구분) 또는 목록, vary 는 키에 더할 값이다
+
+
+class CacheFragmentNode(template.Node):
+
+    def __init__(self, nodelist, timeout, name, kwargs):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.kwargs = kwargs
+
+    def render(self, context):
+        timeout = int(self.timeout.resolve(context))
+        name = self.name.resolve(context)
+        values = {key: value.resolve(context) for key, value in self.kwargs.items()}
+        scopes = values.get('scopes') or ()
+        if isinstance(scopes, str):
+            scopes = [scope for scope in scopes.split(',') if scope]
+        vary = values.get('vary')
+        key = pagecache.make_key(f'fragment:{name}', scopes, () if vary is None else [vary])
+        return pagecache.get_or_set(key, lambda: self.nodelist.render(context), timeout)
+
+
+@register.tag
+def cachefragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a timeout and a name.")
+    rest = bits[3:]
+    kwargs = token_kwargs(rest, parser)
+    if rest or set(kwargs) - {'scopes', 'vary'}:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' only accepts scopes= and vary= after the name.")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]), kwargs)
@@ -1,7 +1,38 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import importlib
+import json
+import os
+import random
+from contextlib import contextmanager
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+from django.utils import timezone
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
-from .models import Product, Review
+from .models import (Auction, Category, Product, Review, CustomUser, Order, PaymentCallback, PriceHistory, ProductDailyStats,
+                     SellerStats, StockHold, StockShard, AggregationWatermark)
+from . import bidding, checkout, comparison, export, forecast, inventory, kakaopay, leaderboard, live, pagecache, ratings, search, settlement, stats
+from .cart import COOKIE_NAME, COOKIE_SALT, Cart
+from .fake_kakao import FakeKakaoServer
+from .kakaopay import KakaoPayClient, KakaoPayError
 
 class ShopTests(TestCase):
 
@@ -51,3 +82,1814 @@ class ShopTests(TestCase):
         response = self.client.get(reverse('product_list'), {'q': 'strawberry'})
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, self.product.name)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(SEARCH_INDEX_PATH=os.path.join(self.tmpdir.name, 'index.sqlite3'))
+        self.settings_override.enable()
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+
+    def tearDown(self):
+        search.close_connections()
+        self.settings_override.disable()
+        self.tmpdir.cleanup()
+
+    def create_product(self, name, description=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(name=name, description=description, price=1000, seller=self.seller)
+
+    def test_tokenize_hangul_bigrams(self):
+        self.assertEqual(search.tokenize('설향딸기 Fresh'), ['설향', '향딸', '딸기', 'fresh'])
+
+    def test_search_name_and_description(self):
+        berry = self.create_product('설향 딸기', '논산 하우스 딸기')
+        grape = self.create_product('샤인머스캣', '달콤한 포도, 딸기 아님')
+        self.create_product('사과', '부사')
+        # 이름에 걸린 상품이 설명에만 걸린 상품보다 먼저 나온다
+        self.assertEqual(search.search('딸기'), [berry.id, grape.id])
+        self.assertEqual(search.search('포도'), [grape.id])
+        self.assertEqual(search.search('shine'), [])
+
+    def test_index_follows_update_and_delete(self):
+        product = self.create_product('strawberry', 'fresh')
+        product.name = 'shine muscat'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(search.search('straw'), [])
+        self.assertEqual(search.search('musc'), [product.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(search.search('muscat'), [])
+
+    def test_rebuild(self):
+        product = Product.objects.create(name='유기농 사과', description='', price=1000, seller=self.seller)
+        self.assertEqual(search.search('사과'), [])
+        self.assertEqual(search.rebuild(Product.objects.all()), 1)
+        self.assertEqual(search.search('사과'), [product.id])
+
+    def test_product_list_uses_index(self):
+        product = self.create_product('설향 딸기', '논산')
+        self.create_product('사과', '부사')
+        response = self.client.get(reverse('product_list'), {'q': '딸기'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.context['products']], [product.id])
+
+
+    def test_search_keeps_filters_and_pages(self):
+        berry = Category.objects.create(name='딸기', slug='berry')
+        with self.captureOnCommitCallbacks(execute=True):
+            products = [Product.objects.create(name=f'딸기 {i}', description='', price=1000, seller=self.seller,
+                                               category=berry if i % 2 else None) for i in range(60)]
+        expected = [product.id for product in products if product.category_id]
+        with mock.patch('shop.views.SEARCH_BATCH', 7):
+            response = self.client.get(reverse('product_list'), {'q': '딸기', 'category': 'berry'})
+            first = [row['id'] for row in response.context['products']]
+            cursor = response.context['next_cursor']
+            self.assertContains(response, f'cursor={cursor}')
+            feed = self.client.get(reverse('product_feed'), {'q': '딸기', 'category': 'berry', 'cursor': cursor}).json()
+        self.assertEqual(len(first), 24)
+        self.assertIsNone(feed['next'])
+        self.assertEqual(sorted(first + [row['id'] for row in feed['results']]), expected)
+
+class ProductPaginationTests(TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        Product.objects.bulk_create([
+            Product(name=f'product {i}', description='x' * 500, price=(i % 5) * 1000, seller=self.seller)
+            for i in range(30)
+        ])
+
+    def walk(self, url_name, sort, page_key):
+        ids, cursor = [], None
+        while True:
+            params = {'sort': sort}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(reverse(url_name), params)
+            self.assertEqual(response.status_code, 200)
+            page, cursor = page_key(response)
+            ids.extend(row['id'] for row in page)
+            if not cursor:
+                return ids
+
+    def test_product_list_pages_by_id(self):
+        ids = self.walk('product_list', 'id', lambda r: (r.context['products'], r.context['next_cursor']))
+        self.assertEqual(ids, list(Product.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_product_feed_pages_by_price(self):
+        ids = self.walk('product_feed', '-price', lambda r: (r.json()['results'], r.json()['next']))
+        self.assertEqual(ids, list(Product.objects.order_by('-price', '-id').values_list('id', flat=True)))
+
+    def test_product_list_is_lean(self):
+        response = self.client.get(reverse('product_list'))
+        card = response.context['products'][0]
+        self.assertEqual(set(card), {'id', 'name', 'price', 'rating_avg', 'rating_count', 'summary'})
+        self.assertEqual(len(card['summary']), 100)
+
+    def test_invalid_cursor_starts_over(self):
+        response = self.client.get(reverse('product_feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(len(response.json()['results']), 24)
+
+
+class ProductDailyStatsTests(TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.product = Product.objects.create(name='딸기', description='', price=1000, seller=self.seller)
+
+    def order(self, quantity, payment_status='paid'):
+        return Order.objects.create(product=self.product, buyer=self.buyer, quantity=quantity,
+                                    total_price=quantity * 1000, payment_status=payment_status, paid_at=timezone.now())
+
+    def today_stats(self):
+        return ProductDailyStats.objects.get(product=self.product)
+
+    def test_stats_follow_order_changes(self):
+        first = self.order(2)
+        self.order(3)
+        row = self.today_stats()
+        self.assertEqual((row.units, row.revenue, row.order_count), (5, 5000, 2))
+
+        first.quantity = 4
+        first.total_price = 4000
+        first.save()
+        row = self.today_stats()
+        self.assertEqual((row.units, row.revenue, row.order_count), (7, 7000, 2))
+
+        Order.objects.only('id').get(pk=first.pk).delete()
+        row = self.today_stats()
+        self.assertEqual((row.units, row.revenue, row.order_count), (3, 3000, 1))
+
+    def test_only_paid_orders_count(self):
+        first = self.order(2, 'pending')
+        second = self.order(3, 'pending')
+        self.assertFalse(ProductDailyStats.objects.exists())
+        # 결제 완료로 바뀔 때 더한다 (정산은 QuerySet.update 라 mark_paid 가 직접 반영한다)
+        self.assertEqual(stats.mark_paid(Order.objects.filter(id__in=[first.id, second.id]), timezone.now()), 2)
+        self.assertEqual(stats.mark_paid(Order.objects.filter(id=first.id), timezone.now()), 0)
+        row = self.today_stats()
+        self.assertEqual((row.units, row.order_count, SellerStats.objects.get(seller=self.seller).total_sales),
+                         (5, 2, 5))
+        # paid 에서 벗어나면 뺀다
+        second = Order.objects.get(id=second.id)
+        second.payment_status = 'failed'
+        second.save()
+        self.order(7, 'expired')
+        row = self.today_stats()
+        self.assertEqual((row.units, row.order_count, SellerStats.objects.get(seller=self.seller).total_sales),
+                         (2, 1, 2))
+        # 재계산도 같은 기준이다
+        stats.backfill()
+        leaderboard.rebuild()
+        row = self.today_stats()
+        self.assertEqual((row.units, row.order_count, SellerStats.objects.get(seller=self.seller).total_sales),
+                         (2, 1, 2))
+
+    def test_backfill_matches_incremental(self):
+        self.order(2)
+        self.order(5)
+        self.order(4, 'pending')
+        expected = list(ProductDailyStats.objects.values('product', 'date', 'units', 'revenue', 'order_count'))
+        ProductDailyStats.objects.all().delete()
+        self.assertEqual(stats.backfill(), 1)
+        self.assertEqual(list(ProductDailyStats.objects.values('product', 'date', 'units', 'revenue', 'order_count')), expected)
+
+    def test_product_detail_reads_rollup(self):
+        self.order(2)
+        self.order(4)
+        response = self.client.get(reverse('product_detail', args=[self.product.id]))
+        self.assertEqual(response.context['total_sales'], 6)
+        self.assertEqual(response.context['sales_changes'], 2)
+        self.assertEqual(response.context['price_changes'], 3000)
+
+
+@mock.patch.object(leaderboard, 'RANK_REFRESH', 0)
+class SellerLeaderboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.sellers = [
+            CustomUser.objects.create_user(username=f'seller{i}', password='12345', is_seller=True)
+            for i in range(3)
+        ]
+        self.products = [
+            Product.objects.create(name=f'product {i}', description='', price=1000, seller=seller)
+            for i, seller in enumerate(self.sellers)
+        ]
+
+    def order(self, product, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(product=product, buyer=self.buyer, quantity=quantity,
+                                        total_price=quantity * 1000, payment_status='paid', paid_at=timezone.now())
+
+    def test_rank_follows_orders(self):
+        self.order(self.products[0], 1)
+        self.order(self.products[1], 5)
+        self.assertEqual(leaderboard.rank_of(self.sellers[1]), 1)
+        self.assertEqual(leaderboard.rank_of(self.sellers[0]), 2)
+        self.assertEqual(leaderboard.rank_of(self.sellers[2]), 3)
+        self.assertIsNone(leaderboard.rank_of(self.buyer))
+
+        order = self.order(self.products[0], 10)
+        self.assertEqual(leaderboard.rank_of(self.sellers[0]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(leaderboard.rank_of(self.sellers[0]), 2)
+
+    def test_rank_lookup_reuses_sorted_totals(self):
+        self.order(self.products[1], 5)
+        leaderboard.rank_of(self.sellers[0])
+        # 판매량이 그대로면 자기 판매량 한 줄만 읽는다 (더 많이 판 판매자를 세지 않는다)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(leaderboard.rank_of(self.sellers[0]), 2)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'].upper())
+
+    def test_seller_stats_only_on_create_or_promotion(self):
+        with mock.patch.object(leaderboard, 'ensure_seller') as ensure_seller:
+            self.client.login(username='seller0', password='12345')
+            self.assertFalse(ensure_seller.called)
+            self.buyer.is_seller = True
+            self.buyer.save()
+            ensure_seller.assert_called_once_with(self.buyer)
+            self.buyer.save()
+            ensure_seller.assert_called_once()
+        self.assertTrue(SellerStats.objects.filter(seller=self.sellers[0]).exists())
+
+    def test_product_delete_with_orders(self):
+        self.order(self.products[0], 3)
+        self.products[0].delete()
+        self.assertEqual(SellerStats.objects.get(seller=self.sellers[0]).total_sales, 0)
+        self.assertFalse(ProductDailyStats.objects.exists())
+
+    def test_rebuild_matches_incremental(self):
+        self.order(self.products[2], 4)
+        self.order(self.products[0], 2)
+        expected = dict(SellerStats.objects.values_list('seller', 'total_sales'))
+        SellerStats.objects.all().delete()
+        self.assertEqual(leaderboard.rebuild(), 3)
+        self.assertEqual(dict(SellerStats.objects.values_list('seller', 'total_sales')), expected)
+
+    def test_seller_ranking_view(self):
+        self.order(self.products[1], 2)
+        Review.objects.create(product=self.products[1], user=self.buyer, content='good', rating=4)
+        Review.objects.create(product=self.products[1], user=self.buyer, content='ok', rating=5)
+        response = self.client.get(reverse('seller_ranking'))
+        top = response.context['sellers'][0]
+        self.assertEqual(top.seller, self.sellers[1])
+        self.assertEqual(top.avg_rating, 4.5)
+
+    def test_profile_rank(self):
+        self.order(self.products[2], 2)
+        self.client.login(username='seller2', password='12345')
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['ranking'], 1)
+
+
+class CartTests(TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.product = Product.objects.create(name='딸기', description='', price=1500, seller=self.seller)
+        self.other = Product.objects.create(name='포도', description='', price=3000, seller=self.seller)
+        cache.clear()
+        self.client.login(username='buyer', password='12345')
+
+    def cart_lines(self):
+        return {line.product.id: line.quantity for line in self.client.get(reverse('cart')).context['lines']}
+
+    def test_cart_does_not_write_orders(self):
+        with self.assertNumQueries(2):  # 사용자 (로그인 직후 한 번), 상품 존재 확인. 세션은 캐시에서 읽는다
+            self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        for _ in range(2):
+            self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.post(reverse('add_to_cart', args=[self.other.id]))
+        self.assertEqual(self.cart_lines(), {self.product.id: 3, self.other.id: 1})
+        self.assertFalse(Order.objects.exists())
+
+        self.client.get(reverse('update_cart', args=[self.product.id, 'decrease']))
+        self.client.get(reverse('update_cart', args=[self.other.id, 'remove']))
+        self.assertEqual(self.cart_lines(), {self.product.id: 2})
+        response = self.client.get(reverse('update_cart', args=[self.other.id, 'increase']))
+        self.assertEqual(response.status_code, 404)
+
+    @mock.patch('shop.cart.LOCK_TIMEOUT', 0)
+    def test_busy_cart_is_not_changed_without_lock(self):
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        # 같은 사용자의 다른 요청이 잠금을 잡고 있다
+        cache.add(f'cart-lock:{self.buyer.pk}', 1)
+        for response in (self.client.post(reverse('add_to_cart', args=[self.other.id])),
+                         self.client.get(reverse('update_cart', args=[self.product.id, 'remove'])),
+                         self.client.post(reverse('checkout'))):
+            self.assertEqual(response.status_code, 409)
+            self.assertContains(response, '잠시 후 다시 시도해 주세요', status_code=409)
+        cache.delete(f'cart-lock:{self.buyer.pk}')
+        self.assertEqual((self.cart_lines(), Order.objects.count()), ({self.product.id: 1}, 0))
+
+    def test_checkout_persists_cart_in_bulk(self):
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.post(reverse('add_to_cart', args=[self.other.id]))
+        response = self.client.post(reverse('checkout'))
+        self.assertRedirects(response, reverse('purchase_history'), fetch_redirect_response=False)
+        orders = Order.objects.filter(buyer=self.buyer)
+        self.assertEqual(
+            sorted(orders.values_list('product', 'quantity', 'total_price')),
+            [(self.product.id, 2, 3000), (self.other.id, 1, 3000)])
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_sales, 0)
+        stats.mark_paid(orders, timezone.now())
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_sales, 3)
+        self.assertEqual(ProductDailyStats.objects.get(product=self.product).units, 2)
+        self.assertEqual(self.cart_lines(), {})
+
+    def test_tampered_or_foreign_cookie_is_ignored(self):
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        cookie = self.client.cookies['cart'].value
+        # 쿠키는 캐시에서 밀려났을 때만 읽는다
+        cache.delete(f'cart:{self.buyer.pk}')
+        self.assertEqual(self.cart_lines(), {self.product.id: 1})
+        cache.delete(f'cart:{self.buyer.pk}')
+        self.client.cookies['cart'] = cookie.replace(f'{self.product.id}:1', f'{self.product.id}:50')
+        self.assertEqual(self.cart_lines(), {})
+
+        self.client.cookies['cart'] = cookie
+        CustomUser.objects.create_user(username='other', password='12345')
+        self.client.login(username='other', password='12345')
+        self.assertEqual(self.cart_lines(), {})
+
+    def test_cart_format_is_compact(self):
+        cart = Cart({3: 2, 15: 1})
+        self.assertEqual(cart.dumps(), '3:2.15:1')
+        self.assertEqual(Cart.loads('3:2.15:1.x:1.7:0'), {3: 2, 15: 1})
+
+
+class CartConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+    CLICKS = 10
+
+    def setUp(self):
+        cache.clear()
+
+    # 한 브라우저에서 겹친 클릭: 모든 요청이 같은 세션/장바구니 쿠키를 들고 온다
+    def test_overlapping_clicks_are_all_counted(self):
+        seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        CustomUser.objects.create_user(username='buyer', password='12345')
+        product = Product.objects.create(name='딸기', description='', price=1000, seller=seller)
+        self.client.login(username='buyer', password='12345')
+        url = reverse('add_to_cart', args=[product.id])
+        self.client.post(url)
+        start = threading.Barrier(self.THREADS)
+        errors = []
+
+        def clicker():
+            client = Client()
+            client.cookies = self.client.cookies
+            start.wait()
+            try:
+                for _ in range(self.CLICKS):
+                    self.assertEqual(client.post(url).status_code, 302)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        # 읽고 다시 쓰기 사이를 벌려 요청이 실제로 겹치게 한다
+        loads = Cart.loads
+        slow_loads = staticmethod(lambda value: time.sleep(0.002) or loads(value))
+        threads = [threading.Thread(target=clicker) for _ in range(self.THREADS)]
+        with mock.patch.object(Cart, 'loads', slow_loads):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        lines = self.client.get(reverse('cart')).context['lines']
+        self.assertEqual([(line.product.id, line.quantity) for line in lines],
+                         [(product.id, 1 + self.THREADS * self.CLICKS)])
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class SessionAuthCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.client.login(username='buyer', password='12345')
+
+    def tables(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, {table for query in queries for table in ('django_session', 'shop_customuser')
+                          if f'"{table}"' in query['sql']}
+
+    def test_authenticated_requests_skip_session_and_user_rows(self):
+        self.client.get(reverse('profile'))
+        response, tables = self.tables(reverse('profile'))
+        self.assertEqual((response.context['username'], tables), ('buyer', set()))
+        # 캐시가 비어도 세션은 DB 에 남아 있다
+        cache.clear()
+        response, tables = self.tables(reverse('profile'))
+        self.assertEqual((response.status_code, tables), (200, {'django_session', 'shop_customuser'}))
+
+    def test_user_changes_are_seen_on_next_request(self):
+        self.client.get(reverse('profile'))
+        self.user.is_seller = True
+        self.user.save()
+        self.assertTrue(self.client.get(reverse('profile')).context['is_seller'])
+
+        self.user.set_password('67890')
+        self.user.save()
+        response = self.client.get(reverse('profile'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('profile')}", fetch_redirect_response=False)
+
+    def test_sessions_from_model_backend_still_resolve(self):
+        client = Client()
+        client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(client.get(reverse('profile')).context['username'], 'buyer')
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.client.get(reverse('profile'))
+        _, tables = self.tables(reverse('profile'))
+        self.assertEqual(tables, {'shop_customuser'})
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class CheckoutTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.product = Product.objects.create(name='딸기', description='', price=1500, stock=3, seller=self.seller)
+        self.other = Product.objects.create(name='포도', description='', price=3000, stock=1, seller=self.seller)
+        self.untracked = Product.objects.create(name='쌀', description='', price=500, seller=self.seller)
+
+    def stock(self):
+        return inventory.available([self.product.id, self.other.id, self.untracked.id])
+
+    def test_orders_take_stock_at_current_price(self):
+        # MySQL 처럼 bulk INSERT 가 id 를 돌려주지 않는 DB 에서도
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            orders = checkout.place_order(self.buyer, {self.product.id: 2, self.other.id: 1, self.untracked.id: 50})
+        self.assertEqual(sorted((order.product_id, order.quantity, order.total_price) for order in orders),
+                         [(self.product.id, 2, 3000), (self.other.id, 1, 3000), (self.untracked.id, 50, 25000)])
+        # 여러 줄 주문도 저장된 id 를 돌려준다 (결제/실시간 알림이 쓴다)
+        self.assertEqual(sorted(order.id for order in orders),
+                         sorted(Order.objects.filter(buyer=self.buyer).values_list('id', flat=True)))
+        self.assertEqual(self.stock(), {self.product.id: 1, self.other.id: 0, self.untracked.id: None})
+        # 판매량은 결제가 끝나야 센다
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_sales, 0)
+        stats.mark_paid(Order.objects.filter(buyer=self.buyer), timezone.now())
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).total_sales, 53)
+
+    def test_short_line_rolls_back_whole_cart(self):
+        with self.assertRaises(checkout.OutOfStock) as raised:
+            checkout.place_order(self.buyer, {self.product.id: 1, self.other.id: 2})
+        self.assertEqual(raised.exception.products, [self.other.id])
+        self.assertEqual(self.stock(), {self.product.id: 3, self.other.id: 1, self.untracked.id: None})
+        self.assertFalse(Order.objects.exists())
+        # 락은 풀려 있어 바로 다시 결제할 수 있다
+        checkout.place_order(self.buyer, {self.other.id: 1})
+        with self.assertRaises(checkout.OutOfStock):
+            checkout.place_order(self.buyer, {self.other.id: 1})
+
+    def test_price_change_is_rejected(self):
+        Product.objects.filter(id=self.product.id).update(price=2000)
+        with self.assertRaises(checkout.PriceChanged) as raised:
+            checkout.place_order(self.buyer, {self.product.id: 2}, expected_total=Decimal('3000'))
+        self.assertEqual(raised.exception.total, 4000)
+        self.assertEqual(self.stock()[self.product.id], 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_concurrent_checkout_by_same_buyer_is_refused(self):
+        cache.add(f'checkout:{self.buyer.pk}', 1)
+        with self.assertRaises(checkout.CheckoutError):
+            checkout.place_order(self.buyer, {self.product.id: 1})
+        self.assertEqual(self.stock()[self.product.id], 3)
+
+    def test_deleted_products_are_skipped(self):
+        gone = Product.objects.create(name='사과', description='', price=100, stock=5, seller=self.seller)
+        gone_id = gone.id
+        gone.delete()
+        orders = checkout.place_order(self.buyer, {self.product.id: 1, gone_id: 1})
+        self.assertEqual([(order.product_id, order.quantity) for order in orders], [(self.product.id, 1)])
+        with self.assertRaisesMessage(checkout.CheckoutError, '장바구니가 비어 있습니다.'):
+            checkout.place_order(self.buyer, {gone_id: 1})
+
+    def test_views_report_out_of_stock(self):
+        self.client.login(username='buyer', password='12345')
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.post(reverse('add_to_cart', args=[self.other.id]))
+        # 마지막 하나는 이미 장바구니에 잡혀 있다
+        response = self.client.post(reverse('add_to_cart', args=[self.other.id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.context['out_of_stock'], [self.other.id])
+        self.assertContains(response, '재고 부족', status_code=409)
+
+        CustomUser.objects.create_user(username='rival', password='12345')
+        self.client.login(username='rival', password='12345')
+        response = self.client.post(reverse('buy_now', args=[self.other.id]))
+        self.assertEqual(response.status_code, 409)
+
+        self.client.login(username='buyer', password='12345')
+        response = self.client.post(reverse('checkout'), {'total': '4500'})
+        self.assertRedirects(response, reverse('purchase_history'), fetch_redirect_response=False)
+        self.assertEqual(sorted(Order.objects.values_list('product', 'stock_held')),
+                         [(self.product.id, 1), (self.other.id, 1)])
+        self.assertEqual(self.stock(), {self.product.id: 2, self.other.id: 0, self.untracked.id: None})
+        self.assertFalse(StockHold.objects.exists())
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    BUYERS = 12
+    STOCK = 10
+
+    def setUp(self):
+        cache.clear()
+
+    # 여러 구매자가 같은 상품 몇 개를 동시에 결제해도 재고보다 많이 팔지 않는다
+    def test_parallel_buyers_never_oversell(self):
+        seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        products = [Product.objects.create(name=f'한정 {i}', description='', price=1000, stock=self.STOCK, seller=seller)
+                    for i in range(2)]
+        for product in products:
+            inventory.restock(product.id, self.STOCK)
+        buyers = [CustomUser.objects.create_user(username=f'buyer{i}', password='12345') for i in range(self.BUYERS)]
+        start = threading.Barrier(self.BUYERS)
+        accepted = []
+        errors = []
+
+        def buy(buyer, index):
+            cart = {products[0].id: 1 + index % 2, products[1].id: 1 + index % 3}
+            start.wait()
+            try:
+                # 테스트 DB (메모리 SQLite) 는 쓰기가 겹치면 기다리지 않고 잠금 오류를 낸다: 조금 쉬었다 다시 시도한다
+                for _ in range(500):
+                    try:
+                        accepted.extend(checkout.place_order(buyer, cart))
+                        return
+                    except OperationalError:
+                        time.sleep(random.uniform(0.001, 0.02))
+                errors.append('database stayed locked')
+            except checkout.OutOfStock:
+                pass
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(buyer, i)) for i, buyer in enumerate(buyers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stock = inventory.available([product.id for product in products])
+        for product in products:
+            sold = Order.objects.filter(product=product).aggregate(units=Sum('quantity'))['units'] or 0
+            self.assertGreaterEqual(stock[product.id], 0)
+            self.assertEqual(self.STOCK - stock[product.id], sold)
+        self.assertEqual(sum(order.quantity for order in accepted), Order.objects.aggregate(units=Sum('quantity'))['units'])
+        self.assertTrue(accepted)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class InventoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True,
+                                                     is_approved=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.rival = CustomUser.objects.create_user(username='rival', password='12345')
+        self.product = Product.objects.create(name='딸기', description='', price=1500, stock=10, seller=self.seller)
+
+    def available(self):
+        return inventory.available([self.product.id])[self.product.id]
+
+    def test_take_spreads_over_shards(self):
+        inventory.restock(self.product.id, 10, shards=4)
+        self.assertEqual(list(StockShard.objects.order_by('shard').values_list('available', flat=True)), [3, 3, 2, 2])
+        # 한 조각보다 많으면 여러 조각에서 나눠 가져온다
+        self.assertTrue(inventory.take(self.product.id, 5))
+        self.assertEqual(self.available(), 5)
+        self.assertFalse(inventory.take(self.product.id, 6))
+        self.assertEqual(self.available(), 5)
+        self.assertTrue(inventory.take(self.product.id, 5))
+        self.assertFalse(inventory.take(self.product.id, 1))
+
+    def test_cart_holds_expire_in_bulk(self):
+        self.assertTrue(inventory.reserve(self.buyer, self.product.id, 6))
+        self.assertTrue(inventory.reserve(self.buyer, self.product.id, 2))
+        self.assertFalse(inventory.reserve(self.rival, self.product.id, 3))
+        self.assertEqual(StockHold.objects.get(buyer=self.buyer).quantity, 8)
+        self.assertEqual(inventory.unreserve(self.buyer, self.product.id, 1), 1)
+        self.assertTrue(inventory.reserve(self.rival, self.product.id, 3))
+
+        self.assertEqual(inventory.sweep()['holds'], 0)
+        later = timezone.now() + inventory.CART_HOLD + timedelta(minutes=1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(inventory.sweep(now=later, batch_size=10)['holds'], 2)
+        # 홀드 두 개를 상품마다 UPDATE 한 번으로 돌려놓는다
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "shop_stockshard"') for query in queries), 1)
+        self.assertEqual((self.available(), StockHold.objects.count()), (10, 0))
+
+        # 표시용 Product.stock 은 checkpoint 가 맞춘다
+        inventory.take(self.product.id, 4)
+        self.assertEqual(inventory.checkpoint(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+
+    def test_restock_counts_units_still_held(self):
+        inventory.reserve(self.buyer, self.product.id, 3)
+        [order] = checkout.place_order(self.rival, {self.product.id: 2})
+        # 판매자가 재고를 12 로 고친다: 잡힌 5 개를 뺀 7 개만 바로 팔 수 있다
+        inventory.restock(self.product.id, 12)
+        self.assertEqual(self.available(), 7)
+        later = timezone.now() + inventory.PAYMENT_HOLD + timedelta(minutes=1)
+        inventory.sweep(now=later)
+        self.assertEqual(self.available(), 12)
+
+        # 잡힌 수량보다 적게 고치면 장바구니 홀드부터, 그다음 최근 미결제 주문의 홀드를 놓는다
+        inventory.reserve(self.buyer, self.product.id, 4)
+        orders = [checkout.place_order(self.rival, {self.product.id: 3})[0] for _ in range(2)]
+        inventory.restock(self.product.id, 4)
+        self.assertFalse(StockHold.objects.exists())
+        self.assertEqual([Order.objects.get(id=order.id).stock_held for order in orders], [3, 0])
+        self.assertEqual(self.available(), 1)
+        inventory.sweep(now=later + timedelta(days=1))
+        self.assertEqual(self.available(), 4)
+
+    def test_checkpoint_and_restock_agree_on_stock(self):
+        inventory.reserve(self.buyer, self.product.id, 3)
+        checkout.place_order(self.rival, {self.product.id: 2})
+        # checkpoint 는 잡힌 수량까지 포함한 전체 재고를 적는다 (수정 폼에 보이는 값)
+        inventory.checkpoint()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.available()), (10, 5))
+
+        # 판매자가 폼에서 하나 늘리면 바로 팔 수 있는 수량도 하나 는다
+        self.client.login(username='seller', password='12345')
+        self.client.post(reverse('product_update', args=[self.product.id]),
+                         {'name': '딸기', 'description': '제철', 'price': 1500, 'stock': 11})
+        self.assertEqual(self.available(), 6)
+        self.assertEqual(inventory.checkpoint(), 0)
+        inventory.unreserve(self.buyer, self.product.id)
+        self.assertEqual(self.available(), 9)
+
+    def test_unpaid_order_returns_stock_until_payment_restarts(self):
+        inventory.reserve(self.buyer, self.product.id, 4)
+        [order] = checkout.place_order(self.buyer, {self.product.id: 4})
+        self.assertEqual((order.stock_held, self.available()), (4, 6))
+
+        later = timezone.now() + inventory.PAYMENT_HOLD + timedelta(minutes=1)
+        self.assertEqual(inventory.sweep(now=later)['orders'], 1)
+        order.refresh_from_db()
+        self.assertEqual((order.stock_held, order.payment_status, self.available()), (0, 'expired', 10))
+
+        order = Order.objects.select_related('product').get(id=order.id)
+        self.assertTrue(inventory.hold_for_payment(order))
+        self.assertEqual((Order.objects.get(id=order.id).stock_held, self.available()), (4, 6))
+        # 결제된 주문의 재고는 돌려놓지 않는다
+        Order.objects.filter(id=order.id).update(payment_status='paid')
+        self.assertEqual(inventory.sweep(now=later + inventory.PAYMENT_HOLD)['orders'], 0)
+
+    def test_cart_views_hold_and_release(self):
+        self.client.login(username='buyer', password='12345')
+        self.client.post(reverse('add_to_cart', args=[self.product.id]))
+        self.client.get(reverse('update_cart', args=[self.product.id, 'increase']))
+        self.assertEqual((StockHold.objects.get().quantity, self.available()), (2, 8))
+        self.client.get(reverse('update_cart', args=[self.product.id, 'decrease']))
+        self.assertEqual(self.available(), 9)
+        self.client.get(reverse('update_cart', args=[self.product.id, 'remove']))
+        self.assertEqual((StockHold.objects.count(), self.available()), (0, 10))
+
+        self.client.login(username='seller', password='12345')
+        self.client.post(reverse('product_update', args=[self.product.id]),
+                         {'name': '딸기', 'description': '제철', 'price': 1500, 'stock': 3})
+        self.assertEqual((self.available(), StockShard.objects.count()), (3, inventory.SHARDS))
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class ForecastTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        self.product = Product.objects.create(name='딸기', description='', price=1000, seller=seller)
+        self.start = date(2024, 1, 1)
+        self.prices = [1000 + 10 * i + (i % 3) * 5 for i in range(40)]
+        PriceHistory.objects.bulk_create([
+            PriceHistory(product=self.product, date=self.start + timedelta(days=i), average_price=price)
+            for i, price in enumerate(self.prices)
+        ])
+
+    def test_models_match_reference(self):
+        prices = np.array(self.prices, dtype=float)
+        expected = [sum(self.prices[max(0, i - 11):i + 1]) / len(self.prices[max(0, i - 11):i + 1]) for i in range(40)]
+        np.testing.assert_allclose(forecast.rolling_mean(prices), expected)
+
+        level, expected = prices[0], []
+        for price in prices:
+            level = 0.3 * price + 0.7 * level
+            expected.append(level)
+        np.testing.assert_allclose(forecast.exponential_smoothing(prices), expected)
+        long_series = np.linspace(1000, 2000, 5000)
+        self.assertTrue(np.isfinite(forecast.exponential_smoothing(long_series, alpha=0.9)).all())
+
+    def test_forecast_horizon_and_cache(self):
+        with self.assertNumQueries(1):
+            records = forecast.get_forecast(self.product.id, 'linear')
+        self.assertEqual(len(records), 40 + forecast.HORIZON)
+        self.assertEqual(records[-1]['date'], self.start + timedelta(days=39 + forecast.HORIZON))
+        self.assertIsNone(records[-1]['average_price'])
+        self.assertGreater(records[-1]['predicted_price'], records[39]['predicted_price'])
+        with self.assertNumQueries(0):
+            forecast.get_forecast(self.product.id, 'smoothing')
+
+    def test_new_history_invalidates_cache(self):
+        forecast.get_forecast(self.product.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            PriceHistory.objects.create(product=self.product, date=self.start + timedelta(days=40), average_price=5000)
+        self.assertEqual(len(forecast.get_forecast(self.product.id)), 41 + forecast.HORIZON)
+
+    def test_batch_matches_single(self):
+        single = forecast.get_forecast(self.product.id, 'rolling')
+        cache.clear()
+        self.assertEqual(forecast.forecast_all(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(forecast.get_forecast(self.product.id, 'rolling'), single)
+
+    def test_price_trend_view(self):
+        response = self.client.get(reverse('price_trend', args=[self.product.id]), {'model': 'smoothing'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['price_history']), 40 + forecast.HORIZON)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class PriceHistoryPipelineTests(TestCase):
+
+    def setUp(self):
+        seller = CustomUser.objects.create_user(username='seller', password='12345', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='12345')
+        self.product = Product.objects.create(name='딸기', description='', price=1000, seller=seller)
+        self.day1 = timezone.make_aware(datetime(2024, 5, 1, 10))
+        self.day2 = self.day1 + timedelta(days=1)
+
+    # when 에 결제된 주문 (평균 단가는 결제한 날로 묶는다)
+    def order(self, when, quantity, total_price):
+        Order.objects.create(product=self.product, buyer=self.buyer, quantity=quantity, total_price=total_price,
+                             payment_status='paid', paid_at=when)
+
+    def history(self):
+        return dict(PriceHistory.objects.values_list('date', 'average_price'))
+
+    def test_daily_average_unit_price(self):
+        self.order(self.day1, 2, 2000)
+        self.order(self.day1, 1, 1300)
+        self.order(self.day2, 4, 4400)
+        # 결제되지 않은 주문은 평균 단가에 들어가지 않는다
+        Order.objects.create(product=self.product, buyer=self.buyer, quantity=1, total_price=9000)
+        self.assertEqual(stats.aggregate_price_history(chunk_size=2, now=self.day2 + timedelta(hours=1)), 2)
+        self.assertEqual(self.history(), {self.day1.date(): Decimal('1100.00'), self.day2.date(): Decimal('1100.00')})
+
+    def test_watermark_skips_processed_days_and_is_idempotent(self):
+        self.order(self.day1, 1, 1000)
+        stats.aggregate_price_history(now=self.day2)
+        self.order(self.day2, 1, 1200)
+        # 이미 처리한 날은 다시 읽지 않는다
+        Order.objects.filter(paid_at__lt=self.day2).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(stats.aggregate_price_history(now=self.day2 + timedelta(hours=1)), 1)
+        self.order(self.day2, 1, 1400)
+        stats.aggregate_price_history(now=self.day2 + timedelta(hours=2))
+        stats.aggregate_price_history(now=self.day2 + timedelta(hours=2))
+        self.assertEqual(self.history(), {self.day1.date(): Decimal('1000.00'), self.day2.date(): Decimal('1300.00')})
+        self.assertEqual(
+            AggregationWatermark.objects.get(name=stats.PRICE_HISTORY_WATERMARK).position,
+            self.day2.replace(hour=0))
+
+
+    def test_upsert_without_conflict_target(self):
+        # MySQL 은 충돌 대상(unique_fields)을 받지 않는다. 넘기면 bulk_create 가 NotSupportedError 를 낸다
+        self.order(self.day1, 1, 1000)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch('django.db.models.query.QuerySet._batched_insert', return_value=[]) as insert:
+            self.assertEqual(stats.aggregate_price_history(now=self.day2), 1)
+        self.assertEqual(insert.call_args.kwargs['unique_fields'], None)
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class CategoryComparisonTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.berry = Category.objects.create(name='딸기', slug='berry')
+        self.grape = Category.objects.create(name='포도', slug='grape')
+        sellers = [CustomUser.objects.create_user(username=f'seller{i}', password='12345', is_seller=True) for i in range(3)]
+        for i, price in enumerate([1000, 2000, 3000, 4000, 5000]):
+            Product.objects.create(name=f'딸기 {i}', description='', price=price, seller=sellers[i % 3], category=self.berry)
+        Product.objects.create(name='포도', description='', price=7000, seller=sellers[0], category=self.grape)
+        Product.objects.create(name='기타', description='', price=99000, seller=sellers[0])
+
+    def test_category_stats(self):
+        with self.assertNumQueries(2):
+            results = comparison.get_category_stats()
+        berry = results[self.berry.id]
+        self.assertEqual((berry['products'], berry['sellers']), (5, 3))
+        self.assertEqual((berry['min'], berry['median'], berry['max']), (1000, 3000, 5000))
+        self.assertEqual((berry['p25'], berry['p75'], berry['p90']), (2000, 4000, 4600))
+        self.assertEqual(results[self.grape.id]['median'], 7000)
+        self.assertEqual(len(results), 2)
+        with self.assertNumQueries(0):
+            comparison.get_category_stats()
+
+    def test_percentiles_read_only_neighbouring_rows(self):
+        seller = CustomUser.objects.get(username='seller0')
+        prices = [(i * 37) % 101 * 100 + 500 for i in range(60)]
+        Product.objects.bulk_create([
+            Product(name=f'포도 {i}', description='', price=price, seller=seller, category=self.grape)
+            for i, price in enumerate(prices)
+        ])
+        prices.append(7000)
+        rows = comparison.percentile_rows()[self.grape.id]
+        self.assertLessEqual(len(rows), 2 * len(comparison.PERCENTILES))
+        grape = comparison.compute_category_stats()[self.grape.id]
+        self.assertEqual([grape['p25'], grape['median'], grape['p75'], grape['p90']],
+                         [round(float(value), 2) for value in np.percentile(prices, comparison.PERCENTILES)])
+        self.assertEqual((grape['products'], grape['avg']), (61, round(sum(prices) / 61, 2)))
+
+    def test_price_change_invalidates(self):
+        comparison.get_category_stats()
+        product = Product.objects.get(name='포도')
+        product.price = 9000
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(comparison.get_category_stats()[self.grape.id]['max'], 9000)
+
+    def test_views(self):
+        response = self.client.get(reverse('compare_prices'), {'format': 'json'})
+        self.assertEqual([row['name'] for row in response.json()['categories']], ['딸기', '포도'])
+        response = self.client.get(reverse('category'))
+        self.assertContains(response, '중간값 3000.0원')
+        response = self.client.get(reverse('product_list'), {'category': 'grape'})
+        self.assertEqual([row['name'] for row in response.context['products']], ['포도'])
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class DummyDataTests(TestCase):
+
+    def generate(self, **options):
+        call_command('create_dummy_data', stdout=StringIO(), sellers=4, buyers=20, products=30, orders=500,
+                     reviews=40, price_days=10, batch_size=128, **options)
+        return list(Order.objects.order_by('id').values_list('product__name', 'buyer__username', 'quantity', 'total_price'))
+
+    def test_counts_and_derived_tables(self):
+        self.generate()
+        self.assertEqual(CustomUser.objects.filter(is_seller=True).count(), 4)
+        self.assertEqual((Product.objects.count(), Order.objects.count(), Review.objects.count()), (30, 500, 40))
+        self.assertEqual(PriceHistory.objects.count(), 300)
+        self.assertEqual(ProductDailyStats.objects.aggregate(total=Sum('units'))['total'],
+                         Order.objects.aggregate(total=Sum('quantity'))['total'])
+        # 비밀번호 해시는 하나를 공유한다
+        self.assertEqual(CustomUser.objects.values('password').distinct().count(), 1)
+        self.assertTrue(self.client.login(username='buyer3', password='password123'))
+
+    def test_same_seed_same_data(self):
+        first = self.generate(seed=7)
+        Order.objects.all().delete()
+        Product.objects.all().delete()
+        self.assertEqual(self.generate(seed=7), first)
+
+
+# 화면을 그리는 뷰별 최대 쿼리 수. 로그인한 페이지는 세션/사용자 조회 2건 포함
+def view_query_budgets(product):
+    return [
+        (reverse('product_list'), 3),
+        (reverse('product_feed'), 1),
+        (reverse('product_detail', args=[product.id]), 7),
+        (reverse('price_trend', args=[product.id]), 4),
+        (reverse('cart'), 3),
+        (reverse('checkout'), 3),
+        (reverse('purchase_history'), 3),
+        (reverse('profile'), 2),
+        (reverse('seller_ranking'), 4),
+        (reverse('compare_prices'), 4),
+        (reverse('category'), 5),
+    ]
+
+
+class QueryBudgetMixin:
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using='default'):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(len(queries), budget, '%d queries:\n%s' % (len(queries), '\n'.join(queries)))
+
+    def get_queries(self, url, **params):
+        # 캐시된 결과가 쿼리 수를 가리지 않도록 매번 비운다
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, url)
+        return [query['sql'] for query in context.captured_queries]
+
+    def set_cart(self, user, lines):
+        value = Cart(lines).dumps()
+        salt = f'{COOKIE_SALT}.{user.pk}'
+        self.client.cookies[COOKIE_NAME] = signing.get_cookie_signer(salt=COOKIE_NAME + salt).sign(value)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class QueryPlanTests(QueryBudgetMixin, TestCase):
+    # 행이 많아지는 테이블: 이 테이블을 인덱스 없이 전체 스캔하면 실패로 본다
+    LARGE_TABLES = ['shop_order', 'shop_pricehistory', 'shop_review', 'shop_productdailystats', 'shop_customuser']
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.category = Category.objects.create(name='딸기', slug='strawberry')
+        self.products = [
+            Product.objects.create(name=f'딸기 {i}', description='설향', price=1000 * (i + 1),
+                                   seller=self.seller, category=self.category)
+            for i in range(5)
+        ]
+        today = timezone.localdate()
+        for product in self.products:
+            PriceHistory.objects.bulk_create([
+                PriceHistory(product=product, date=today - timedelta(days=d), average_price=product.price)
+                for d in range(1, 15)
+            ])
+            Order.objects.create(product=product, buyer=self.buyer, quantity=1, total_price=product.price)
+            Review.objects.create(product=product, user=self.buyer, content='달아요', rating=5)
+        self.client.login(username='buyer', password='pw')
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def full_scans(self, sql, params):
+        plan = self.explain(sql, params)
+        if connection.vendor == 'sqlite':
+            return [
+                line for line in plan
+                if any(line in (f'SCAN {table}', f'SCAN {table} AS {table}') for table in self.LARGE_TABLES)
+            ]
+        return [row for row in plan if row.get('type') == 'ALL' and row.get('table') in self.LARGE_TABLES]
+
+    def uses_index(self, queryset, index_name):
+        sql, params = queryset.query.sql_with_params()
+        plan = self.explain(sql, params)
+        return any(index_name in str(line) for line in plan)
+
+    def test_hot_filters_use_their_index(self):
+        product = self.products[0]
+        since = timezone.now() - timedelta(days=7)
+        cases = [
+            (Order.objects.filter(product=product, date_ordered__gte=since), 'order_product_date_idx'),
+            (Order.objects.filter(buyer=self.buyer, product=product), 'order_buyer_product_idx'),
+            (Order.objects.filter(buyer=self.buyer).order_by('-date_ordered'), 'order_buyer_date_idx'),
+            (Order.objects.filter(paid_at__gte=since), 'order_paid_idx'),
+            (CustomUser.objects.filter(is_seller__in=[True]), 'user_is_seller_idx'),
+            (Product.objects.filter(name='딸기 1'), 'product_name_idx'),
+            (PriceHistory.objects.filter(product=product).order_by('date').values_list('date', 'average_price'),
+             'pricehistory_covering_idx'),
+            (Review.objects.filter(product=product).order_by('-rating', '-id'), 'review_product_rating_idx'),
+        ]
+        for queryset, index_name in cases:
+            with self.subTest(index=index_name):
+                self.assertTrue(self.uses_index(queryset, index_name))
+
+    def test_views_stay_within_query_budget_without_full_scans(self):
+        self.set_cart(self.buyer, {product.id: 1 for product in self.products})
+        for url, budget in view_query_budgets(self.products[0]):
+            with self.subTest(url=url):
+                queries = self.get_queries(url)
+                self.assertLessEqual(len(queries), budget, '\n'.join(queries))
+                for sql in queries:
+                    # 캡처된 SQL 은 값이 이미 채워져 있으므로 파라미터 없이 다시 EXPLAIN 한다
+                    if sql.lstrip().upper().startswith('SELECT'):
+                        self.assertEqual(self.full_scans(sql, None), [], sql)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class ViewQueryScalingTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.category = Category.objects.create(name='딸기', slug='strawberry')
+        self.product = Product.objects.create(name='딸기', description='설향', price=1000,
+                                              seller=self.seller, category=self.category)
+        self.add_rows(2)
+        self.client.login(username='buyer', password='pw')
+
+    # 관계가 있는 행을 n 개씩 더 만든다 (상품, 주문, 리뷰 작성자, 장바구니 줄)
+    def add_rows(self, n):
+        start = Product.objects.count()
+        products = Product.objects.bulk_create([
+            Product(name=f'상품 {start + i}', description='설명', price=1000 + i,
+                    seller=self.seller, category=self.category)
+            for i in range(n)
+        ])
+        Order.objects.bulk_create([
+            Order(product=product, buyer=self.buyer, quantity=1, total_price=product.price)
+            for product in products
+        ])
+        reviewers = CustomUser.objects.bulk_create([
+            CustomUser(username=f'reviewer{start + i}') for i in range(n)
+        ])
+        Review.objects.bulk_create([
+            Review(product=self.product, user=user, content='달아요', rating=4) for user in reviewers
+        ])
+        self.set_cart(self.buyer, {product.id: 1 for product in Product.objects.order_by('-id')[:50]})
+
+    def test_query_count_does_not_grow_with_rows(self):
+        budgets = view_query_budgets(self.product)
+        small = {url: len(self.get_queries(url)) for url, _ in budgets}
+        self.add_rows(120)
+        for url, budget in budgets:
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    self.get_queries(url)
+                self.assertEqual(len(self.get_queries(url)), small[url])
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class OrderExportTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.other_seller = CustomUser.objects.create_user(username='other', password='pw', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.product = Product.objects.create(name='딸기, 설향', description='', price=1000, seller=self.seller)
+        self.other = Product.objects.create(name='사과', description='', price=2000, seller=self.other_seller)
+        self.orders = Order.objects.bulk_create(
+            [Order(product=self.product, buyer=self.buyer, quantity=i, total_price=1000 * i) for i in range(1, 6)]
+            + [Order(product=self.other, buyer=self.buyer, quantity=1, total_price=2000)]
+        )
+
+    def download(self, name, fmt):
+        response = self.client.get(reverse(name, args=[fmt]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8-sig')
+
+    def test_buyer_history_csv(self):
+        self.client.login(username='buyer', password='pw')
+        rows = list(csv.reader(StringIO(self.download('export_purchase_history', 'csv'))))
+        self.assertEqual(rows[0][:2], ['order_id', 'date_ordered'])
+        self.assertEqual(len(rows), 7)
+        # 쉼표가 들어간 상품명도 한 칸으로 유지된다
+        self.assertEqual(rows[1][3], '딸기, 설향')
+
+    def test_seller_sales_ndjson_only_own_products(self):
+        self.client.login(username='seller', password='pw')
+        lines = [json.loads(line) for line in self.download('export_sales', 'ndjson').splitlines()]
+        self.assertEqual([line['quantity'] for line in lines], [1, 2, 3, 4, 5])
+        self.assertEqual({line['buyer'] for line in lines}, {'buyer'})
+
+    def test_buyers_cannot_export_sales_and_unknown_format_404s(self):
+        self.client.login(username='buyer', password='pw')
+        self.assertEqual(self.client.get(reverse('export_sales', args=['csv'])).status_code, 302)
+        self.assertEqual(self.client.get(reverse('export_purchase_history', args=['xlsx'])).status_code, 404)
+
+    def test_rows_are_read_in_keyset_batches(self):
+        queryset, columns = export.buyer_orders(self.buyer)
+        with self.assertMaxQueries(2):  # 6건을 4건씩: 두 번째 배치가 덜 차면 거기서 멈춘다
+            rows = list(export.iter_rows(queryset, columns, batch_size=4))
+        self.assertEqual([row[0] for row in rows], [order.id for order in self.orders])
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class KakaoPayClientTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = FakeKakaoServer().start()
+        self.addCleanup(self.server.stop)
+        self.client_api = KakaoPayClient(self.server.url, 'test', timeout=(1, 1), backoff=0)
+        self.addCleanup(self.client_api.close)
+
+    def ready(self, order_id, **kwargs):
+        return self.client_api.ready(
+            partner_order_id=order_id, partner_user_id=1, item_name='딸기', quantity=1, total_amount=1000,
+            approval_url='http://testserver/ok/', fail_url='http://testserver/fail/',
+            cancel_url='http://testserver/cancel/', **kwargs)
+
+    def test_connections_are_reused(self):
+        for order_id in range(10):
+            self.ready(order_id)
+        self.assertEqual(self.server.count('/v1/payment/ready'), 10)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_ready_is_idempotent_per_partner_order_id(self):
+        first = self.ready(7)
+        self.assertEqual(self.ready(7)['tid'], first['tid'])
+        self.assertEqual(self.server.count('/v1/payment/ready'), 1)
+
+    def test_ready_retries_transient_errors_within_bound(self):
+        self.server.fail_first = 2
+        self.assertIn('tid', self.ready(1))
+        self.assertEqual(self.server.count('/v1/payment/ready'), 3)
+
+        self.server.fail_first = 5
+        with self.assertRaises(KakaoPayError):
+            self.ready(2)
+        self.assertEqual(self.server.count('/v1/payment/ready'), 3 + 1 + kakaopay.MAX_RETRIES)
+
+    def test_approve_is_not_retried_after_reaching_upstream(self):
+        tid = self.ready(3)['tid']
+        self.server.fail_first = 1
+        with self.assertRaises(KakaoPayError):
+            self.client_api.approve(tid, 3, 1, 'pg')
+        self.assertEqual(self.server.count('/v1/payment/approve'), 1)
+        # 성공한 승인은 캐시되어 다시 보내지 않는다
+        self.server.fail_first = 0
+        self.client_api.approve(tid, 3, 1, 'pg')
+        self.client_api.approve(tid, 3, 1, 'pg')
+        self.assertEqual(self.server.count('/v1/payment/approve'), 2)
+
+    def test_read_timeout_and_unreachable_upstream(self):
+        self.server.latency = 0.5
+        slow = KakaoPayClient(self.server.url, 'test', timeout=(1, 0.1), backoff=0)
+        with self.assertRaises(KakaoPayError):
+            slow.approve('T1', 1, 1, 'pg')
+        self.assertEqual(self.server.count('/v1/payment/approve'), 1)
+
+        down = KakaoPayClient('http://127.0.0.1:9', 'test', timeout=(0.2, 0.2), backoff=0)
+        with self.assertRaises(KakaoPayError):
+            down.approve('T1', 1, 1, 'pg')
+
+    def test_kakao_pay_view_uses_gateway(self):
+        buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        product = Product.objects.create(name='딸기', description='', price=1000, seller=seller)
+        order = Order.objects.create(product=product, buyer=buyer, quantity=2, total_price=2000)
+        self.client.login(username='buyer', password='pw')
+        with override_settings(KAKAO_API_URL=self.server.url):
+            response = self.client.get(reverse('kakao_pay', args=[order.id]))
+        order.refresh_from_db()
+        self.assertTrue(order.kakao_tid)
+        self.assertEqual(response.url, f'{self.server.url}/pay/{order.kakao_tid}')
+        sent = self.server.requests[-1][1]
+        self.assertEqual((sent['partner_order_id'], sent['total_amount']), (str(order.id), '2000'))
+        self.assertTrue(sent['approval_url'].endswith(f"{reverse('payment_success')}?order_id={order.id}"))
+        self.assertEqual(order.payment_status, 'ready')
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class PaymentSettlementTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = FakeKakaoServer().start()
+        self.addCleanup(self.server.stop)
+        self.enterContext(self.settings(KAKAO_API_URL=self.server.url))
+        self.api = KakaoPayClient(self.server.url, 'test', backoff=0)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.product = Product.objects.create(name='딸기', description='', price=1000, seller=seller)
+        self.orders = [
+            Order.objects.create(product=self.product, buyer=self.buyer, quantity=1, total_price=1000)
+            for _ in range(5)
+        ]
+        self.client.login(username='buyer', password='pw')
+        for order in self.orders:
+            self.client.get(reverse('kakao_pay', args=[order.id]))
+            order.refresh_from_db()
+
+    def callback(self, order, pg_token='pg'):
+        return self.client.get(reverse('payment_success'), {'order_id': order.id, 'pg_token': pg_token})
+
+    def test_callback_only_enqueues(self):
+        response = self.callback(self.orders[0])
+        self.assertEqual(response.status_code, 200)
+        self.callback(self.orders[0])
+        self.assertEqual(PaymentCallback.objects.count(), 1)
+        self.assertEqual(self.server.count('/v1/payment/approve'), 0)
+        self.orders[0].refresh_from_db()
+        self.assertEqual(self.orders[0].payment_status, 'approving')
+        self.assertEqual(self.client.get(reverse('payment_success'), {'order_id': self.orders[1].id}).url,
+                         reverse('payment_fail'))
+        for order_id in ('abc', '', '1.5', '-1'):
+            response = self.client.get(reverse('payment_success'), {'order_id': order_id, 'pg_token': 'pg'})
+            self.assertEqual(response.status_code, 404, order_id)
+
+    def test_settle_approves_batch_with_bulk_updates(self):
+        for order in self.orders:
+            self.callback(order)
+        # 가져가기 3건 + 결제 반영 2건 + 판매 집계 3건 + 콜백 1건 (+ savepoint 6건).
+        # 주문 수와 무관하다 (판매 집계는 상품/날짜마다 한 번)
+        with self.assertMaxQueries(15):
+            counts = settlement.settle_pending(client=self.api, batch_size=10)
+        self.assertEqual(counts, {'paid': 5, 'failed': 0, 'retry': 0})
+        self.assertEqual(Order.objects.filter(payment_status='paid', paid_at__isnull=False).count(), 5)
+        self.assertFalse(PaymentCallback.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(settlement.settle_pending(client=self.api), {'paid': 0, 'failed': 0, 'retry': 0})
+        # 결제가 끝난 뒤에야 판매로 센다
+        self.assertEqual((ProductDailyStats.objects.get().units, SellerStats.objects.get().total_sales), (5, 5))
+
+    def test_rejected_and_unreachable_approvals(self):
+        self.callback(self.orders[0])
+        PaymentCallback.objects.update(tid='T-unknown')
+        self.callback(self.orders[1])
+        PaymentCallback.objects.filter(order=self.orders[1]).update(claimed_at=timezone.now())  # 다른 워커가 처리 중
+        self.assertEqual(settlement.settle_pending(client=self.api), {'paid': 0, 'failed': 1, 'retry': 0})
+        self.orders[0].refresh_from_db()
+        self.assertEqual(self.orders[0].payment_status, 'failed')
+
+        down = KakaoPayClient('http://127.0.0.1:9', 'test', timeout=(0.2, 0.2), backoff=0)
+        later = timezone.now() + settlement.CLAIM_LEASE + timedelta(seconds=1)
+        self.assertEqual(settlement.settle_pending(client=down, now=later), {'paid': 0, 'failed': 0, 'retry': 1})
+        self.assertTrue(PaymentCallback.objects.filter(order=self.orders[1], claimed_at__isnull=True).exists())
+        self.assertEqual(settlement.settle_pending(client=self.api), {'paid': 1, 'failed': 0, 'retry': 0})
+
+    def test_reconcile_sweeps_stale_tids(self):
+        lost, abandoned, recent = self.orders[:3]
+        # 승인은 됐지만 콜백이 유실된 주문
+        self.api.approve(lost.kakao_tid, lost.id, self.buyer.id, 'pg')
+        Order.objects.filter(id__in=[lost.id, abandoned.id]).update(
+            kakao_ready_at=timezone.now() - timedelta(hours=1))
+        counts = settlement.reconcile(client=self.api)
+        self.assertEqual(counts['paid'], 1)
+        self.assertEqual(counts['expired'], 1)
+        statuses = dict(Order.objects.filter(id__in=[lost.id, abandoned.id, recent.id])
+                        .values_list('id', 'payment_status'))
+        self.assertEqual(statuses, {lost.id: 'paid', abandoned.id: 'expired', recent.id: 'ready'})
+        self.assertIsNone(Order.objects.get(id=abandoned.id).kakao_tid)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class AuctionBiddingTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True,
+                                                     is_approved=True)
+        self.alice = CustomUser.objects.create_user(username='alice', password='pw')
+        self.bob = CustomUser.objects.create_user(username='bob', password='pw')
+        self.product = Product.objects.create(name='샤인머스캣', description='', price=30000, seller=self.seller)
+        self.auction = Auction.objects.create(product=self.product, starting_price=10000, min_increment=500,
+                                              ends_at=timezone.now() + timedelta(hours=1))
+        self.books = bidding.BookRegistry()
+
+    def bid(self, user, amount, registry=None):
+        return bidding.place_bid(self.auction.id, user.id, amount, registry=registry or self.books)
+
+    def test_bids_must_beat_the_book(self):
+        self.bid(self.alice, 10000)
+        with self.assertRaisesMessage(bidding.BidRejected, '10500'):
+            self.bid(self.bob, 10400)
+        self.bid(self.bob, 11000)
+        with self.assertRaises(bidding.BidRejected):
+            self.bid(self.seller, 20000)
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.current_price, self.auction.highest_bidder, self.auction.bid_count),
+                         (Decimal('11000'), self.bob, 2))
+        # 최고가 조회는 DB 를 읽지 않는다
+        with self.assertNumQueries(0):
+            snapshot = bidding.highest(self.auction.id, registry=self.books)
+        self.assertEqual((snapshot['amount'], snapshot['minimum_next']), ('11000.00', '11500.00'))
+
+    def test_stale_book_in_another_process_cannot_lose_or_double_win(self):
+        other_process = bidding.BookRegistry()
+        other_process.get(self.auction.id)  # 같은 상태를 읽어 둔다
+        self.bid(self.alice, 12000)
+        # 다른 프로세스의 호가창은 아직 12000 을 모른다: version 조건에 걸려 다시 맞춘 뒤 거절한다
+        with self.assertRaises(bidding.BidRejected):
+            self.bid(self.bob, 11000, registry=other_process)
+        self.bid(self.bob, 13000, registry=other_process)
+        # 원래 프로세스도 다음 입찰에서 13000 을 알게 된다
+        with self.assertRaises(bidding.BidRejected):
+            self.bid(self.alice, 13000)
+        self.auction.refresh_from_db()
+        self.assertEqual((self.auction.current_price, self.auction.highest_bidder, self.auction.version),
+                         (Decimal('13000'), self.bob, 2))
+        self.assertEqual(list(self.auction.bids.order_by('amount').values_list('amount', flat=True)),
+                         [Decimal('12000'), Decimal('13000')])
+
+    def test_book_orders_many_bids(self):
+        book = bidding.OrderBook(self.auction.id)
+        amounts = [Decimal(int(value)) for value in np.random.default_rng(1).permutation(1000)]
+        for bid_id, amount in enumerate(amounts, 1):
+            book.push(amount, bid_id, self.alice.id)
+        self.assertEqual(book.best()['amount'], Decimal(999))
+        self.assertEqual([bid['amount'] for bid in book.top(3)], [Decimal(999), Decimal(998), Decimal(997)])
+
+    def test_close_creates_winner_order(self):
+        self.bid(self.alice, 15000)
+        later = timezone.now() + timedelta(hours=2)
+        with self.assertRaisesMessage(bidding.BidRejected, '종료'):
+            bidding.place_bid(self.auction.id, self.bob.id, 20000, now=later, registry=self.books)
+        self.assertEqual(bidding.close_due(now=later, registry=self.books), 1)
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.status, 'closed')
+        self.assertEqual((self.auction.order.buyer, self.auction.order.total_price), (self.alice, Decimal('15000')))
+        self.assertEqual(bidding.close_due(now=later, registry=self.books), 0)
+
+    def test_registry_keeps_only_live_books(self):
+        bidding.books.clear()
+        for auction_id in range(self.auction.id + 1, self.auction.id + 21):
+            self.assertEqual(self.client.get(reverse('auction_highest', args=[auction_id])).status_code, 404)
+        self.assertEqual(len(bidding.books), 0)
+
+        self.bid(self.alice, 15000)
+        self.assertEqual(len(self.books), 1)
+        bidding.close_due(now=timezone.now() + timedelta(hours=2), registry=self.books)
+        # 닫힌 경매도 조회는 되지만 호가창은 남기지 않는다
+        self.assertEqual(bidding.highest(self.auction.id, registry=self.books)['status'], 'closed')
+        self.assertEqual(len(self.books), 0)
+        Auction.objects.filter(id=self.auction.id).update(status='live')
+        self.books.get(self.auction.id).synced_at = 0.0  # 다음 조회에서 DB 를 다시 읽는다
+        Auction.objects.filter(id=self.auction.id).delete()
+        with self.assertRaises(Auction.DoesNotExist):
+            self.books.get(self.auction.id)
+        self.assertEqual(len(self.books), 0)
+
+    async def test_async_bid_endpoints(self):
+        await self.async_client.aforce_login(self.alice)
+        url = reverse('auction_bid', args=[self.auction.id])
+        response = await self.async_client.post(url, {'amount': '10000'})
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.post(url, {'amount': '10100'})
+        self.assertEqual(response.status_code, 409)
+        response = await self.async_client.get(reverse('auction_highest', args=[self.auction.id]))
+        self.assertEqual(response.json()['amount'], '10000.00')
+        await self.async_client.alogout()
+        response = await self.async_client.post(url, {'amount': '20000'})
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class LiveEventsTests(TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True,
+                                                     is_approved=True)
+        self.product = Product.objects.create(name='한라봉', description='', price=20000, seller=self.seller)
+        self.broker = live.Broker()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def events(self, subscription, timeout=0.1):
+        return self.loop.run_until_complete(subscription.get(timeout))
+
+    def test_slow_subscriber_keeps_only_latest_event(self):
+        subscription = self.broker.subscribe(['product:1', 'product:2'], self.loop)
+        for price in range(100):
+            self.broker.publish('product:1', 'price', {'price': price})
+        self.broker.publish('product:1', 'order', {'quantity': 1})
+        self.broker.publish('product:3', 'price', {'price': 1})  # 구독하지 않은 토픽
+        events = self.events(subscription)
+        self.assertEqual([(kind, data) for _, kind, _, data in events],
+                         [('price', {'price': 99}), ('order', {'quantity': 1})])
+        self.assertEqual(subscription.dropped, 99)
+        self.assertEqual(self.events(subscription), [])
+        self.broker.unsubscribe(subscription)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+        self.assertEqual(self.broker.publish('product:1', 'price', {'price': 1}), 0)
+
+    def test_publish_from_another_thread(self):
+        subscription = self.broker.subscribe(['auction:7'], self.loop)
+        thread = threading.Thread(target=self.broker.publish, args=('auction:7', 'bid', {'amount': '1000'}))
+        thread.start()
+        thread.join()
+        events = self.events(subscription, timeout=1)
+        self.assertEqual(live.format_event(events[0]).split('\n')[1:3],
+                         ['event: bid', 'data: {"amount": "1000", "topic": "auction:7"}'])
+
+    def test_model_changes_are_published_after_commit(self):
+        subscription = live.broker.subscribe([f'product:{self.product.id}'], self.loop)
+        self.addCleanup(live.broker.unsubscribe, subscription)
+        buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 18000
+            self.product.save()
+            Order.objects.create(product=self.product, buyer=buyer, quantity=2, total_price=36000)
+        events = {kind: data for _, kind, _, data in self.events(subscription)}
+        self.assertEqual(events['price']['price'], '18000')
+        self.assertEqual(events['order']['quantity'], 2)
+
+    def test_price_is_published_only_when_it_changes(self):
+        subscription = live.broker.subscribe([f'product:{self.product.id}'], self.loop)
+        self.addCleanup(live.broker.unsubscribe, subscription)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = '천혜향'
+            self.product.save()
+            deferred = Product.objects.defer('price').get(pk=self.product.pk)
+            deferred.stock = 5
+            with self.assertNumQueries(1):
+                deferred.save(update_fields=['stock'])
+        self.assertEqual(self.events(subscription), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.only('id', 'seller').get(pk=self.product.pk)
+            product.price = 21000
+            product.save()
+        self.assertEqual([(kind, data['price']) for _, kind, _, data in self.events(subscription)],
+                         [('price', '21000')])
+
+    def test_bid_is_published(self):
+        auction = Auction.objects.create(product=self.product, starting_price=10000, min_increment=500,
+                                         ends_at=timezone.now() + timedelta(hours=1))
+        subscription = live.broker.subscribe([f'auction:{auction.id}'], self.loop)
+        self.addCleanup(live.broker.unsubscribe, subscription)
+        bidder = CustomUser.objects.create_user(username='bidder', password='pw')
+        bidding.place_bid(auction.id, bidder.id, 12000, registry=bidding.BookRegistry())
+        [(_, kind, _, data)] = self.events(subscription)
+        self.assertEqual((kind, data['amount'], data['minimum_next']), ('bid', '12000.00', '12500.00'))
+
+    async def test_stream_endpoint(self):
+        url = reverse('live_events')
+        response = await self.async_client.get(url, {'product': 'x'})
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get(url, {'product': [self.product.id, self.product.id]})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        topic = f'product:{self.product.id}'
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        self.assertEqual(live.broker.subscriber_count(topic), 1)
+        live.publish(topic, 'price', {'price': '15000'})
+        chunk = await asyncio.wait_for(read, 1)
+        self.assertIn(b'event: price\ndata: {"price": "15000", "topic": "' + topic.encode() + b'"}', chunk)
+        # 연결이 끊기면 ASGI 핸들러가 읽던 작업을 취소한다. 그때 구독이 풀려야 한다
+        read = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        read.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await read
+        self.assertEqual(live.broker.subscriber_count(topic), 0)
+
+    async def test_asgi_app_releases_subscription_on_disconnect(self):
+        messages = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            if not messages:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': reverse('live_events'), 'query_string': b'auction=9'}
+        task = asyncio.ensure_future(live.asgi_app(scope, receive, send))
+        await asyncio.sleep(0.01)
+        self.assertEqual(live.broker.subscriber_count('auction:9'), 1)
+        live.publish('auction:9', 'bid', {'amount': '5000'})
+        await asyncio.sleep(0.01)
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(b'event: bid', messages[-1]['body'])
+        disconnected.set()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(live.broker.subscriber_count('auction:9'), 0)
+
+        messages.clear()
+        await live.asgi_app(dict(scope, query_string=b'auction=1&auction=x'), receive, send)
+        self.assertEqual(messages[0]['status'], 400)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True,
+                                                     is_approved=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.product = Product.objects.create(name='천혜향', description='', price=25000, seller=self.seller)
+
+    def test_anonymous_page_is_cached_until_products_change(self):
+        url = reverse('product_list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, '천혜향')
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='레드향', description='', price=27000, seller=self.seller)
+        self.assertContains(self.client.get(url), '레드향')
+        # 쿼리 문자열이 다르면 다른 페이지다
+        self.assertNotContains(self.client.get(url, {'sort': '-price', 'category': 'none'}), '레드향')
+
+    def test_fragments_for_logged_in_users(self):
+        self.client.force_login(self.buyer)
+        url = reverse('seller_ranking')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertFalse([q for q in context.captured_queries if 'shop_sellerstats' in q['sql']])
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(product=self.product, buyer=self.buyer, quantity=3, total_price=75000,
+                                 payment_status='paid', paid_at=timezone.now())
+        self.assertContains(self.client.get(url), '<td>3</td>')
+
+        # 리뷰 조각은 상품 범위 버전과 사용자별로 나뉜다
+        detail = reverse('product_detail', args=[self.product.id])
+        self.client.get(detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(product=self.product, user=self.buyer, content='향이 좋아요', rating=5)
+        self.assertContains(self.client.get(detail), reverse('review_edit', args=[review.id]))
+        self.client.logout()
+        response = self.client.get(detail)
+        self.assertContains(response, '향이 좋아요')
+        self.assertNotContains(response, reverse('review_edit', args=[review.id]))
+
+    def test_versions_survive_eviction(self):
+        key = pagecache.make_key('page', ['product:1'])
+        cache.delete('version:product:1')
+        self.assertNotEqual(pagecache.make_key('page', ['product:1']), key)
+        key = pagecache.make_key('page', ['product:1'])
+        pagecache.bump('product:1')
+        self.assertNotEqual(pagecache.make_key('page', ['product:1']), key)
+
+    def test_stale_value_is_served_while_one_request_recomputes(self):
+        calls = []
+        pagecache.get_or_set('page:test', lambda: calls.append(1) or 'old', timeout=60)
+        expires_at, value = cache.get('page:test')
+        cache.set('page:test', (expires_at - 120, value))
+        # 다른 요청이 다시 만드는 중이면 이전 값을 받는다
+        cache.add('page:test:lock', 1)
+        self.assertEqual(pagecache.get_or_set('page:test', lambda: calls.append(1) or 'new'), 'old')
+        cache.delete('page:test:lock')
+        self.assertEqual(pagecache.get_or_set('page:test', lambda: calls.append(1) or 'new'), 'new')
+        self.assertEqual(len(calls), 2)
+
+    def test_missing_value_is_computed_once_under_concurrency(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'page'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pagecache.get_or_set('page:herd', compute)))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((results, len(calls)), (['page'] * 10, 1))
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class RatingTotalsTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.other = CustomUser.objects.create_user(username='other', password='pw')
+        self.apple = Product.objects.create(name='사과', description='', price=10000, seller=self.seller)
+        self.pear = Product.objects.create(name='배', description='', price=12000, seller=self.seller)
+
+    def totals(self, product):
+        product.refresh_from_db()
+        return product.rating_count, product.rating_sum, product.rating_avg
+
+    def seller_totals(self):
+        stats = SellerStats.objects.get(seller=self.seller)
+        return stats.rating_count, stats.rating_sum
+
+    def test_totals_follow_review_changes(self):
+        first = Review.objects.create(product=self.apple, user=self.buyer, content='좋아요', rating=5)
+        Review.objects.create(product=self.apple, user=self.other, content='보통', rating=2)
+        self.assertEqual(self.totals(self.apple), (2, 7, Decimal('3.50')))
+
+        # 리뷰 수정 화면에서 별점을 바꾼다
+        self.client.force_login(self.buyer)
+        self.client.post(reverse('review_edit', args=[first.id]), {'content': '그냥 그래요', 'rating': 3})
+        self.assertEqual(self.totals(self.apple), (2, 5, Decimal('2.50')))
+
+        # 다른 상품으로 옮기거나 only() 로 읽어 지워도 맞는다
+        first.refresh_from_db()
+        first.product = self.pear
+        first.save()
+        self.assertEqual((self.totals(self.apple), self.totals(self.pear)),
+                         ((1, 2, Decimal('2.00')), (1, 3, Decimal('3.00'))))
+        Review.objects.only('id').get(pk=first.pk).delete()
+        self.assertEqual(self.totals(self.pear), (0, 0, Decimal('0.00')))
+        self.assertEqual(self.seller_totals(), (1, 2))
+        self.assertEqual(SellerStats.objects.get(seller=self.seller).avg_rating, 2)
+
+    def test_rebuild_repairs_drift(self):
+        Review.objects.create(product=self.apple, user=self.buyer, content='좋아요', rating=4)
+        Review.objects.bulk_create([Review(product=self.pear, user=self.other, content='최고', rating=5)])
+        Product.objects.filter(id=self.apple.id).update(rating_count=9, rating_sum=1)
+        out = StringIO()
+        call_command('rebuild_ratings', stdout=out)
+        self.assertIn('2 products', out.getvalue())
+        self.assertEqual((self.totals(self.apple), self.totals(self.pear)),
+                         ((1, 4, Decimal('4.00')), (1, 5, Decimal('5.00'))))
+        self.assertEqual(self.seller_totals(), (2, 9))
+        leaderboard.rebuild()
+        self.assertEqual(self.seller_totals(), (2, 9))
+
+    def test_apply_delta_and_scoped_rebuild(self):
+        ratings.apply_delta(self.apple.id, 2, 9)
+        ratings.apply_delta(self.apple.id, 0, 0)
+        self.assertEqual(self.totals(self.apple), (2, 9, Decimal('4.50')))
+        self.assertEqual(self.seller_totals(), (2, 9))
+        ratings.apply_delta(self.apple.id, -1, -4)
+        self.assertEqual(self.totals(self.apple), (1, 5, Decimal('5.00')))
+
+        # 상품을 주면 그 상품만 리뷰 원본으로 맞추고, 판매자 집계는 판매자의 전체 리뷰로 다시 센다
+        Review.objects.bulk_create([Review(product=self.pear, user=self.buyer, content='좋아요', rating=3)])
+        Product.objects.filter(id=self.apple.id).update(rating_count=7)
+        self.assertEqual(ratings.rebuild(products=[self.pear.id]), 1)
+        self.assertEqual(self.totals(self.pear), (1, 3, Decimal('3.00')))
+        self.assertEqual(Product.objects.get(id=self.apple.id).rating_count, 7)
+        self.assertEqual(self.seller_totals(), (1, 3))
+        self.assertEqual(ratings.rebuild(), 1)
+        self.assertEqual(self.totals(self.apple), (0, 0, Decimal('0.00')))
+
+    def test_rating_sort_and_filter_read_only_products(self):
+        Review.objects.create(product=self.apple, user=self.buyer, content='좋아요', rating=5)
+        Review.objects.create(product=self.pear, user=self.buyer, content='보통', rating=3)
+        queries = self.get_queries(reverse('product_feed'), sort='-rating', min_rating='4')
+        self.assertFalse([sql for sql in queries if 'shop_review' in sql])
+        response = self.client.get(reverse('product_feed'), {'sort': '-rating'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['사과', '배'])
+        response = self.client.get(reverse('product_feed'), {'min_rating': '4'})
+        self.assertEqual([row['rating_avg'] for row in response.json()['results']], ['5.00'])
+        with self.assertNumQueries(1):
+            top = leaderboard.top(10)
+        self.assertEqual(top[0].avg_rating, 4)
+
+
+@override_settings(SEARCH_INDEX_PATH=':memory:')
+class ReviewFeedTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.seller = CustomUser.objects.create_user(username='seller', password='pw', is_seller=True)
+        self.buyer = CustomUser.objects.create_user(username='buyer', password='pw')
+        self.product = Product.objects.create(name='귤', description='', price=9000, seller=self.seller)
+        Review.objects.bulk_create([
+            Review(product=self.product, user=self.buyer, content=f'리뷰 {i}', rating=i % 5 + 1) for i in range(25)
+        ])
+        self.ids = list(Review.objects.order_by('id').values_list('id', flat=True))
+
+    def walk(self, sort):
+        url = reverse('product_reviews', args=[self.product.id])
+        data = self.client.get(url, {'sort': sort}).json()
+        rows = data['results']
+        while data['next']:
+            data = self.client.get(url, {'sort': sort, 'cursor': data['next']}).json()
+            rows.extend(data['results'])
+        return rows
+
+    def test_feed_pages_through_every_review(self):
+        rows = self.walk('newest')
+        self.assertEqual([row['id'] for row in rows], self.ids[::-1])
+        rows = self.walk('rating')
+        self.assertEqual([(row['rating'], row['id']) for row in rows],
+                         sorted(((row['rating'], row['id']) for row in rows), reverse=True))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['username'], 'buyer')
+
+    def test_detail_renders_cached_first_page(self):
+        url = reverse('product_detail', args=[self.product.id])
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['reviews']), 10)
+        self.assertContains(response, response.context['next_review_cursor'])
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertFalse([q for q in context.captured_queries if 'shop_review' in q['sql']])
+        # 새 리뷰가 달리면 첫 페이지를 다시 만든다
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.buyer, content='새 리뷰', rating=5)
+        self.assertEqual(self.client.get(url).context['reviews'][0]['content'], '새 리뷰')
+        response = self.client.get(url, {'review_sort': 'rating'})
+        self.assertEqual([review['rating'] for review in response.context['reviews']], [5] * 6 + [4] * 4)
+
+
+class ProductionSettingsTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = Path(self.tmpdir.name)
+
+    def test_production_module(self):
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'x' * 50, 'ALLOWED_HOSTS': 'a.example,b.example'}):
+            os.environ.pop('CACHE_BACKEND', None)
+            os.environ.pop('CACHE_LOCATION', None)
+            module = importlib.reload(importlib.import_module('greenauction.settings_production'))
+        self.assertFalse(module.DEBUG)
+        self.assertEqual(module.ALLOWED_HOSTS, ['a.example', 'b.example'])
+        self.assertNotIn('debug_toolbar', module.INSTALLED_APPS)
+        self.assertFalse(any('debug_toolbar' in middleware for middleware in module.MIDDLEWARE))
+        self.assertEqual((module.DATABASES['default']['CONN_MAX_AGE'], module.DATABASES['default']['CONN_HEALTH_CHECKS']),
+                         (300, True))
+        [template] = module.TEMPLATES
+        self.assertEqual(template['OPTIONS']['loaders'][0][0], 'django.template.loaders.cached.Loader')
+        self.assertEqual(template['DIRS'], [module.BASE_DIR / 'shop' / 'templates'])
+        self.assertEqual(module.MIDDLEWARE[:2], ['django.middleware.security.SecurityMiddleware',
+                                                 'shop.middleware.StaticFilesMiddleware'])
+        self.assertEqual(module.CACHES['default']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+
+    def test_production_requires_shared_cache(self):
+        environ = {'DJANGO_SECRET_KEY': 'x' * 50, 'CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with mock.patch.dict(os.environ, environ), self.assertRaises(ImproperlyConfigured):
+            importlib.reload(importlib.import_module('greenauction.settings_production'))
+        environ.update(CACHE_BACKEND='django.core.cache.backends.memcached.PyMemcacheCache', CACHE_LOCATION='mc:11211')
+        with mock.patch.dict(os.environ, environ):
+            module = importlib.reload(importlib.import_module('greenauction.settings_production'))
+        self.assertEqual(module.CACHES['default'], {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': 'mc:11211', 'TIMEOUT': 300})
+
+    def test_collectstatic_hashes_and_precompresses(self):
+        source = self.root / 'src'
+        (source / 'css').mkdir(parents=True)
+        (source / 'css' / 'site.css').write_text(
+            'body { background: url("../img/leaf.png"); }\n' + '.card { margin: 0; }\n' * 100 +
+            '/*# sourceMappingURL=site.css.map */\n')
+        (source / 'img').mkdir()
+        (source / 'img' / 'leaf.png').write_bytes(b'\x89PNG' + bytes(600))
+        with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=self.root / 'out', STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'shop.storage.CompressedManifestStaticFilesStorage'}}):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            manifest = json.loads((self.root / 'out' / 'staticfiles.json').read_text())['paths']
+        css = self.root / 'out' / manifest['css/site.css']
+        self.assertIn(manifest['img/leaf.png'].split('/')[-1], css.read_text())
+        # 압축이 되는 파일만 .gz 를 만든다
+        self.assertEqual(gzip.decompress((css.parent / f'{css.name}.gz').read_bytes()), css.read_bytes())
+        self.assertFalse((self.root / 'out' / f"{manifest['img/leaf.png']}.gz").exists())
+
+    def test_collects_only_referenced_assets(self):
+        source = self.root / 'src'
+        for name in ('css/site.css', 'css/unused.css', 'css/font.css', 'fonts/leaf.woff2', 'js/app.js',
+                     'js/app.js.map', 'js/extra.js'):
+            (source / name).parent.mkdir(parents=True, exist_ok=True)
+            (source / name).write_text('x')
+        (source / 'css' / 'site.css').write_text('@import "font.css";\n.a { background: url(data:image/png;base64,AA==); }')
+        (source / 'css' / 'font.css').write_text('@font-face { src: url("../fonts/leaf.woff2?v=1#x"); }')
+        templates = self.root / 'templates'
+        templates.mkdir()
+        (templates / 'page.html').write_text("{% load static %}<link href=\"{% static 'css/site.css' %}\">"
+                                             '<script src="{% static "js/app.js" %}"></script>')
+        with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=self.root / 'out', STATIC_EXTRA_ASSETS=['js/extra.js'],
+                               STATICFILES_FINDERS=['shop.staticfinders.ReferencedFinder'],
+                               TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates', 'DIRS': [templates]}]):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        collected = {path.relative_to(self.root / 'out').as_posix()
+                     for path in (self.root / 'out').rglob('*') if path.is_file()}
+        self.assertEqual(collected, {'css/site.css', 'css/font.css', 'fonts/leaf.woff2', 'js/app.js', 'js/extra.js'})
+
+    def test_middleware_serves_precompressed_files(self):
+        source = self.root / 'src'
+        (source / 'js').mkdir(parents=True)
+        (source / 'js' / 'app.js').write_text('console.log("green market");\n' * 200)
+        storages = {'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                    'staticfiles': {'BACKEND': 'shop.storage.CompressedManifestStaticFilesStorage'}}
+        with override_settings(STATICFILES_DIRS=[source], STATIC_ROOT=self.root / 'out', STORAGES=storages, DEBUG=False):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with override_settings(MIDDLEWARE=['shop.middleware.StaticFilesMiddleware', *settings.MIDDLEWARE]):
+                hashed = '/static/' + json.loads((self.root / 'out' / 'staticfiles.json').read_text())['paths']['js/app.js']
+                response = self.client.get(hashed, HTTP_ACCEPT_ENCODING='gzip, deflate')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                                 (self.root / 'out' / 'js' / 'app.js').read_bytes())
+                plain = self.client.get(hashed)
+                self.assertNotIn('Content-Encoding', plain)
+                self.assertEqual(int(plain['Content-Length']), (self.root / 'out' / 'js' / 'app.js').stat().st_size)
+                # 해시가 없는 이름은 짧게만 캐시한다
+                self.assertEqual(self.client.get('/static/js/app.js')['Cache-Control'], 'public, max-age=60')
+                self.assertEqual(self.client.get('/static/js/missing.js').status_code, 404)
+
+                # 인코딩마다 ETag 가 다르다. 다른 인코딩의 ETag 로는 304 를 주지 않는다
+                gzip_etag, plain_etag = response['ETag'], plain['ETag']
+                self.assertNotEqual(gzip_etag, plain_etag)
+                self.assertEqual(self.client.get(hashed, HTTP_IF_NONE_MATCH=gzip_etag).status_code, 200)
+                cached = self.client.get(hashed, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzip_etag)
+                self.assertEqual((cached.status_code, cached['ETag'], cached['Vary']), (304, gzip_etag, 'Accept-Encoding'))
+                # 목록, 약한 비교, *
+                for header in (f'"other", {plain_etag}', f'W/{plain_etag}', '*'):
+                    self.assertEqual(self.client.get(hashed, HTTP_IF_NONE_MATCH=header).status_code, 304, header)
+                # q=0 은 받지 않는다는 뜻이다
+                for header in ('gzip;q=0', 'gzip; q=0.0, deflate', '*, gzip;q=0'):
+                    self.assertNotIn('Content-Encoding', self.client.get(hashed, HTTP_ACCEPT_ENCODING=header), header)
+                self.assertEqual(self.client.get(hashed, HTTP_ACCEPT_ENCODING='gzip;q=0.5')['Content-Encoding'], 'gzip')
+                self.assertIn('Content-Encoding', self.client.get(hashed, HTTP_ACCEPT_ENCODING='*'))
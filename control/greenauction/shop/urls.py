@@ -9,15 +9,19 @@ urlpatterns = [
     path('logout/', views.user_logout, name='logout'),
     path('profile/', views.profile, name='profile'),
     path('purchase_history/', views.purchase_history, name='purchase_history'),
+    path('purchase_history/export/<str:fmt>/', views.export_purchase_history, name='export_purchase_history'),
+    path('sales/export/<str:fmt>/', views.export_sales, name='export_sales'),
     path('submit_business_license/', views.submit_business_license, name='submit_business_license'),
     path('products/', views.product_list, name='product_list'),
+    path('products/feed/', views.product_feed, name='product_feed'),
     path('products/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('products/<int:product_id>/reviews/', views.product_reviews, name='product_reviews'),
     path('products/new/', views.product_create, name='product_create'),
     path('products/<int:product_id>/edit/', views.product_update, name='product_update'),
     path('products/<int:product_id>/delete/', views.product_delete, name='product_delete'),
     path('cart/', views.cart, name='cart'),
     path('add_to_cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
-    path('update_cart/<int:order_id>/<str:action>/', views.update_cart, name='update_cart'),
+    path('update_cart/<int:product_id>/<str:action>/', views.update_cart, name='update_cart'),
     path('checkout/', views.checkout, name='checkout'),
     path('price_trend/<int:product_id>/', views.price_trend, name='price_trend'),
     path('compare_prices/', views.compare_prices, name='compare_prices'),
@@ -30,5 +34,10 @@ urlpatterns = [
     path('buy_now/<int:product_id>/', views.buy_now, name='buy_now'),
     path('seller_ranking/', views.seller_ranking, name='seller_ranking'),
     path('password_reset/', include('django.contrib.auth.urls')),
+    path('products/<int:product_id>/auction/', views.auction_create, name='auction_create'),
+    path('auctions/<int:auction_id>/', views.auction_detail, name='auction_detail'),
+    path('auctions/<int:auction_id>/highest/', views.auction_highest, name='auction_highest'),
+    path('auctions/<int:auction_id>/bid/', views.auction_bid, name='auction_bid'),
+    path('live/', views.live_events, name='live_events'),
     path('review/edit/<int:review_id>/', views.review_edit, name='review_edit'),  # 추가된 경로
 ]
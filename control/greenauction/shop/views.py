@@ -1,14 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponseRedirect
-from .models import Product, Order, PriceHistory, Review, CustomUser
-from .forms import UserRegistrationForm, LoginForm, ProductForm, OrderForm, ReviewForm, BusinessLicenseForm
-import pandas as pd
-import requests
-from django.conf import settings
-from django.db.models import Sum, Avg, F
-from datetime import datetime, timedelta
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from .models import Auction, Category, Product, Order, Review, CustomUser
+from .forms import UserRegistrationForm, LoginForm, ProductForm, OrderForm, ReviewForm, BusinessLicenseForm, AuctionForm
+from . import bidding, comparison, export, forecast, inventory, kakaopay, leaderboard, live, pagecache, search, settlement, stats
+from .pagination import decode_cursor, encode_cursor, keyset_page, PAGE_SIZE, PRODUCT_SORTS, REVIEW_PAGE_SIZE, REVIEW_SORTS
+from .cart import Cart, CartBusy
+from .checkout import CheckoutError, OutOfStock, place_order
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.db.models.functions import Substr
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from decimal import Decimal, InvalidOperation
+from functools import wraps
 
 # 사용자 등록
 def register(request):
@@ -50,23 +57,121 @@ def user_logout(request):
     return render(request, 'registration/logout.html')
 
 # 상품 목록
+# 카드에 필요한 필드만 읽는다 (설명은 앞부분만)
+def product_cards(queryset):
+    return queryset.values('id', 'name', 'price', 'rating_avg', 'rating_count',
+                           summary=Substr('description', 1, 100))
+
+# 상품 목록 필터 (카테고리, 최소 평균 별점)
+def product_listing(params):
+    listing = Product.objects.all()
+    category_slug = params.get('category')
+    if category_slug:
+        listing = listing.filter(category__slug=category_slug)
+    try:
+        min_rating = Decimal(params.get('min_rating') or 0)
+    except InvalidOperation:
+        min_rating = None
+    if min_rating is not None and min_rating.is_finite() and min_rating > 0:
+        listing = listing.filter(rating_avg__gte=min_rating)
+    return listing
+
+# 검색 결과 한 페이지. 순서는 검색 인덱스의 관련도 순이고, 필터(카테고리/별점)는 같은 listing 으로 건다.
+# 커서는 다음에 읽을 검색 결과의 위치다 (필터에 걸러진 결과도 세므로 다음 페이지가 이어진다)
+SEARCH_BATCH = 200
+
+def search_page(listing, query, cursor=None, page_size=PAGE_SIZE):
+    values = decode_cursor(cursor)
+    try:
+        position = max(int(values[0]), 0) if values else 0
+    except (ValueError, TypeError):
+        position = 0
+    products = []
+    while True:
+        product_ids = search.search(query, limit=SEARCH_BATCH, offset=position)
+        found = {row['id']: row for row in product_cards(listing.filter(id__in=product_ids))} if product_ids else {}
+        for pk in product_ids:
+            if pk in found:
+                if len(products) == page_size:
+                    return products, encode_cursor([position])
+                products.append(found[pk])
+            position += 1
+        if len(product_ids) < SEARCH_BATCH:
+            return products, None
+
+@pagecache.cache_page(scopes=['products'])
 def product_list(request):
     query = request.GET.get('q')
-    products = Product.objects.all()
+    sort = request.GET.get('sort', 'id')
+    if sort not in PRODUCT_SORTS:
+        sort = 'id'
+    category_slug = request.GET.get('category', '')
+    listing = product_listing(request.GET)
+    next_cursor = None
     if query:
-        products = products.filter(name__icontains=query)
-    return render(request, 'shop/product_list.html', {'products': products})
+        # 검색 인덱스에서 관련도 순으로 id 를 받아 그 순서대로 상품을 보여준다
+        products, next_cursor = search_page(listing, query, request.GET.get('cursor'))
+    else:
+        products, next_cursor = keyset_page(product_cards(listing), sort, request.GET.get('cursor'))
+    return render(request, 'shop/product_list.html', {
+        'products': products,
+        'sort': sort,
+        'category': category_slug,
+        'min_rating': request.GET.get('min_rating', ''),
+        'query': query or '',
+        'next_cursor': next_cursor,
+    })
+
+# 무한 스크롤용 상품 목록 (JSON)
+def product_feed(request):
+    listing = product_listing(request.GET)
+    if request.GET.get('q'):
+        products, next_cursor = search_page(listing, request.GET['q'], request.GET.get('cursor'))
+    else:
+        products, next_cursor = keyset_page(
+            product_cards(listing), request.GET.get('sort', 'id'), request.GET.get('cursor'))
+    for product in products:
+        product['price'] = str(product['price'])
+        product['rating_avg'] = str(product['rating_avg'])
+    return JsonResponse({'results': products, 'next': next_cursor})
+
+# 상품 리뷰 한 페이지 (최신순 / 별점순, keyset)
+def review_rows(product_id):
+    return Review.objects.filter(product_id=product_id).values(
+        'id', 'user_id', 'content', 'rating', username=F('user__username'))
+
+def review_page(product_id, sort, cursor=None):
+    if sort not in REVIEW_SORTS:
+        sort = 'newest'
+    if cursor:
+        return keyset_page(review_rows(product_id), sort, cursor, REVIEW_PAGE_SIZE, REVIEW_SORTS)
+    # 첫 페이지는 상품마다 캐시하고 리뷰가 바뀌면 버린다
+    key = pagecache.make_key('review_page', [pagecache.review_scope(product_id)], [sort])
+    return pagecache.get_or_set(
+        key, lambda: keyset_page(review_rows(product_id), sort, None, REVIEW_PAGE_SIZE, REVIEW_SORTS))
+
+# 리뷰 더 보기 (JSON)
+def product_reviews(request, product_id):
+    reviews, next_cursor = review_page(product_id, request.GET.get('sort'), request.GET.get('cursor'))
+    return JsonResponse({'results': reviews, 'next': next_cursor})
 
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    reviews = product.reviews.all()
+    product = get_object_or_404(Product.objects.select_related('seller'), id=product_id)
+    review_sort = request.GET.get('review_sort') if request.GET.get('review_sort') in REVIEW_SORTS else 'newest'
+    reviews, next_review_cursor = review_page(product.id, review_sort)
+    live_auctions = product.auctions.filter(status='live', ends_at__gt=timezone.now()).order_by('ends_at')
     
-    # Calculate sales and price changes over the past week
-    one_week_ago = datetime.now() - timedelta(days=7)
-    recent_orders = Order.objects.filter(product=product, date_ordered__gte=one_week_ago)
-    total_sales = recent_orders.aggregate(Sum('quantity'))['quantity__sum'] or 0
-    price_changes = recent_orders.aggregate(Avg('total_price'))['total_price__avg'] or product.price
-    sales_changes = recent_orders.count()
+    # Calculate sales and price changes over the past week (from the daily rollup)
+    # 상품/판매자 범위 버전이 같으면 캐시된 값을 쓴다
+    product_scopes = [pagecache.product_scope(product.id), pagecache.seller_scope(product.seller_id)]
+
+    def summary():
+        recent = stats.recent_stats(product, days=7)
+        return recent['units'] or 0, recent['order_count'] or 0, recent['revenue']
+
+    total_sales, sales_changes, revenue = pagecache.get_or_set(
+        pagecache.make_key('product_summary', product_scopes), summary)
+    price_changes = revenue / sales_changes if sales_changes else product.price
 
     # Check if user has purchased the product
     has_purchased = False
@@ -87,11 +192,14 @@ def product_detail(request, product_id):
     return render(request, 'shop/product_detail.html', {
         'product': product,
         'reviews': reviews,
+        'review_sort': review_sort,
+        'next_review_cursor': next_review_cursor,
         'form': form,
         'total_sales': total_sales,
         'price_changes': price_changes,
         'sales_changes': sales_changes,
         'has_purchased': has_purchased,  # Add this line
+        'live_auctions': live_auctions,
     })
 
 # 리뷰 수정
@@ -102,7 +210,7 @@ def review_edit(request, review_id):
         form = ReviewForm(request.POST, instance=review)
         if form.is_valid():
             form.save()
-            return redirect('product_detail', product_id=review.product.id)
+            return redirect('product_detail', product_id=review.product_id)
     else:
         form = ReviewForm(instance=review)
     return render(request, 'shop/review_edit.html', {'form': form})
@@ -131,6 +239,9 @@ def product_update(request, product_id):
         form = ProductForm(request.POST, instance=product)
         if form.is_valid():
             form.save()
+            if 'stock' in form.changed_data:
+                # 판매자가 정한 수량으로 재고 조각을 다시 나눈다
+                inventory.restock(product.id, product.stock)
             return redirect('product_detail', product_id=product.id)
     else:
         form = ProductForm(instance=product)
@@ -144,119 +255,177 @@ def product_delete(request, product_id):
     product.delete()
     return redirect('product_list')
 
+# 장바구니를 그대로 다시 보여주며 오류를 알린다 (재고 부족 / 가격 변경)
+def cart_conflict(request, lines, exc):
+    return render(request, 'shop/cart.html', {
+        'lines': lines,
+        'total_cost': sum(line.total_price for line in lines),
+        'error': str(exc),
+        'out_of_stock': getattr(exc, 'products', []),
+    }, status=409)
+
+# 장바구니 잠금을 얻지 못하면 (같은 사용자의 요청이 몰림) 아무것도 바꾸지 않고 409 로 알린다
+def cart_busy_as_conflict(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except CartBusy as exc:
+            return cart_conflict(request, Cart.from_request(request).get_lines(), exc)
+    return wrapper
+
+# 장바구니에 하나 더 담고 늘어난 만큼 재고를 잡는다 (inventory.reserve)
+def add_with_hold(request, product_id):
+    stock = list(Product.objects.filter(id=product_id).values_list('stock', flat=True)[:1])
+    if not stock:
+        raise Http404('No Product matches the given query.')
+    with Cart.locked(request) as cart:
+        before = cart.lines.get(product_id, 0)
+        cart.add(product_id)
+        added = cart.lines.get(product_id, 0) - before
+        if added and stock[0] is not None and not inventory.reserve(request.user, product_id, added):
+            cart.set(product_id, before)
+            return cart_conflict(request, cart.get_lines(), OutOfStock([product_id]))
+        response = redirect('cart')
+        cart.save(response)
+    return response
+
 # 장바구니 추가
 @login_required
+@cart_busy_as_conflict
 def add_to_cart(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    user = CustomUser.objects.get(id=request.user.id)  # CustomUser 객체로 변환
-    order, created = Order.objects.get_or_create(buyer=user, product=product, defaults={'quantity': 1, 'total_price': product.price})
-    
-    if not created:
-        order.quantity += 1
-        order.total_price = order.quantity * order.product.price
-        order.save()
-    
-    return redirect('cart')
+    return add_with_hold(request, product_id)
 
 # 장바구니 보기
 @login_required
 def cart(request):
-    user = CustomUser.objects.get(id=request.user.id)  # CustomUser 객체로 변환
-    orders = Order.objects.filter(buyer=user)
-    total_cost = orders.aggregate(total_cost=Sum(F('quantity') * F('product__price')))['total_cost']
-    return render(request, 'shop/cart.html', {'orders': orders, 'total_cost': total_cost})
+    lines = Cart.from_request(request).get_lines()
+    total_cost = sum(line.total_price for line in lines)
+    return render(request, 'shop/cart.html', {'lines': lines, 'total_cost': total_cost})
 
-# 장바구니 업데이트
+# 장바구니 업데이트 (빼면 잡아 둔 재고를 돌려놓는다)
 @login_required
-def update_cart(request, order_id, action):
-    user = CustomUser.objects.get(id=request.user.id)  # CustomUser 객체로 변환
-    order = get_object_or_404(Order, id=order_id, buyer=user)
-    
+@cart_busy_as_conflict
+def update_cart(request, product_id, action):
     if action == 'increase':
-        order.quantity += 1
-        order.total_price = order.quantity * order.product.price
-        order.save()
-    elif action == 'decrease':
-        if order.quantity > 1:
-            order.quantity -= 1
-            order.total_price = order.quantity * order.product.price
-            order.save()
-        else:
-            order.delete()
-    elif action == 'remove':
-        order.delete()
-    
-    return redirect('cart')
+        if product_id not in Cart.from_request(request):
+            raise Http404('No cart line matches the given query.')
+        return add_with_hold(request, product_id)
+
+    with Cart.locked(request) as cart:
+        if product_id not in cart:
+            raise Http404('No cart line matches the given query.')
+        if action == 'decrease':
+            cart.add(product_id, -1)
+            inventory.unreserve(request.user, product_id, 1)
+        elif action == 'remove':
+            cart.remove(product_id)
+            inventory.unreserve(request.user, product_id)
+        response = redirect('cart')
+        cart.save(response)
+    return response
 
 # 결제 (checkout)
 @login_required
+@cart_busy_as_conflict
 def checkout(request):
-    user = CustomUser.objects.get(id=request.user.id)
-    orders = Order.objects.filter(buyer=user)
-    total_cost = orders.aggregate(total_cost=Sum(F('quantity') * F('product__price')))['total_cost']
-    
-    if request.method == 'POST':
-        # 결제 처리 로직 추가 필요
-        orders.delete()  # 결제 완료 후 장바구니 비우기
-        return redirect('payment_success')
-    
-    return render(request, 'shop/checkout.html', {'total_cost': total_cost})
+    if request.method != 'POST':
+        total_cost = sum(line.total_price for line in Cart.from_request(request).get_lines())
+        return render(request, 'shop/checkout.html', {'total_cost': total_cost})
+
+    # 잡아 둔 재고를 가져와 지금 가격으로 주문을 한 번에 저장한다 (checkout.place_order)
+    try:
+        expected_total = Decimal(request.POST['total']) if request.POST.get('total') else None
+    except InvalidOperation:
+        expected_total = None
+    with Cart.locked(request) as cart:
+        try:
+            place_order(request.user, cart.lines, expected_total)
+        except CheckoutError as exc:
+            return cart_conflict(request, cart.get_lines(), exc)
+        cart.clear()
+        # 주문별 결제는 구매 기록에서 진행한다
+        response = redirect('purchase_history')
+        cart.save(response)
+    return response
 
 # 가격 동향
 def price_trend(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    price_history = PriceHistory.objects.filter(product=product).order_by('date')
-    df = pd.DataFrame(list(price_history.values('date', 'average_price')))
-    if not df.empty:
-        df['predicted_price'] = df['average_price'].rolling(window=12, min_periods=1).mean()
-    else:
-        df['predicted_price'] = []
-    return render(request, 'shop/price_trend.html', {'product': product, 'price_history': df.to_dict('records')})
+    model = request.GET.get('model', 'rolling')
+    price_history = forecast.get_forecast(product.id, model)
+    return render(request, 'shop/price_trend.html', {
+        'product': product,
+        'price_history': price_history,
+        'model': model,
+        'models': forecast.MODELS,
+    })
 
 # 가격 비교
+@pagecache.cache_page(scopes=['products'])
 def compare_prices(request):
-    strawberries = Product.objects.filter(name='strawberry')
-    shine_muscats = Product.objects.filter(name='shine_muscat')
-    return render(request, 'shop/compare_prices.html', {'strawberries': strawberries, 'shine_muscats': shine_muscats})
+    category_stats = sorted(comparison.get_category_stats().values(), key=lambda row: row['name'] or '')
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'categories': category_stats})
+    return render(request, 'shop/compare_prices.html', {'category_stats': category_stats})
 
-# 카테고리
+# 카테고리 (목록은 템플릿 조각 캐시가 비었을 때만 만든다)
+@pagecache.cache_page(scopes=['products'])
 def category(request):
-    return render(request, 'shop/category.html')
+    def categories():
+        category_stats = comparison.get_category_stats()
+        rows = list(Category.objects.order_by('name'))
+        for item in rows:
+            item.stats = category_stats.get(item.id)
+        return rows
+    return render(request, 'shop/category.html', {'categories': SimpleLazyObject(categories)})
 
 # 판매자 랭킹
+@pagecache.cache_page()
 def table(request):
     return render(request, 'shop/table.html')
 
 # 카카오페이 결제
+@login_required
 def kakao_pay(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
-    url = 'https://kapi.kakao.com/v1/payment/ready'
-    headers = {
-        'Authorization': 'KakaoAK ' + settings.KAKAO_API_KEY,
-        'Content-Type': 'application/x-www-form-urlencoded',
-    }
-    data = {
-        'cid': 'TC0ONETIME',
-        'partner_order_id': order.id,
-        'partner_user_id': request.user.id,
-        'item_name': order.product.name,
-        'quantity': order.quantity,
-        'total_amount': order.total_price,
-        'vat_amount': '200',
-        'tax_free_amount': '0',
-        'approval_url': request.build_absolute_uri('/payment/success/'),
-        'fail_url': request.build_absolute_uri('/payment/fail/'),
-        'cancel_url': request.build_absolute_uri('/payment/cancel/'),
-    }
-    response = requests.post(url, headers=headers, data=data)
-    result = response.json()
-    order.kakao_tid = result['tid']
-    order.save()
+    order = get_object_or_404(Order.objects.select_related('product'), id=order_id, buyer=request.user)
+    if order.payment_status in ('approving', 'paid'):
+        return redirect('purchase_history')
+    # 결제 없이 오래되어 재고를 돌려놓은 주문이면 다시 잡는다
+    if not inventory.hold_for_payment(order):
+        return cart_conflict(request, [], OutOfStock([order.product_id]))
+    approval_url = request.build_absolute_uri(f"{reverse('payment_success')}?order_id={order.id}")
+    try:
+        result = kakaopay.get_client().ready(
+            partner_order_id=order.id,
+            partner_user_id=request.user.id,
+            item_name=order.product.name,
+            quantity=order.quantity,
+            total_amount=int(order.total_price),
+            approval_url=approval_url,
+            fail_url=request.build_absolute_uri(reverse('payment_fail')),
+            cancel_url=request.build_absolute_uri(reverse('payment_cancel')),
+        )
+    except kakaopay.KakaoPayError:
+        return redirect('payment_fail')
+    if order.kakao_tid != result['tid']:
+        Order.objects.filter(id=order.id).update(
+            kakao_tid=result['tid'], kakao_ready_at=timezone.now(), payment_status='ready')
     return redirect(result['next_redirect_pc_url'])
 
-# 결제 성공
+# 결제 성공 (카카오가 pg_token 을 붙여 돌려보낸다)
+# 승인은 settle_payments 가 배치로 처리하고 여기서는 대기열에 넣기만 한다
+@login_required
 def payment_success(request):
-    return render(request, 'shop/payment_success.html')
+    order_id = request.GET.get('order_id', '')
+    if not order_id.isdigit():
+        raise Http404('No Order matches the given query.')
+    order = get_object_or_404(Order, id=order_id, buyer=request.user)
+    pg_token = request.GET.get('pg_token')
+    if not pg_token or not order.kakao_tid:
+        return redirect('payment_fail')
+    settlement.enqueue(order, pg_token)
+    return render(request, 'shop/payment_success.html', {'order': order})
 
 # 결제 실패
 def payment_fail(request):
@@ -272,8 +441,7 @@ def profile(request):
     user = request.user
     ranking = None
     if user.is_seller:
-        sellers = CustomUser.objects.filter(is_seller=True).annotate(total_sales=Sum('products__orders__quantity')).order_by('-total_sales')
-        ranking = list(sellers).index(user) + 1 if user in sellers else None
+        ranking = leaderboard.rank_of(user)
     return render(request, 'shop/profile.html', {
         'username': user.username,
         'email': user.email,
@@ -285,9 +453,30 @@ def profile(request):
 @login_required
 def purchase_history(request):
     user = request.user
-    orders = Order.objects.filter(buyer=user)
+    orders = Order.objects.filter(buyer=user).select_related('product').order_by('-date_ordered')
     return render(request, 'shop/purchase_history.html', {'orders': orders})
 
+# 주문 내보내기 (스트리밍)
+def export_response(queryset, columns, fmt, filename):
+    if fmt not in export.FORMATS:
+        raise Http404('Unknown export format.')
+    response = StreamingHttpResponse(export.stream(queryset, columns, fmt), content_type=export.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+# 구매 기록 내보내기
+@login_required
+def export_purchase_history(request, fmt):
+    queryset, columns = export.buyer_orders(request.user)
+    return export_response(queryset, columns, fmt, 'purchase_history')
+
+# 판매 기록 내보내기
+@login_required
+@user_passes_test(lambda u: u.is_seller)
+def export_sales(request, fmt):
+    queryset, columns = export.seller_orders(request.user)
+    return export_response(queryset, columns, fmt, 'sales')
+
 # 사업자 등록증 제출
 @login_required
 @user_passes_test(lambda u: u.is_seller)
@@ -304,20 +493,85 @@ def submit_business_license(request):
 # 바로 구매하기
 @login_required
 def buy_now(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    user = CustomUser.objects.get(id=request.user.id)  # CustomUser 객체로 변환
+    product = get_object_or_404(Product.objects.only('id'), id=product_id)
     if request.method == 'POST':
-        order = Order.objects.create(
-            product=product,
-            buyer=user,
-            quantity=1,
-            total_price=product.price,
-            date_ordered=datetime.now()
-        )
-        return redirect('payment_success')
+        try:
+            [order] = place_order(request.user, {product.id: 1})
+        except CheckoutError as exc:
+            return cart_conflict(request, [], exc)
+        return redirect('kakao_pay', order_id=order.id)
     return redirect('product_detail', product_id=product_id)
 
 # 판매자 랭킹
+RANKING_SCOPES = ['orders', 'reviews', 'sellers']
+
+@pagecache.cache_page(scopes=RANKING_SCOPES)
 def seller_ranking(request):
-    sellers = CustomUser.objects.filter(is_seller=True).annotate(total_sales=Sum('products__orders__quantity')).order_by('-total_sales')
-    return render(request, 'shop/seller_ranking.html', {'sellers': sellers})
+    # 템플릿 조각 캐시가 비었을 때만 읽는다
+    sellers = SimpleLazyObject(lambda: leaderboard.top(100))
+    return render(request, 'shop/seller_ranking.html', {'sellers': sellers, 'ranking_scopes': RANKING_SCOPES})
+
+# 경매 시작 (판매자 본인 상품)
+@login_required
+@user_passes_test(lambda u: u.is_seller and u.is_approved)
+def auction_create(request, product_id):
+    product = get_object_or_404(Product, id=product_id, seller=request.user)
+    if request.method == 'POST':
+        form = AuctionForm(request.POST)
+        if form.is_valid():
+            auction = form.save(commit=False)
+            auction.product = product
+            auction.save()
+            return redirect('auction_detail', auction_id=auction.id)
+    else:
+        form = AuctionForm()
+    return render(request, 'shop/auction_form.html', {'form': form, 'product': product})
+
+# 경매 상세 (최고가/상위 입찰은 호가창에서 읽는다)
+def auction_detail(request, auction_id):
+    auction = get_object_or_404(Auction.objects.select_related('product'), id=auction_id)
+    book = bidding.books.get(auction.id)
+    top_bids = book.top(10)
+    bidders = CustomUser.objects.only('username').in_bulk({bid['bidder_id'] for bid in top_bids})
+    for bid in top_bids:
+        bid['bidder'] = bidders.get(bid['bidder_id'])
+    return render(request, 'shop/auction_detail.html', {
+        'auction': auction,
+        'book': book.snapshot(),
+        'top_bids': top_bids,
+    })
+
+# 현재 최고가 (JSON, DB 를 읽지 않는다)
+async def auction_highest(request, auction_id):
+    try:
+        snapshot = await sync_to_async(bidding.highest)(auction_id)
+    except Auction.DoesNotExist:
+        raise Http404('No Auction matches the given query.')
+    return JsonResponse(snapshot)
+
+# 입찰 (JSON)
+async def auction_bid(request, auction_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST only'}, status=405)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': '로그인이 필요합니다.'}, status=401)
+    try:
+        bid = await sync_to_async(bidding.place_bid)(auction_id, user.id, request.POST.get('amount'))
+    except bidding.BidRejected as exc:
+        return JsonResponse({'error': str(exc)}, status=409)
+    except Auction.DoesNotExist:
+        raise Http404('No Auction matches the given query.')
+    return JsonResponse({'bid_id': bid.id, 'amount': str(bid.amount)})
+
+# 실시간 알림 (Server-Sent Events). ?product=1&product=2&auction=3 으로 구독할 토픽을 고른다
+# ASGI 로 배포하면 asgi.py 가 이 경로를 live.asgi_app 으로 바로 보내고, 이 뷰는 개발 서버/테스트용이다
+async def live_events(request):
+    try:
+        topics = live.parse_topics(dict(request.GET.lists()))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    response = StreamingHttpResponse(live.stream(topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx 가 버퍼링하지 않도록
+    return response